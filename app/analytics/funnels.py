@@ -0,0 +1,139 @@
+import logging
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func, literal, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.analytics.models import LessonFunnel, LessonFunnelSnapshot
+from app.courses.models import UserLessonProgress
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Флаги прогресса, по которым строится воронка; "started" - наличие записи о прогрессе
+SECTION_STAGES = ("intro_completed", "video_completed", "practice_completed", "test_completed", "completed")
+FUNNEL_STAGES = ("started",) + SECTION_STAGES
+
+FunnelState = Tuple[bool, ...]
+
+# Ключ рекомендательной блокировки PostgreSQL: снимки воронки пишет один процесс
+SNAPSHOT_LOCK_KEY = 20250514
+
+
+def funnel_state(progress: Optional[UserLessonProgress]) -> Optional[FunnelState]:
+    """
+    Флаги прогресса до изменения. None - записи о прогрессе еще нет.
+    """
+    if progress is None:
+        return None
+    return tuple(bool(getattr(progress, stage)) for stage in SECTION_STAGES)
+
+
+def apply_funnel_deltas(db: Session, deltas: Dict[int, Dict[str, int]]) -> None:
+    """
+    Прибавляет изменения к счетчикам уроков одним многострочным upsert
+    """
+    if not deltas:
+        return
+    rows = [
+        {"lesson_id": lesson_id, **{stage: delta.get(stage, 0) for stage in FUNNEL_STAGES}}
+        for lesson_id, delta in sorted(deltas.items())
+    ]
+    statement = insert(LessonFunnel).values(rows)
+    db.execute(statement.on_conflict_do_update(
+        index_elements=[LessonFunnel.lesson_id],
+        set_={
+            **{stage: getattr(LessonFunnel, stage) + getattr(statement.excluded, stage) for stage in FUNNEL_STAGES},
+            "updated_at": func.now()
+        }
+    ))
+
+
+def track_funnel(db: Session, lesson_id: int, before: Optional[FunnelState], progress: UserLessonProgress) -> None:
+    """
+    Обновляет счетчики воронки по переключившимся флагам прогресса.
+    Вызывается в транзакции обработчика, поэтому счетчики фиксируются вместе с прогрессом.
+    """
+    after = funnel_state(progress)
+    delta = {"started": 1 if before is None else 0}
+    for stage, was, now in zip(SECTION_STAGES, before or (False,) * len(SECTION_STAGES), after):
+        delta[stage] = int(now) - int(was)
+    if any(delta.values()):
+        # Сначала записываем (и блокируем) строку прогресса, затем счетчики - в том же
+        # порядке, что и сброс позиций видео, иначе транзакции могут взаимно заблокироваться
+        db.flush()
+        apply_funnel_deltas(db, {lesson_id: delta})
+
+
+def rebuild_funnels(db: Session) -> int:
+    """
+    Пересчитывает все счетчики из user_lesson_progress одним проходом с группировкой.
+    На время пересчета запись прогресса блокируется, чтобы не потерять параллельные изменения.
+    Возвращает количество уроков со счетчиками.
+    """
+    if db.bind.dialect.name == "postgresql":
+        db.execute(text("LOCK TABLE user_lesson_progress IN SHARE MODE"))
+
+    counts = select(
+        UserLessonProgress.lesson_id,
+        func.count().label("started"),
+        *[func.count().filter(getattr(UserLessonProgress, stage)).label(stage) for stage in SECTION_STAGES]
+    ).group_by(UserLessonProgress.lesson_id)
+
+    db.query(LessonFunnel).delete(synchronize_session=False)
+    result = db.execute(insert(LessonFunnel).from_select(["lesson_id", *FUNNEL_STAGES], counts))
+    return result.rowcount
+
+
+def _lock_snapshots(db: Session, wait: bool = True) -> bool:
+    # Блокировка держится до конца транзакции. На других СУБД (локальный запуск) не нужна
+    if db.bind.dialect.name != "postgresql":
+        return True
+    if wait:
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SNAPSHOT_LOCK_KEY})
+        return True
+    return db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": SNAPSHOT_LOCK_KEY}).scalar()
+
+
+def snapshot_funnels(db: Session, day: date) -> int:
+    """
+    Копирует текущие счетчики в снимок за день. Повторный вызов в тот же день заменяет снимок.
+    """
+    _lock_snapshots(db)
+    db.query(LessonFunnelSnapshot).filter(LessonFunnelSnapshot.day == day).delete(synchronize_session=False)
+    counts = select(LessonFunnel.lesson_id, literal(day, LessonFunnelSnapshot.day.type), *[
+        getattr(LessonFunnel, stage) for stage in FUNNEL_STAGES
+    ])
+    result = db.execute(insert(LessonFunnelSnapshot).from_select(["lesson_id", "day", *FUNNEL_STAGES], counts))
+    return result.rowcount
+
+
+def take_daily_snapshot() -> None:
+    """
+    Фоновая задача: держит снимок текущего дня (по UTC) актуальным, а снимок
+    прошедшего дня один раз пересоздает после полуночи - он становится состоянием
+    на конец дня. Запускается на границах интервала, поэтому первый запуск после
+    полуночи приходится на начало суток. Если снимок уже делает другой воркер, запуск пропускается.
+    """
+    db = SessionLocal()
+    try:
+        if not _lock_snapshots(db, wait=False):
+            return
+        now = datetime.now(timezone.utc)
+        today = now.date()
+        midnight = datetime.combine(today, time.min, tzinfo=timezone.utc)
+        yesterday = today - timedelta(days=1)
+        taken_at = db.query(func.max(LessonFunnelSnapshot.taken_at)).filter(
+            LessonFunnelSnapshot.day == yesterday
+        ).scalar()
+        if taken_at is not None and taken_at.replace(tzinfo=taken_at.tzinfo or timezone.utc) < midnight:
+            snapshot_funnels(db, yesterday)
+        snapshot_funnels(db, today)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,221 @@
+import logging
+import math
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.analytics.models import QuizItemStats, QuizOptionStats
+from app.courses.models import TestOption, TestQuestion, UserTestAnswer
+
+logger = logging.getLogger(__name__)
+
+# Пороги, по которым вопрос помечается для проверки автором
+TOO_EASY = 0.95
+TOO_HARD = 0.2
+LOW_DISCRIMINATION = 0.15
+# Критическое значение для проверки, что корреляция больше нуля (уровень 0.05, двусторонний)
+SIGNIFICANCE_Z = 1.96
+# Меньше ответов - статистика ненадежна, флаги не выставляются
+MIN_RESPONSES = 30
+
+
+def _correlation(n: np.ndarray, sum_x: np.ndarray, sum_y: np.ndarray, sum_y2: np.ndarray, sum_xy: np.ndarray) -> np.ndarray:
+    """
+    Корреляция Пирсона бинарного признака x с баллом y по накопленным суммам.
+    Для бинарного x сумма x^2 равна сумме x. NaN - если корреляция не определена.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        numerator = n * sum_xy - sum_x * sum_y
+        denominator = np.sqrt((n * sum_x - sum_x ** 2) * (n * sum_y2 - sum_y ** 2))
+        return np.where(denominator > 0, numerator / denominator, np.nan)
+
+
+class LessonItemAccumulator:
+    """
+    Достаточные статистики по вопросам и вариантам одного урока.
+    Память - O(число вопросов и вариантов), независимо от количества ответов.
+    """
+
+    def __init__(self, question_ids: np.ndarray, option_ids: np.ndarray, option_questions: np.ndarray):
+        self.question_ids = question_ids
+        self.option_ids = option_ids
+        # Индекс вопроса для каждого варианта
+        self.option_questions = option_questions
+        size = len(question_ids)
+        self.n = np.zeros(size)
+        self.sum_x = np.zeros(size)
+        self.sum_y = np.zeros(size)
+        self.sum_y2 = np.zeros(size)
+        self.sum_xy = np.zeros(size)
+        self.selected = np.zeros(len(option_ids))
+        self.selected_sum_y = np.zeros(len(option_ids))
+
+    def add(self, answers: np.ndarray) -> None:
+        """
+        Добавляет ответы целого числа пользователей: столбцы user_id, question_id, option_id, is_correct,
+        строки упорядочены по (user_id, question_id, id). Учитывается первая попытка по каждому вопросу.
+        """
+        if not len(self.question_ids):
+            return
+        users, questions, options, correct = answers.T
+        first = np.ones(len(answers), dtype=bool)
+        first[1:] = (users[1:] != users[:-1]) | (questions[1:] != questions[:-1])
+        users, questions, options, correct = users[first], questions[first], options[first], correct[first]
+
+        # Ответы на вопросы, удаленные из урока, не учитываются
+        question_index = np.searchsorted(self.question_ids, questions)
+        option_index = np.searchsorted(self.option_ids, options)
+        valid = (
+            (question_index < len(self.question_ids))
+            & (self.question_ids[np.minimum(question_index, len(self.question_ids) - 1)] == questions)
+        )
+        users, correct = users[valid], correct[valid].astype(np.float64)
+        question_index, option_index, options = question_index[valid], option_index[valid], options[valid]
+        if not len(users):
+            return
+
+        # Общий балл пользователя за тест и остальной балл (без текущего вопроса) для каждой строки
+        starts = np.flatnonzero(np.r_[True, users[1:] != users[:-1]])
+        totals = np.add.reduceat(correct, starts)
+        rest = np.repeat(totals, np.diff(np.r_[starts, len(users)])) - correct
+
+        size = len(self.question_ids)
+        self.n += np.bincount(question_index, minlength=size)
+        self.sum_x += np.bincount(question_index, weights=correct, minlength=size)
+        self.sum_y += np.bincount(question_index, weights=rest, minlength=size)
+        self.sum_y2 += np.bincount(question_index, weights=rest ** 2, minlength=size)
+        self.sum_xy += np.bincount(question_index, weights=correct * rest, minlength=size)
+
+        if not len(self.option_ids):
+            return
+        known = (
+            (option_index < len(self.option_ids))
+            & (self.option_ids[np.minimum(option_index, len(self.option_ids) - 1)] == options)
+        )
+        option_index, option_rest = option_index[known], rest[known]
+        self.selected += np.bincount(option_index, minlength=len(self.option_ids))
+        self.selected_sum_y += np.bincount(option_index, weights=option_rest, minlength=len(self.option_ids))
+
+    def results(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            difficulty = np.where(self.n > 0, self.sum_x / self.n, np.nan)
+        discrimination = _correlation(self.n, self.sum_x, self.sum_y, self.sum_y2, self.sum_xy)
+
+        # Для варианта x - признак "выбран этот вариант", y - остальной балл по его вопросу
+        q = self.option_questions
+        with np.errstate(divide="ignore", invalid="ignore"):
+            selection_rate = np.where(self.n[q] > 0, self.selected / self.n[q], np.nan)
+        option_discrimination = _correlation(self.n[q], self.selected, self.sum_y[q], self.sum_y2[q], self.selected_sum_y)
+
+        items = [
+            {
+                "question_id": int(question_id),
+                "responses": int(self.n[i]),
+                "difficulty": _optional(difficulty[i]),
+                "discrimination": _optional(discrimination[i])
+            }
+            for i, question_id in enumerate(self.question_ids)
+        ]
+        options = [
+            {
+                "option_id": int(option_id),
+                "question_id": int(self.question_ids[q[i]]),
+                "selected": int(self.selected[i]),
+                "selection_rate": _optional(selection_rate[i]),
+                "discrimination": _optional(option_discrimination[i])
+            }
+            for i, option_id in enumerate(self.option_ids)
+        ]
+        return items, options
+
+
+def _optional(value: float) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value), 4)
+
+
+def _answer_chunks(db: Session, lesson_id: int, chunk_size: int) -> Iterator[np.ndarray]:
+    """
+    Ответы урока порциями через серверный курсор. Порция всегда содержит
+    всех ответов своих пользователей: хвост последнего пользователя переносится в следующую.
+    """
+    statement = (
+        select(UserTestAnswer.user_id, UserTestAnswer.question_id, UserTestAnswer.selected_option_id, UserTestAnswer.is_correct)
+        .join(TestQuestion, TestQuestion.id == UserTestAnswer.question_id)
+        .where(TestQuestion.lesson_id == lesson_id)
+        .order_by(UserTestAnswer.user_id, UserTestAnswer.question_id, UserTestAnswer.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    carry = np.empty((0, 4), dtype=np.int64)
+    for partition in db.execute(statement).partitions():
+        chunk = np.concatenate([carry, np.array(partition, dtype=np.int64).reshape(-1, 4)])
+        users = chunk[:, 0]
+        last_user_start = int(np.searchsorted(users, users[-1]))
+        carry = chunk[last_user_start:]
+        if last_user_start:
+            yield chunk[:last_user_start]
+    if len(carry):
+        yield carry
+
+
+def analyze_lesson(db: Session, lesson_id: int, chunk_size: int) -> int:
+    """
+    Считает статистику вопросов урока и заменяет ею кэш. Возвращает количество учтенных ответов.
+    """
+    question_ids = np.array(
+        [question_id for question_id, in db.query(TestQuestion.id).filter(TestQuestion.lesson_id == lesson_id).order_by(TestQuestion.id)],
+        dtype=np.int64
+    )
+    option_rows = (
+        db.query(TestOption.id, TestOption.question_id)
+        .join(TestQuestion, TestQuestion.id == TestOption.question_id)
+        .filter(TestQuestion.lesson_id == lesson_id)
+        .order_by(TestOption.id)
+        .all()
+    )
+    option_ids = np.array([option_id for option_id, _ in option_rows], dtype=np.int64)
+    option_questions = np.searchsorted(question_ids, np.array([question_id for _, question_id in option_rows], dtype=np.int64))
+
+    accumulator = LessonItemAccumulator(question_ids, option_ids, option_questions)
+    for chunk in _answer_chunks(db, lesson_id, chunk_size):
+        accumulator.add(chunk)
+    items, options = accumulator.results()
+
+    db.query(QuizItemStats).filter(QuizItemStats.lesson_id == lesson_id).delete(synchronize_session=False)
+    db.query(QuizOptionStats).filter(QuizOptionStats.question_id.in_(question_ids.tolist())).delete(synchronize_session=False)
+    if items:
+        db.execute(insert(QuizItemStats).values([{**item, "lesson_id": lesson_id} for item in items]))
+    if options:
+        db.execute(insert(QuizOptionStats).values(options))
+    return int(accumulator.n.sum())
+
+
+def item_flags(responses: int, difficulty: Optional[float], discrimination: Optional[float],
+               options: List[Dict[str, Any]]) -> List[str]:
+    """
+    Признаки, по которым вопрос стоит проверить: слишком легкий или трудный,
+    плохо различает сильных и слабых учеников, неверный вариант выбирают сильные ученики
+    (вероятно, вопрос неоднозначен или ключ ответа ошибочен), варианты, которые никто не выбирает.
+    """
+    if responses < MIN_RESPONSES or difficulty is None:
+        return []
+    flags = []
+    if difficulty >= TOO_EASY:
+        flags.append("too_easy")
+    if difficulty <= TOO_HARD:
+        flags.append("too_hard")
+    if discrimination is not None and discrimination < LOW_DISCRIMINATION:
+        flags.append("low_discrimination")
+    # Неверный вариант помечается, только если его корреляция с баллом не меньше порога
+    # и значимо больше нуля: при r ~ N(0, 1/n) случайная корреляция редко превышает z / sqrt(n)
+    distractor_threshold = max(LOW_DISCRIMINATION, SIGNIFICANCE_Z / math.sqrt(responses))
+    if any(
+        not option["is_correct"] and (option["discrimination"] or 0) >= distractor_threshold
+        for option in options
+    ):
+        flags.append("attractive_distractor")
+    if any(not option["is_correct"] and option["selected"] == 0 for option in options):
+        flags.append("unused_distractor")
+    return flags
@@ -0,0 +1,51 @@
+from sqlalchemy import Column, Integer, ForeignKey, Date, DateTime, Float
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+class LessonFunnel(Base):
+    __tablename__ = "lesson_funnels"
+    
+    # Счетчики воронки урока, обновляются вместе с прогрессом пользователей
+    lesson_id = Column(Integer, ForeignKey("lessons.id", ondelete="CASCADE"), primary_key=True)
+    started = Column(Integer, nullable=False, default=0)
+    intro_completed = Column(Integer, nullable=False, default=0)
+    video_completed = Column(Integer, nullable=False, default=0)
+    practice_completed = Column(Integer, nullable=False, default=0)
+    test_completed = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class LessonFunnelSnapshot(Base):
+    __tablename__ = "lesson_funnel_snapshots"
+    
+    # Состояние счетчиков на конец дня
+    lesson_id = Column(Integer, ForeignKey("lessons.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    started = Column(Integer, nullable=False, default=0)
+    intro_completed = Column(Integer, nullable=False, default=0)
+    video_completed = Column(Integer, nullable=False, default=0)
+    practice_completed = Column(Integer, nullable=False, default=0)
+    test_completed = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    taken_at = Column(DateTime(timezone=True), server_default=func.now())  # Снимок за прошедший день окончателен, если сделан после его конца
+
+class QuizItemStats(Base):
+    __tablename__ = "quiz_item_stats"
+    
+    # Результаты анализа вопроса теста по первым попыткам пользователей
+    question_id = Column(Integer, ForeignKey("test_questions.id", ondelete="CASCADE"), primary_key=True)
+    lesson_id = Column(Integer, ForeignKey("lessons.id", ondelete="CASCADE"), index=True, nullable=False)
+    responses = Column(Integer, nullable=False, default=0)
+    difficulty = Column(Float, nullable=True)  # Доля правильных ответов
+    discrimination = Column(Float, nullable=True)  # Точечно-бисериальная корреляция с остальным баллом
+    computed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class QuizOptionStats(Base):
+    __tablename__ = "quiz_option_stats"
+    
+    option_id = Column(Integer, ForeignKey("test_options.id", ondelete="CASCADE"), primary_key=True)
+    question_id = Column(Integer, ForeignKey("test_questions.id", ondelete="CASCADE"), index=True, nullable=False)
+    selected = Column(Integer, nullable=False, default=0)
+    selection_rate = Column(Float, nullable=True)
+    discrimination = Column(Float, nullable=True)  # Корреляция выбора варианта с остальным баллом
@@ -0,0 +1,143 @@
+from collections import defaultdict
+from datetime import date
+from typing import Any, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import and_, func
+from sqlalchemy.orm import Session
+
+from app.analytics.funnels import FUNNEL_STAGES
+from app.analytics.items import item_flags
+from app.analytics.models import LessonFunnel, LessonFunnelSnapshot, QuizItemStats, QuizOptionStats
+from app.analytics.schemas import CourseFunnel, LessonItemAnalysis
+from app.auth.jwt import get_current_admin
+from app.auth.models import User
+from app.courses.catalog import catalog
+from app.courses.models import Lesson, Module, TestOption, TestQuestion
+from app.database import get_db
+from app.utils.serialization import FastJSONResponse, typed_response
+
+router = APIRouter(
+    prefix="/analytics",
+    tags=["Аналитика"],
+)
+
+@router.get("/courses/{course_id}/funnel", response_model=CourseFunnel, response_class=FastJSONResponse)
+def get_course_funnel(
+    course_id: int,
+    day: Optional[date] = Query(None, description="Дата снимка; без нее отдаются текущие счетчики"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin)
+) -> Any:
+    """
+    Воронка по всем урокам курса: сколько пользователей начали урок и прошли каждую секцию.
+    Счетчики поддерживаются инкрементально, поэтому отчет - один запрос без сканирования прогресса.
+    """
+    course = catalog.get().courses.get(course_id)
+    if course is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Курс не найден"
+        )
+
+    if day is None:
+        counters = LessonFunnel
+        condition = LessonFunnel.lesson_id == Lesson.id
+    else:
+        counters = LessonFunnelSnapshot
+        condition = and_(LessonFunnelSnapshot.lesson_id == Lesson.id, LessonFunnelSnapshot.day == day)
+
+    rows = (
+        db.query(
+            Lesson.id.label("lesson_id"),
+            Lesson.title.label("lesson_title"),
+            Module.id.label("module_id"),
+            Module.title.label("module_title"),
+            *[func.coalesce(getattr(counters, stage), 0).label(stage) for stage in FUNNEL_STAGES]
+        )
+        .join(Module, Module.id == Lesson.module_id)
+        .outerjoin(counters, condition)
+        .filter(Module.course_id == course_id)
+        .order_by(Module.order, Module.id, Lesson.order, Lesson.id)
+        .all()
+    )
+
+    return typed_response(CourseFunnel, {
+        "course_id": course_id,
+        "title": course["title"],
+        "day": day,
+        "lessons": [row._asdict() for row in rows]
+    })
+
+@router.get("/lessons/{lesson_id}/items", response_model=LessonItemAnalysis, response_class=FastJSONResponse)
+def get_lesson_item_analysis(
+    lesson_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin)
+) -> Any:
+    """
+    Анализ вопросов теста урока: трудность, различающая способность и частота выбора вариантов.
+    Отдается из таблиц кэша, которые заполняет scripts/analyze_quiz_items.py.
+    """
+    if not db.query(Lesson.id).filter(Lesson.id == lesson_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Урок не найден"
+        )
+
+    questions = (
+        db.query(
+            TestQuestion.id, TestQuestion.question, TestQuestion.order,
+            QuizItemStats.responses, QuizItemStats.difficulty, QuizItemStats.discrimination,
+            QuizItemStats.computed_at
+        )
+        .outerjoin(QuizItemStats, QuizItemStats.question_id == TestQuestion.id)
+        .filter(TestQuestion.lesson_id == lesson_id)
+        .order_by(TestQuestion.order, TestQuestion.id)
+        .all()
+    )
+    options = (
+        db.query(
+            TestOption.id, TestOption.question_id, TestOption.text, TestOption.is_correct,
+            QuizOptionStats.selected, QuizOptionStats.selection_rate, QuizOptionStats.discrimination
+        )
+        .join(TestQuestion, TestQuestion.id == TestOption.question_id)
+        .outerjoin(QuizOptionStats, QuizOptionStats.option_id == TestOption.id)
+        .filter(TestQuestion.lesson_id == lesson_id)
+        .order_by(TestOption.order, TestOption.id)
+        .all()
+    )
+
+    options_by_question = defaultdict(list)
+    for option_id, question_id, text, is_correct, selected, selection_rate, discrimination in options:
+        options_by_question[question_id].append({
+            "option_id": option_id,
+            "text": text,
+            "is_correct": is_correct,
+            "selected": selected or 0,
+            "selection_rate": selection_rate,
+            "discrimination": discrimination
+        })
+
+    items = []
+    computed_at = None
+    for question_id, text, order, responses, difficulty, discrimination, question_computed_at in questions:
+        question_options = options_by_question[question_id]
+        items.append({
+            "question_id": question_id,
+            "question": text,
+            "order": order,
+            "responses": responses or 0,
+            "difficulty": difficulty,
+            "discrimination": discrimination,
+            "flags": item_flags(responses or 0, difficulty, discrimination, question_options),
+            "options": question_options
+        })
+        if question_computed_at and (computed_at is None or question_computed_at > computed_at):
+            computed_at = question_computed_at
+
+    return typed_response(LessonItemAnalysis, {
+        "lesson_id": lesson_id,
+        "computed_at": computed_at,
+        "items": items
+    })
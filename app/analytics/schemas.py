@@ -0,0 +1,49 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import date, datetime
+
+# Схемы для воронки уроков
+class LessonFunnelEntry(BaseModel):
+    lesson_id: int
+    lesson_title: str
+    module_id: int
+    module_title: str
+    started: int
+    intro_completed: int
+    video_completed: int
+    practice_completed: int
+    test_completed: int
+    completed: int
+
+class CourseFunnel(BaseModel):
+    course_id: int
+    title: str
+    # None - текущие счетчики, иначе снимок за этот день
+    day: Optional[date] = None
+    lessons: List[LessonFunnelEntry]
+
+
+# Схемы для анализа вопросов теста
+class QuizOptionAnalysis(BaseModel):
+    option_id: int
+    text: str
+    is_correct: bool
+    selected: int
+    selection_rate: Optional[float] = None
+    discrimination: Optional[float] = None
+
+class QuizItemAnalysis(BaseModel):
+    question_id: int
+    question: str
+    order: int
+    responses: int
+    difficulty: Optional[float] = None
+    discrimination: Optional[float] = None
+    flags: List[str]
+    options: List[QuizOptionAnalysis]
+
+class LessonItemAnalysis(BaseModel):
+    lesson_id: int
+    # None - анализ по уроку еще не выполнялся
+    computed_at: Optional[datetime] = None
+    items: List[QuizItemAnalysis]
@@ -2,7 +2,7 @@ from datetime import datetime, timedelta
 from typing import Optional
 
 import jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 
@@ -12,6 +12,7 @@ from app.auth.models import User
 from app.auth.schemas import TokenData
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login", auto_error=False)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -64,4 +65,32 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
 def get_current_active_user(current_user: User = Depends(get_current_user)):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Неактивный пользователь")
-    return current_user
\ No newline at end of file
+    return current_user
+
+def get_current_admin(current_user: User = Depends(get_current_user)):
+    if current_user.email not in settings.ADMIN_EMAILS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Недостаточно прав",
+        )
+    return current_user
+
+
+def get_current_user_id(
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    query_token: Optional[str] = Query(None, alias="token")
+) -> int:
+    """
+    Идентификатор пользователя из JWT без обращения к базе.
+    Для долгих соединений (SSE), где EventSource не умеет передавать заголовки,
+    токен можно передать параметром ?token=
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Не удалось проверить учетные данные",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    token = token or query_token
+    if not token:
+        raise credentials_exception
+    return verify_token(token, credentials_exception).user_id
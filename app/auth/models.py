@@ -17,11 +17,11 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     nickname = Column(String, unique=True, index=True, nullable=False)
     password_hash = Column(String, nullable=False)
-    xp = Column(Integer, default=0)
+    xp = Column(Integer, default=0, index=True)  # Индекс для таблицы лидеров
     is_active = Column(Boolean, default=True)  # Изменено на True по умолчанию
     is_verified = Column(Boolean, default=True)  # Изменено на True по умолчанию
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     @staticmethod
     def verify_password(plain_password, hashed_password):
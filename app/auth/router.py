@@ -9,6 +9,7 @@ from app.auth.schemas import UserCreate, UserResponse, Token
 from app.auth.jwt import create_access_token, get_current_user
 from app.config import settings
 from app.database import get_db
+from app.utils.versions import LEADERBOARD_VERSION, bump_version
 
 # Изменяем префикс маршрута с "/auth" на "/api/auth"
 router = APIRouter(
@@ -46,6 +47,8 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)) -> Any:
     )
     
     db.add(db_user)
+    # Новый пользователь может попасть в таблицу лидеров
+    bump_version(db, LEADERBOARD_VERSION)
     db.commit()
     db.refresh(db_user)
     
@@ -0,0 +1,95 @@
+"""
+Рендеринг PDF сертификатов без внешних зависимостей.
+
+Функции модуля выполняются в дочерних процессах пула, поэтому принимают
+и возвращают только простые значения.
+"""
+from typing import List, Tuple
+
+PAGE_WIDTH = 842  # A4 альбомной ориентации, в пунктах
+PAGE_HEIGHT = 595
+
+# Стандартные шрифты PDF не содержат кириллицы, поэтому имена и названия транслитерируются
+_TRANSLIT = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "e", "ж": "zh",
+    "з": "z", "и": "i", "й": "y", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o",
+    "п": "p", "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f", "х": "kh", "ц": "ts",
+    "ч": "ch", "ш": "sh", "щ": "shch", "ъ": "", "ы": "y", "ь": "", "э": "e", "ю": "yu",
+    "я": "ya", "ә": "a", "ғ": "g", "қ": "q", "ң": "n", "ө": "o", "ұ": "u", "ү": "u",
+    "һ": "h", "і": "i",
+}
+
+
+def transliterate(text: str) -> str:
+    result = []
+    for char in text:
+        latin = _TRANSLIT.get(char.lower())
+        if latin is None:
+            result.append(char)
+        elif char.isupper():
+            result.append(latin.capitalize())
+        else:
+            result.append(latin)
+    return "".join(result)
+
+
+def _pdf_string(text: str) -> str:
+    encoded = transliterate(text).encode("cp1252", errors="replace").decode("latin-1")
+    return "(" + encoded.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+
+def _centered(text: str, font: str, size: int, y: int) -> str:
+    # Приблизительная ширина строки: средняя ширина символа Helvetica ~0.5 кегля
+    x = max(40, (PAGE_WIDTH - len(transliterate(text)) * size * 0.5) / 2)
+    return f"BT /{font} {size} Tf {x:.1f} {y} Td {_pdf_string(text)} Tj ET"
+
+
+def _build_pdf(objects: List[bytes]) -> bytes:
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+
+    xref_offset = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        output += f"{offset:010d} 00000 n \n".encode()
+    output += (
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref_offset}\n%%EOF\n"
+    ).encode()
+    return bytes(output)
+
+
+def render_certificate(nickname: str, course_title: str, issue_date: str, verification_code: str) -> bytes:
+    """
+    Собирает PDF сертификата. Результат детерминирован: одинаковые данные
+    дают побайтно одинаковый файл, что важно для хранилища по хэшу содержимого.
+    """
+    lines: List[Tuple[str, str, int, int]] = [
+        ("Certificate of Completion", "F2", 36, 430),
+        ("This certifies that", "F1", 16, 370),
+        (nickname, "F2", 28, 325),
+        ("has successfully completed the course", "F1", 16, 280),
+        (course_title, "F2", 24, 235),
+        (f"Issued: {issue_date}", "F1", 12, 150),
+        (f"Verification code: {verification_code}", "F1", 12, 130),
+        ("Akatsuki Courses", "F1", 12, 90),
+    ]
+    content = "\n".join(
+        ["2 w 30 30 782 535 re S", "0.5 w 40 40 762 515 re S"]
+        + [_centered(text, font, size, y) for text, font, size, y in lines]
+    ).encode("latin-1")
+
+    return _build_pdf([
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 4 0 R /F2 5 0 R >> >> /Contents 6 0 R >>"
+        ).encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+        f"<< /Length {len(content)} >>\nstream\n".encode() + content + b"\nendstream",
+    ])
@@ -0,0 +1,101 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+from typing import Any, List
+
+from app.database import get_db
+from app.auth.jwt import get_current_user
+from app.auth.models import User
+from app.certificates.service import issue_for_completed_courses
+from app.certificates.storage import certificate_store
+from app.certificates.verification import verify_certificate
+from app.courses.models import Certificate
+from app.courses.schemas import CertificateCreate, CertificateResponse, CertificateVerification
+from app.utils.serialization import FastJSONResponse, typed_response
+
+router = APIRouter(
+    prefix="/certificates",
+    tags=["Сертификаты"],
+)
+
+# Файл в хранилище адресуется хэшем содержимого и никогда не меняется
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Коды длиннее этого заведомо не выдавались
+MAX_CODE_LENGTH = 64
+
+@router.get("", response_model=List[CertificateResponse], response_class=FastJSONResponse)
+def list_certificates(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Сертификаты текущего пользователя
+    """
+    certificates = (
+        db.query(Certificate)
+        .filter(Certificate.user_id == current_user.id)
+        .order_by(Certificate.issue_date.desc())
+        .all()
+    )
+    return typed_response(List[CertificateResponse], certificates)
+
+@router.post("", response_model=CertificateResponse, response_class=FastJSONResponse)
+def request_certificate(
+    certificate_data: CertificateCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Получение сертификата за пройденный курс. Если сертификат уже выдан, возвращается он же.
+    PDF рендерится в фоне: certificate_url заполняется после завершения рендеринга.
+    """
+    issue_for_completed_courses(db, current_user.id, certificate_data.course_id)
+
+    certificate = db.query(Certificate).filter(
+        Certificate.user_id == current_user.id,
+        Certificate.course_id == certificate_data.course_id
+    ).first()
+    if not certificate:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Курс еще не завершен"
+        )
+
+    return typed_response(CertificateResponse, certificate)
+
+@router.get("/files/{file_name}")
+def get_certificate_file(file_name: str) -> Any:
+    """
+    PDF сертификата из хранилища. Ссылка содержит хэш файла, поэтому ответ кэшируется бессрочно.
+    """
+    digest, _, extension = file_name.partition(".")
+    path = certificate_store.find(digest) if extension == "pdf" else None
+    if not path:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Файл не найден"
+        )
+
+    return FileResponse(
+        path,
+        media_type="application/pdf",
+        headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL, "ETag": f'"{digest}"'}
+    )
+
+@router.get("/verify/{verification_code}", response_model=CertificateVerification, response_class=FastJSONResponse)
+def verify(verification_code: str, db: Session = Depends(get_db)) -> Any:
+    """
+    Публичная проверка подлинности сертификата по коду.
+    Несуществующие коды отсекаются фильтром Блума без обращения к базе.
+    """
+    result = None
+    if len(verification_code) <= MAX_CODE_LENGTH:
+        result = verify_certificate(db, verification_code)
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Сертификат не найден"
+        )
+
+    return typed_response(CertificateVerification, result, headers={"Cache-Control": "public, max-age=60"})
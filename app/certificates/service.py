@@ -0,0 +1,245 @@
+import logging
+import multiprocessing
+import secrets
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+from queue import Queue
+from threading import Lock, Thread
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, func, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.auth.models import User
+from app.certificates.rendering import render_certificate
+from app.certificates.storage import certificate_store
+from app.certificates.verification import certificate_index
+from app.config import settings
+from app.courses.models import (
+    Certificate, Course, CourseStatus, Lesson, Module, UserCourse, UserLessonProgress
+)
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Без похожих символов (0/O, 1/I), чтобы код было удобно переписывать вручную
+CODE_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
+
+# Аргументы render_certificate для одного сертификата
+RenderJob = Tuple[int, Tuple[str, str, str, str]]
+
+
+def generate_verification_code() -> str:
+    groups = ["".join(secrets.choice(CODE_ALPHABET) for _ in range(4)) for _ in range(3)]
+    return "AKT-" + "-".join(groups)
+
+
+def certificate_url(digest: str) -> str:
+    return f"/certificates/files/{digest}.pdf"
+
+
+def completed_without_certificate(
+    db: Session,
+    user_id: Optional[int] = None,
+    course_id: Optional[int] = None
+) -> List[Tuple[int, int]]:
+    """
+    Пары (user_id, course_id), где пользователь прошел все уроки курса, но сертификата еще нет.
+    Считается одним запросом для любого количества пользователей.
+    """
+    totals = (
+        db.query(Module.course_id, func.count(Lesson.id).label("total"))
+        .join(Lesson, Lesson.module_id == Module.id)
+        .group_by(Module.course_id)
+    )
+    done = (
+        db.query(
+            UserLessonProgress.user_id,
+            Module.course_id,
+            func.count(func.distinct(UserLessonProgress.lesson_id)).label("done")
+        )
+        .join(Lesson, Lesson.id == UserLessonProgress.lesson_id)
+        .join(Module, Module.id == Lesson.module_id)
+        .filter(UserLessonProgress.completed.is_(True))
+        .group_by(UserLessonProgress.user_id, Module.course_id)
+    )
+    if course_id is not None:
+        totals = totals.filter(Module.course_id == course_id)
+        done = done.filter(Module.course_id == course_id)
+    if user_id is not None:
+        done = done.filter(UserLessonProgress.user_id == user_id)
+    totals = totals.subquery()
+    done = done.subquery()
+
+    rows = (
+        db.query(UserCourse.user_id, UserCourse.course_id)
+        .join(totals, totals.c.course_id == UserCourse.course_id)
+        .join(done, and_(
+            done.c.user_id == UserCourse.user_id,
+            done.c.course_id == UserCourse.course_id
+        ))
+        .outerjoin(Certificate, and_(
+            Certificate.user_id == UserCourse.user_id,
+            Certificate.course_id == UserCourse.course_id
+        ))
+        .filter(done.c.done >= totals.c.total, Certificate.id.is_(None))
+        .all()
+    )
+    return [(row_user_id, row_course_id) for row_user_id, row_course_id in rows]
+
+
+def issue_certificates(db: Session, pairs: List[Tuple[int, int]]) -> List[int]:
+    """
+    Создает сертификаты одной многострочной вставкой и отмечает курсы завершенными.
+    Уже существующие сертификаты пропускаются. Транзакцию фиксирует вызывающий код.
+    """
+    if not pairs:
+        return []
+
+    statement = (
+        insert(Certificate)
+        .values([
+            {
+                "user_id": user_id,
+                "course_id": course_id,
+                "verification_code": generate_verification_code(),
+                "is_valid": True
+            }
+            for user_id, course_id in pairs
+        ])
+        .on_conflict_do_nothing()
+        .returning(Certificate.id, Certificate.verification_code)
+    )
+    certificate_ids = []
+    for certificate_id, code in db.execute(statement):
+        certificate_ids.append(certificate_id)
+        # Код сразу становится проверяемым в этом воркере
+        certificate_index.add(code)
+
+    db.execute(
+        update(UserCourse)
+        .where(tuple_(UserCourse.user_id, UserCourse.course_id).in_(pairs))
+        .values(status=CourseStatus.COMPLETED, progress=100, completed_at=func.now())
+    )
+    return certificate_ids
+
+
+def render_jobs(db: Session, certificate_ids: Iterable[int]) -> List[RenderJob]:
+    rows = (
+        db.query(Certificate.id, User.nickname, Course.title, Certificate.issue_date, Certificate.verification_code)
+        .join(User, User.id == Certificate.user_id)
+        .join(Course, Course.id == Certificate.course_id)
+        .filter(Certificate.id.in_(list(certificate_ids)))
+        .all()
+    )
+    return [
+        (certificate_id, (nickname, title, issue_date.strftime("%d.%m.%Y"), code))
+        for certificate_id, nickname, title, issue_date, code in rows
+    ]
+
+
+def store_certificate(db: Session, certificate_id: int, pdf: bytes) -> str:
+    """
+    Кладет PDF в хранилище и записывает ссылку на него в сертификат
+    """
+    url = certificate_url(certificate_store.put(pdf))
+    db.query(Certificate).filter(Certificate.id == certificate_id).update(
+        {Certificate.certificate_url: url}, synchronize_session=False
+    )
+    return url
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = Lock()
+# Готовые PDF: (certificate_id, future); None - сигнал остановки потока записи
+_rendered: "Queue[Optional[Tuple[int, Future]]]" = Queue()
+_store_thread: Optional[Thread] = None
+
+
+def get_render_executor() -> ProcessPoolExecutor:
+    """
+    Пул процессов для рендеринга PDF. Создается при первом использовании,
+    чтобы не запускать процессы в воркерах, которые не выдают сертификаты.
+    Процессы запускаются через spawn: fork из многопоточного воркера uvicorn
+    может унаследовать захваченные другими потоками блокировки.
+    """
+    global _executor, _store_thread
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.CERTIFICATE_RENDER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            _store_thread = Thread(target=_store_rendered, name="certificate-store", daemon=True)
+            _store_thread.start()
+        return _executor
+
+
+def _on_rendered(certificate_id: int, future: Future) -> None:
+    # Вызывается в служебном потоке пула: запись в базу и хранилище выполняет
+    # отдельный поток, чтобы медленная база не задерживала выдачу результатов пула
+    _rendered.put((certificate_id, future))
+
+
+def _store_rendered() -> None:
+    while True:
+        item = _rendered.get()
+        if item is None:
+            return
+        certificate_id, future = item
+        try:
+            pdf = future.result()
+        except Exception:
+            logger.exception(f"Failed to render certificate {certificate_id}")
+            continue
+
+        db = SessionLocal()
+        try:
+            store_certificate(db, certificate_id, pdf)
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.exception(f"Failed to store certificate {certificate_id}")
+        finally:
+            db.close()
+
+
+def schedule_rendering(db: Session, certificate_ids: List[int]) -> None:
+    """
+    Отправляет рендеринг в пул процессов и сразу возвращает управление.
+    Ссылка на PDF появляется в сертификате после завершения рендеринга.
+    """
+    if not certificate_ids:
+        return
+    executor = get_render_executor()
+    for certificate_id, args in render_jobs(db, certificate_ids):
+        future = executor.submit(render_certificate, *args)
+        future.add_done_callback(partial(_on_rendered, certificate_id))
+
+
+def issue_for_completed_courses(
+    db: Session,
+    user_id: Optional[int] = None,
+    course_id: Optional[int] = None
+) -> List[int]:
+    """
+    Выдает сертификаты за все завершенные курсы (с фильтром по пользователю и курсу)
+    и ставит их PDF в очередь на рендеринг
+    """
+    certificate_ids = issue_certificates(db, completed_without_certificate(db, user_id, course_id))
+    db.commit()
+    schedule_rendering(db, certificate_ids)
+    return certificate_ids
+
+
+def shutdown_renderer() -> None:
+    global _executor, _store_thread
+    with _executor_lock:
+        if _executor is not None:
+            # После shutdown все результаты уже в очереди: поток записи сохраняет их и завершается
+            _executor.shutdown(wait=True)
+            _executor = None
+            _rendered.put(None)
+            _store_thread.join()
+            _store_thread = None
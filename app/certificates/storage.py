@@ -0,0 +1,52 @@
+import hashlib
+import os
+import re
+import tempfile
+from typing import Optional
+
+from app.config import settings
+
+DIGEST_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+class FileStore:
+    """
+    Локальное хранилище файлов с адресацией по содержимому (sha256).
+    Файл с заданным хэшем никогда не меняется, поэтому его можно кэшировать бессрочно,
+    а повторная запись одинакового содержимого ничего не делает.
+    """
+
+    def __init__(self, root: str, suffix: str = ""):
+        self.root = root
+        self.suffix = suffix
+
+    def path(self, digest: str) -> str:
+        # Два уровня подкаталогов, чтобы не складывать все файлы в одну директорию
+        return os.path.join(self.root, digest[:2], digest[2:4], digest + self.suffix)
+
+    def put(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        if os.path.exists(path):
+            return digest
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Пишем во временный файл и переименовываем, чтобы читатели не видели недописанный файл
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return digest
+
+    def find(self, digest: str) -> Optional[str]:
+        if not DIGEST_PATTERN.match(digest):
+            return None
+        path = self.path(digest)
+        return path if os.path.exists(path) else None
+
+
+certificate_store = FileStore(settings.CERTIFICATE_STORAGE_DIR, suffix=".pdf")
@@ -0,0 +1,177 @@
+import logging
+import time
+from threading import Lock
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.auth.models import User
+from app.config import settings
+from app.courses.models import Certificate, Course
+from app.database import SessionLocal
+from app.utils.bloom import BloomFilter
+from app.utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Сколько кодов читается из базы за одну порцию при построении фильтра
+REBUILD_BATCH_SIZE = 10000
+# Сколько пропущенных id проверяется одним запросом
+GAP_QUERY_BATCH_SIZE = 1000
+
+
+class CertificateIndex:
+    """
+    Фильтр Блума по всем выданным кодам сертификатов.
+
+    Фильтр строится при старте, новые коды добавляются при выдаче в этом воркере
+    и периодически дочитываются из базы по возрастанию id (водяной знак),
+    чтобы увидеть сертификаты, выданные другими воркерами и скриптами.
+
+    id выдаются при вставке, а видны строки после фиксации транзакции, поэтому
+    транзакция с меньшим id может зафиксироваться позже большего. Пропуски в
+    последовательности id ниже водяного знака запоминаются и перепроверяются
+    при каждом обновлении, пока строка не появится или пропуск не устареет
+    (откаченные транзакции оставляют пропуски навсегда).
+    """
+
+    def __init__(self):
+        self._bloom: Optional[BloomFilter] = None
+        self._watermark = 0
+        # Пропущенный id -> время обнаружения (time.monotonic), в порядке возрастания id
+        self._gaps: Dict[int, float] = {}
+        self._lock = Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._bloom is not None
+
+    def might_exist(self, code: str) -> bool:
+        bloom = self._bloom
+        # Пока фильтр не построен, решение принимает база
+        return bloom is None or code in bloom
+
+    def add(self, code: str) -> None:
+        bloom = self._bloom
+        if bloom is not None:
+            bloom.add(code)
+
+    def _track_gaps(self, gaps: Dict[int, float], first_id: int, last_id: int, now: float) -> None:
+        # Помним только последние пропуски: старые id почти наверняка откачены
+        first_id = max(first_id, last_id - settings.CERTIFICATE_INDEX_MAX_GAPS)
+        for missing_id in range(first_id, last_id):
+            gaps[missing_id] = now
+        while len(gaps) > settings.CERTIFICATE_INDEX_MAX_GAPS:
+            del gaps[next(iter(gaps))]
+
+    def _load(self, db: Session, bloom: BloomFilter, after_id: int, gaps: Dict[int, float]) -> int:
+        watermark = after_id
+        now = time.monotonic()
+        rows = (
+            db.query(Certificate.id, Certificate.verification_code)
+            .filter(Certificate.id > after_id)
+            .order_by(Certificate.id)
+            .yield_per(REBUILD_BATCH_SIZE)
+        )
+        for certificate_id, code in rows:
+            bloom.add(code)
+            if certificate_id > watermark + 1:
+                self._track_gaps(gaps, watermark + 1, certificate_id, now)
+            watermark = certificate_id
+        return watermark
+
+    def _load_gaps(self, db: Session, bloom: BloomFilter, gaps: Dict[int, float]) -> None:
+        """
+        Дочитывает строки, зафиксированные позже строк с большими id
+        """
+        expired_before = time.monotonic() - settings.CERTIFICATE_INDEX_GAP_SECONDS
+        for missing_id in [missing_id for missing_id, noticed in gaps.items() if noticed < expired_before]:
+            del gaps[missing_id]
+
+        missing_ids: List[int] = list(gaps)
+        for start in range(0, len(missing_ids), GAP_QUERY_BATCH_SIZE):
+            rows = (
+                db.query(Certificate.id, Certificate.verification_code)
+                .filter(Certificate.id.in_(missing_ids[start:start + GAP_QUERY_BATCH_SIZE]))
+                .all()
+            )
+            for certificate_id, code in rows:
+                bloom.add(code)
+                del gaps[certificate_id]
+
+    def rebuild(self, db: Session) -> None:
+        total = db.query(Certificate.id).count()
+        # Запас по емкости, чтобы фильтр не пересобирался при каждой новой выдаче
+        bloom = BloomFilter(
+            max(total * 2, settings.CERTIFICATE_BLOOM_MIN_CAPACITY),
+            settings.CERTIFICATE_BLOOM_ERROR_RATE
+        )
+        gaps: Dict[int, float] = {}
+        watermark = self._load(db, bloom, 0, gaps)
+        with self._lock:
+            self._bloom = bloom
+            self._watermark = watermark
+            self._gaps = gaps
+        logger.info(f"Certificate bloom filter built: {bloom.count} codes, {bloom.size // 8} bytes")
+
+    def refresh(self) -> None:
+        """
+        Дочитывает коды, выданные после последнего обновления, и коды из пропусков id.
+        При переполнении фильтр пересобирается целиком с большей емкостью.
+        """
+        db = SessionLocal()
+        try:
+            bloom = self._bloom
+            if bloom is None or bloom.is_saturated:
+                self.rebuild(db)
+                return
+            self._load_gaps(db, bloom, self._gaps)
+            watermark = self._load(db, bloom, self._watermark, self._gaps)
+            with self._lock:
+                self._watermark = max(self._watermark, watermark)
+        finally:
+            db.close()
+
+
+certificate_index = CertificateIndex()
+
+# Результаты проверки действительных кодов; несуществующие коды не кэшируются
+_verified = LRUCache(settings.CERTIFICATE_VERIFY_CACHE_SIZE)
+
+
+def verify_certificate(db: Session, code: str) -> Optional[Dict[str, Any]]:
+    """
+    Проверяет код сертификата: сначала LRU-кэш, затем фильтр Блума, и только потом база.
+    Возвращает данные сертификата или None, если код не найден.
+    """
+    result = _verified.get(code)
+    if result is not None:
+        return result
+    if not certificate_index.might_exist(code):
+        return None
+
+    row = (
+        db.query(
+            Certificate.verification_code, Certificate.issue_date, Certificate.is_valid,
+            Certificate.certificate_url, User.nickname, Course.title
+        )
+        .join(User, User.id == Certificate.user_id)
+        .join(Course, Course.id == Certificate.course_id)
+        .filter(Certificate.verification_code == code)
+        .first()
+    )
+    if not row:
+        return None
+
+    result = {
+        "verification_code": row.verification_code,
+        "is_valid": row.is_valid,
+        "issue_date": row.issue_date,
+        "nickname": row.nickname,
+        "course_title": row.title,
+        "certificate_url": row.certificate_url
+    }
+    # certificate_url появляется после рендеринга, поэтому кэшируем только готовый результат
+    if row.certificate_url:
+        _verified.set(code, result)
+    return result
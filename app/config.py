@@ -1,6 +1,6 @@
 import os
 from pydantic_settings import BaseSettings
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 class Settings(BaseSettings):
     # Настройки приложения
@@ -18,6 +18,97 @@ class Settings(BaseSettings):
     # Настройки CORS
     CORS_ORIGINS: List[str] = ["http://localhost:5173", "http://127.0.0.1:5173", "http://localhost:5173/akatsuki.github.io"]
     
+    # Настройки сжатия ответов
+    COMPRESSION_MIN_SIZE: int = 1024  # Ответы меньше этого размера (в байтах) не сжимаются
+    COMPRESSION_CACHE_SIZE: int = 1024  # Количество сжатых тел ответов в кэше
+    
+    # Настройки каталога курсов
+    CATALOG_REFRESH_SECONDS: int = 5  # Как часто проверять, изменился ли каталог в базе
+    
+    # Email администраторов, например ADMIN_EMAILS='["admin@example.com"]'
+    ADMIN_EMAILS: List[str] = []
+    
+    # Настройки записи на курсы
+    ENROLLMENT_BATCH_MAX: int = 10000  # Максимум пользователей в одном запросе массовой записи
+    
+    # Настройки сертификатов
+    CERTIFICATE_STORAGE_DIR: str = os.getenv("CERTIFICATE_STORAGE_DIR", "storage/certificates")
+    CERTIFICATE_RENDER_WORKERS: Optional[int] = None  # По умолчанию - по числу ядер
+    CERTIFICATE_VERIFY_CACHE_SIZE: int = 10000  # Количество проверенных кодов в LRU-кэше
+    CERTIFICATE_BLOOM_MIN_CAPACITY: int = 100000  # Минимальная емкость фильтра Блума по кодам
+    CERTIFICATE_BLOOM_ERROR_RATE: float = 0.001  # Доля ложноположительных ответов фильтра
+    CERTIFICATE_INDEX_REFRESH_SECONDS: int = 5  # Как часто дочитывать новые коды из базы
+    CERTIFICATE_INDEX_GAP_SECONDS: int = 600  # Сколько перепроверять пропущенные id (незафиксированные выдачи)
+    CERTIFICATE_INDEX_MAX_GAPS: int = 10000  # Сколько последних пропущенных id отслеживать
+    
+    # Настройки песочницы для проверки кода
+    SANDBOX_WORKERS: Optional[int] = None  # Процессов в пуле, по умолчанию - по числу ядер
+    SANDBOX_QUEUE_SIZE: int = 64  # Максимум проверок в работе и в очереди
+    SANDBOX_CPU_SECONDS: int = 2  # Лимит процессорного времени на запуск
+    SANDBOX_WALL_SECONDS: int = 5  # Лимит реального времени на запуск
+    SANDBOX_MEMORY_MB: int = 256  # Лимит памяти программы
+    SANDBOX_OUTPUT_LIMIT: int = 64 * 1024  # Максимальный размер вывода в байтах
+    SANDBOX_MAX_CODE_SIZE: int = 64 * 1024  # Максимальный размер отправленного кода в байтах
+    SANDBOX_RESULT_CACHE_SIZE: int = 4096  # Количество результатов проверок в кэше
+    SANDBOX_REQUIRE_ISOLATION: bool = True  # Не запускать код, если нельзя изолировать процесс (пространства имен, корень, seccomp)
+    SANDBOX_UID: int = 60000  # Первый uid процессов песочницы; каждому процессу пула - два uid подряд
+    
+    # Настройки потоков событий (SSE)
+    SSE_SUBSCRIBER_BUFFER: int = 100  # Событий в очереди клиента, после чего медленный клиент отключается
+    SSE_REPLAY_BUFFER: int = 200  # Последних событий темы в памяти для переподключения
+    SSE_REPLAY_LIMIT: int = 500  # Максимум пропущенных событий, дочитываемых из базы
+    SSE_KEEPALIVE_SECONDS: int = 15  # Интервал пустых сообщений, чтобы прокси не закрывали соединение
+    SSE_MAX_SUBSCRIBERS: int = 10000  # Максимум одновременных подписчиков на воркер
+    
+    # Настройки присутствия на уроках
+    PRESENCE_WINDOW_SECONDS: int = 60  # Пользователь считается на уроке столько секунд после сигнала
+    PRESENCE_MAX_ENTRIES: int = 200000  # Максимум отслеживаемых пользователей на воркер
+    
+    # Настройки прогресса просмотра видео
+    VIDEO_FLUSH_SECONDS: int = 10  # Как часто накопленные позиции записываются в базу
+    VIDEO_BUFFER_MAX_PENDING: int = 50000  # При большем числе ожидающих записей сброс выполняется сразу
+    VIDEO_SESSION_CACHE_SIZE: int = 100000  # Последних позиций в памяти для подсчета просмотренного времени
+    VIDEO_COMPLETION_THRESHOLD: float = 0.9  # Доля просмотренного видео, после которой оно считается завершенным
+    
+    # Черновики кода практики
+    DRAFT_FLUSH_SECONDS: int = 5  # Окно, в котором частые сохранения схлопываются в одну запись
+    DRAFT_BUFFER_MAX_PENDING: int = 20000  # При большем числе ожидающих черновиков сброс выполняется сразу
+    DRAFT_MAX_SIZE: int = 64 * 1024  # Максимальный размер черновика в байтах
+    DRAFT_HASH_CACHE_SIZE: int = 100000  # Хэшей последних сохраненных черновиков в памяти
+    
+    # Синхронизация офлайн-клиентов
+    SYNC_PAGE_SIZE: int = 500  # Максимум строк каждого раздела в одном ответе
+    SYNC_OVERLAP_SECONDS: int = 5  # Перекрытие окна на случай транзакций, зафиксированных позже
+    
+    # Активность пользователей
+    ACTIVITY_RECORDED_CACHE_SIZE: int = 100000  # Отмеченных за день пользователей в памяти
+    
+    # Аналитика
+    ANALYTICS_SNAPSHOT_SECONDS: int = 3600  # Как часто обновляется снимок воронки за текущий день (делитель суток, чтобы запуск пришелся на полночь)
+    
+    # Выгрузки
+    EXPORT_CHUNK_ROWS: int = 1000  # Строк, читаемых из базы и отправляемых клиенту за раз
+    
+    # Ограничение частоты запросов (на воркер)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_MAX_BUCKETS: int = 100000  # Максимум отслеживаемых клиентов, самые давние вытесняются
+    RATE_LIMIT_TRUST_FORWARDED: bool = False  # Брать IP клиента из X-Forwarded-For (только за доверенным прокси)
+    # "МЕТОД /путь/{параметр}": "запросов/second|minute|hour"
+    RATE_LIMITS: Dict[str, str] = {
+        "POST /auth/login": "10/minute",
+        "POST /auth/register": "5/minute",
+        "POST /lessons/{lesson_id}/check-test": "20/minute",
+        "POST /lessons/{lesson_id}/check-code": "30/minute",
+        "POST /lessons/{lesson_id}/comments": "10/minute",
+        "POST /lessons/{lesson_id}/like": "30/minute",
+        "POST /lessons/{lesson_id}/dislike": "30/minute",
+        "DELETE /lessons/{lesson_id}/like": "30/minute",
+        "DELETE /lessons/{lesson_id}/dislike": "30/minute",
+    }
+    
+    # Настройки уроков
+    LESSON_BATCH_MAX: int = 20  # Максимум уроков в одном запросе GET /lessons?ids=
+    
     # Настройки Email
     MAIL_SERVER: str = os.getenv("MAIL_SERVER", "smtp.gmail.com")
     MAIL_PORT: int = int(os.getenv("MAIL_PORT", "587"))
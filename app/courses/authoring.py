@@ -0,0 +1,185 @@
+from typing import Any, Dict, Iterator, List
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.courses.models import Course, Module, Lesson, TestQuestion, TestOption
+from app.courses.schemas import CourseDocument
+from app.database import SessionLocal
+from app.utils.serialization import dump_json
+
+# Поля урока, которые переносятся между документом и таблицей lessons без изменений
+LESSON_FIELDS = (
+    "title", "intro_title", "intro_content", "video_url", "video_description",
+    "practice_instructions", "practice_code_template", "practice_language",
+    "practice_tests", "xp_reward"
+)
+
+
+def _insert_returning_ids(db: Session, model: Any, rows: List[Dict[str, Any]]) -> List[int]:
+    """
+    Многострочная вставка с RETURNING id. Идентификаторы возвращаются
+    в порядке строк, поэтому по ним можно связать дочерние записи.
+    """
+    if not rows:
+        return []
+    statement = insert(model).returning(model.id, sort_by_parameter_order=True)
+    return list(db.execute(statement, rows).scalars())
+
+
+def import_course(db: Session, document: CourseDocument) -> Dict[str, int]:
+    """
+    Создает курс со всеми модулями, уроками, вопросами и вариантами ответов.
+    На каждый уровень дерева выполняется одна многострочная вставка,
+    транзакцию фиксирует вызывающий код.
+    """
+    course_id = db.execute(
+        insert(Course).returning(Course.id),
+        {
+            "title": document.title,
+            "description": document.description,
+            "duration": document.duration,
+            "xp_reward": document.xp_reward
+        }
+    ).scalar_one()
+
+    module_ids = _insert_returning_ids(db, Module, [
+        {
+            "course_id": course_id,
+            "title": module.title,
+            "description": module.description,
+            "order": module_order
+        }
+        for module_order, module in enumerate(document.modules, 1)
+    ])
+
+    lessons = [
+        (module_id, lesson_order, lesson)
+        for module_id, module in zip(module_ids, document.modules)
+        for lesson_order, lesson in enumerate(module.lessons, 1)
+    ]
+    lesson_ids = _insert_returning_ids(db, Lesson, [
+        {
+            "module_id": module_id,
+            "order": lesson_order,
+            **{field: getattr(lesson, field) for field in LESSON_FIELDS}
+        }
+        for module_id, lesson_order, lesson in lessons
+    ])
+
+    questions = [
+        (lesson_id, question_order, question)
+        for lesson_id, (_, _, lesson) in zip(lesson_ids, lessons)
+        for question_order, question in enumerate(lesson.questions, 1)
+    ]
+    question_ids = _insert_returning_ids(db, TestQuestion, [
+        {
+            "lesson_id": lesson_id,
+            "question": question.question,
+            "order": question_order
+        }
+        for lesson_id, question_order, question in questions
+    ])
+
+    options = [
+        {
+            "question_id": question_id,
+            "text": option.text,
+            "is_correct": option.is_correct,
+            "order": option_order
+        }
+        for question_id, (_, _, question) in zip(question_ids, questions)
+        for option_order, option in enumerate(question.options, 1)
+    ]
+    if options:
+        db.execute(insert(TestOption), options)
+
+    return {
+        "course_id": course_id,
+        "modules": len(module_ids),
+        "lessons": len(lesson_ids),
+        "questions": len(question_ids),
+        "options": len(options)
+    }
+
+
+def _export_module(db: Session, module: Module) -> Dict[str, Any]:
+    """
+    Документ одного модуля: три запроса на модуль независимо от числа уроков и вопросов
+    """
+    lessons = (
+        db.query(Lesson.id, *[getattr(Lesson, field) for field in LESSON_FIELDS])
+        .filter(Lesson.module_id == module.id)
+        .order_by(Lesson.order, Lesson.id)
+        .all()
+    )
+    lesson_ids = [lesson.id for lesson in lessons]
+
+    options_by_question: Dict[int, List[Dict[str, Any]]] = {}
+    questions_by_lesson: Dict[int, List[Dict[str, Any]]] = {}
+    if lesson_ids:
+        options = (
+            db.query(TestOption.question_id, TestOption.text, TestOption.is_correct)
+            .join(TestQuestion, TestQuestion.id == TestOption.question_id)
+            .filter(TestQuestion.lesson_id.in_(lesson_ids))
+            .order_by(TestOption.question_id, TestOption.order, TestOption.id)
+        )
+        for question_id, text, is_correct in options:
+            options_by_question.setdefault(question_id, []).append({"text": text, "is_correct": is_correct})
+
+        questions = (
+            db.query(TestQuestion.lesson_id, TestQuestion.id, TestQuestion.question)
+            .filter(TestQuestion.lesson_id.in_(lesson_ids))
+            .order_by(TestQuestion.lesson_id, TestQuestion.order, TestQuestion.id)
+        )
+        for lesson_id, question_id, question in questions:
+            questions_by_lesson.setdefault(lesson_id, []).append({
+                "question": question,
+                "options": options_by_question.get(question_id, [])
+            })
+
+    return {
+        "title": module.title,
+        "description": module.description,
+        "lessons": [
+            {
+                **{field: getattr(lesson, field) for field in LESSON_FIELDS},
+                "questions": questions_by_lesson.get(lesson.id, [])
+            }
+            for lesson in lessons
+        ]
+    }
+
+
+def iter_course_export(course_id: int) -> Iterator[bytes]:
+    """
+    Отдает курс в формате CourseDocument по частям: модули сериализуются
+    и отправляются по одному, поэтому весь курс не держится в памяти.
+    Генератор читается уже после возврата из обработчика, поэтому работает
+    со своей сессией, а не с сессией запроса.
+    """
+    db = SessionLocal()
+    try:
+        course = db.query(Course).filter(Course.id == course_id).one()
+        header = dump_json({
+            "title": course.title,
+            "description": course.description,
+            "duration": course.duration,
+            "xp_reward": course.xp_reward
+        })
+        # Открываем объект без закрывающей скобки и дописываем список модулей
+        yield header[:-1] + b',"modules":['
+
+        modules = (
+            db.query(Module)
+            .filter(Module.course_id == course.id)
+            .order_by(Module.order, Module.id)
+            .all()
+        )
+        for position, module in enumerate(modules):
+            chunk = dump_json(_export_module(db, module))
+            yield chunk if position == 0 else b"," + chunk
+
+        yield b"]}"
+    finally:
+        db.close()
@@ -0,0 +1,174 @@
+import base64
+import logging
+from bisect import bisect_right
+from collections import defaultdict
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.courses.models import Course, Module
+from app.courses.schemas import CourseResponse, CourseDetail
+from app.database import SessionLocal
+from app.utils.serialization import dump_json, get_type_adapter
+
+logger = logging.getLogger(__name__)
+
+SORT_KEYS = ("id", "title")
+
+
+def encode_cursor(key: Tuple) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps(list(key))).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple:
+    return tuple(orjson.loads(base64.urlsafe_b64decode(cursor.encode())))
+
+
+def _key(sort: str, course: Dict[str, Any]) -> Tuple:
+    if sort == "title":
+        return (course["title"], course["id"])
+    return (course["id"],)
+
+
+class CatalogSnapshot:
+    """
+    Неизменяемый снимок каталога курсов в памяти.
+
+    Снимок пересобирается целиком и подменяется одной операцией присваивания,
+    поэтому чтение на горячем пути не требует блокировок и обращений к базе.
+    """
+
+    def __init__(self, version: Tuple, courses: List[Dict[str, Any]], details: Dict[int, bytes]):
+        self.version = version
+        self.details = details
+        self.courses = {course["id"]: course for course in courses}
+        self.orderings = {
+            sort: sorted(courses, key=lambda course: _key(sort, course))
+            for sort in SORT_KEYS
+        }
+        self.keys = {
+            sort: [_key(sort, course) for course in ordering]
+            for sort, ordering in self.orderings.items()
+        }
+
+    def page(
+        self,
+        sort: str,
+        cursor: Optional[Tuple],
+        limit: int,
+        min_duration: Optional[int] = None,
+        max_duration: Optional[int] = None,
+        min_xp: Optional[int] = None,
+        max_xp: Optional[int] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Страница каталога с keyset-пагинацией: курсы строго после ключа cursor
+        """
+        courses = self.orderings[sort]
+        keys = self.keys[sort]
+        start = bisect_right(keys, cursor) if cursor else 0
+
+        items = []
+        for position in range(start, len(courses)):
+            course = courses[position]
+            if min_duration is not None and course["duration"] < min_duration:
+                continue
+            if max_duration is not None and course["duration"] > max_duration:
+                continue
+            if min_xp is not None and course["xp_reward"] < min_xp:
+                continue
+            if max_xp is not None and course["xp_reward"] > max_xp:
+                continue
+            if len(items) == limit:
+                # Есть еще хотя бы один подходящий курс - отдаем курсор на последний выданный
+                return items, encode_cursor(_key(sort, items[-1]))
+            items.append(course)
+        return items, None
+
+
+def catalog_version(db: Session) -> Tuple:
+    """
+    Отпечаток версии каталога: количество, максимальные id и время изменения курсов и модулей.
+    Таблицы маленькие, поэтому запрос дешевый.
+    """
+    courses = db.query(
+        func.count(Course.id), func.max(Course.id), func.max(Course.updated_at)
+    ).one()
+    modules = db.query(
+        func.count(Module.id), func.max(Module.id), func.max(Module.updated_at)
+    ).one()
+    return (*courses, *modules)
+
+
+def build_snapshot(db: Session) -> CatalogSnapshot:
+    version = catalog_version(db)
+    courses = db.query(Course).all()
+    modules = db.query(Module).order_by(Module.course_id, Module.order).all()
+
+    modules_by_course = defaultdict(list)
+    for module in modules:
+        modules_by_course[module.course_id].append(module)
+
+    course_adapter = get_type_adapter(CourseResponse)
+    detail_adapter = get_type_adapter(CourseDetail)
+    items = []
+    details = {}
+    for course in courses:
+        items.append(course_adapter.dump_python(course_adapter.validate_python(course, from_attributes=True)))
+        detail = detail_adapter.validate_python({
+            **items[-1],
+            "modules": modules_by_course[course.id],
+        }, from_attributes=True)
+        # Карточка курса хранится уже сериализованной
+        details[course.id] = dump_json(detail)
+
+    return CatalogSnapshot(version, items, details)
+
+
+class CatalogCache:
+    """
+    Держит текущий снимок каталога и пересобирает его, когда меняется отпечаток каталога
+    """
+
+    def __init__(self):
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._lock = Lock()
+
+    def get(self) -> CatalogSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            # Снимок еще не построен (например, база была недоступна при старте)
+            snapshot = self.rebuild()
+        return snapshot
+
+    def rebuild(self, db: Optional[Session] = None) -> CatalogSnapshot:
+        with self._lock:
+            if db is not None:
+                self._snapshot = build_snapshot(db)
+            else:
+                db = SessionLocal()
+                try:
+                    self._snapshot = build_snapshot(db)
+                finally:
+                    db.close()
+            return self._snapshot
+
+    def refresh_if_changed(self) -> None:
+        """
+        Сверяет отпечаток каталога в базе со снимком. Вызывается фоновой задачей,
+        чтобы изменения, сделанные другими воркерами или напрямую в базе, попадали в снимок.
+        """
+        db = SessionLocal()
+        try:
+            snapshot = self._snapshot
+            if snapshot is None or catalog_version(db) != snapshot.version:
+                self.rebuild(db)
+                logger.info("Course catalog snapshot rebuilt")
+        finally:
+            db.close()
+
+
+catalog = CatalogCache()
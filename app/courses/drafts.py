@@ -0,0 +1,199 @@
+import hashlib
+import zlib
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.auth.models import User
+from app.config import settings
+from app.courses.models import Lesson, PracticeDraft
+from app.database import SessionLocal
+from app.utils.buffer import WriteBehindBuffer
+from app.utils.cache import LRUCache
+
+# Ожидающий записи черновик: (код, хэш, время сохранения)
+PendingDraft = Tuple[str, str, datetime]
+
+# Хэш удаленного черновика. Удаление записывает пустую строку с этим хэшем и временем
+# удаления, чтобы более ранние сохранения из буферов не восстановили черновик
+DELETED_HASH = ""
+
+
+def content_hash(code: str) -> str:
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+def compress_code(code: str) -> bytes:
+    return zlib.compress(code.encode("utf-8"), 6)
+
+
+def decompress_code(content: bytes) -> str:
+    return zlib.decompress(content).decode("utf-8")
+
+
+def _as_utc(moment: datetime) -> datetime:
+    # SQLite возвращает время без часового пояса
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def _upsert(rows: List[Dict[str, Any]]) -> Any:
+    """
+    Многострочный upsert черновиков. Строка перезаписывается, только если новая версия
+    сохранена позже записанной (сохранения из буферов разных воркеров и удаление
+    могут прийти в базу в любом порядке) и отличается по содержимому.
+    """
+    statement = insert(PracticeDraft).values(rows)
+    return statement.on_conflict_do_update(
+        index_elements=[PracticeDraft.user_id, PracticeDraft.lesson_id],
+        set_={
+            "content": statement.excluded.content,
+            "content_hash": statement.excluded.content_hash,
+            "size": statement.excluded.size,
+            "updated_at": statement.excluded.updated_at
+        },
+        where=(PracticeDraft.updated_at < statement.excluded.updated_at)
+        & (PracticeDraft.content_hash != statement.excluded.content_hash)
+    )
+
+
+def flush_drafts(batch: Dict[Hashable, PendingDraft]) -> None:
+    """
+    Записывает накопленные черновики одним многострочным upsert.
+    Хэши записанных строк запоминаются как сохраненные в базе.
+    """
+    db = SessionLocal()
+    try:
+        # Черновики удаленных уроков или пользователей отбрасываем, чтобы не ломать весь пакет
+        lesson_ids = {lesson_id for _, lesson_id in batch}
+        user_ids = {user_id for user_id, _ in batch}
+        existing_lessons = {row[0] for row in db.query(Lesson.id).filter(Lesson.id.in_(lesson_ids))}
+        existing_users = {row[0] for row in db.query(User.id).filter(User.id.in_(user_ids))}
+        rows = [
+            {
+                "user_id": user_id,
+                "lesson_id": lesson_id,
+                "content": compress_code(code),
+                "content_hash": code_hash,
+                "size": len(code.encode("utf-8")),
+                "updated_at": saved_at
+            }
+            for (user_id, lesson_id), (code, code_hash, saved_at) in batch.items()
+            if lesson_id in existing_lessons and user_id in existing_users
+        ]
+        if not rows:
+            return
+
+        written = db.execute(
+            _upsert(rows).returning(PracticeDraft.user_id, PracticeDraft.lesson_id)
+        ).all()
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    for key in written:
+        _, code_hash, saved_at = batch[tuple(key)]
+        _remember_persisted(tuple(key), code_hash, saved_at)
+
+
+draft_buffer = WriteBehindBuffer(flush_drafts, settings.DRAFT_BUFFER_MAX_PENDING)
+
+# Версия черновика, которая точно есть в базе, по (user_id, lesson_id): (хэш, время сохранения).
+# Заполняется после успешной записи, чтения из базы и удаления; повторные сохранения
+# этой версии не попадают ни в буфер, ни в базу
+_persisted_hashes = LRUCache(settings.DRAFT_HASH_CACHE_SIZE)
+_persisted_lock = Lock()
+
+
+def _remember_persisted(key: Hashable, code_hash: str, saved_at: datetime) -> None:
+    # Сброс буфера и удаление могут завершиться в любом порядке: побеждает более поздняя версия
+    saved_at = _as_utc(saved_at)
+    with _persisted_lock:
+        current = _persisted_hashes.get(key)
+        if current is None or current[1] <= saved_at:
+            _persisted_hashes.set(key, (code_hash, saved_at))
+
+
+def save_draft(user_id: int, lesson_id: int, code: str) -> Tuple[str, bool]:
+    """
+    Принимает черновик. В базу он попадет при ближайшем сбросе буфера,
+    причем из нескольких сохранений в пределах окна запишется только последнее.
+    Возвращает хэш и признак того, что содержимое изменилось.
+    """
+    key = (user_id, lesson_id)
+    code_hash = content_hash(code)
+    pending: Optional[PendingDraft] = draft_buffer.get(key)
+    if pending is not None:
+        unchanged = pending[1] == code_hash
+    else:
+        persisted = _persisted_hashes.get(key)
+        unchanged = persisted is not None and persisted[0] == code_hash
+    if unchanged:
+        return code_hash, False
+
+    draft_buffer.put(key, (code, code_hash, datetime.now(timezone.utc)))
+    return code_hash, True
+
+
+def load_draft(db: Session, user_id: int, lesson_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Черновик с учетом еще не записанных в базу сохранений
+    """
+    pending: Optional[PendingDraft] = draft_buffer.get((user_id, lesson_id))
+    if pending is not None:
+        code, code_hash, saved_at = pending
+    else:
+        row = (
+            db.query(PracticeDraft.content, PracticeDraft.content_hash, PracticeDraft.updated_at)
+            .filter(PracticeDraft.user_id == user_id, PracticeDraft.lesson_id == lesson_id)
+            .first()
+        )
+        if row is None:
+            return None
+        _remember_persisted((user_id, lesson_id), row.content_hash, row.updated_at)
+        if row.content_hash == DELETED_HASH:
+            return None
+        code, code_hash, saved_at = decompress_code(row.content), row.content_hash, row.updated_at
+
+    return {
+        "code": code,
+        "content_hash": code_hash,
+        "size": len(code.encode("utf-8")),
+        "saved_at": saved_at
+    }
+
+
+def delete_draft(db: Session, user_id: int, lesson_id: int) -> bool:
+    """
+    Удаляет черновик: сначала из буфера, затем записывает в базу пустую строку
+    с временем удаления. Сохранения, сделанные раньше и еще не записанные
+    (в том числе в уже начатом сбросе или в буфере другого воркера), ее не перезапишут.
+    Транзакцию фиксирует вызывающий код.
+    """
+    key = (user_id, lesson_id)
+    deleted_at = datetime.now(timezone.utc)
+    pending = draft_buffer.pop(key)
+
+    existing = (
+        db.query(PracticeDraft.content_hash)
+        .filter(PracticeDraft.user_id == user_id, PracticeDraft.lesson_id == lesson_id)
+        .first()
+    )
+    if existing is None and not db.query(Lesson.id).filter(Lesson.id == lesson_id).first():
+        return pending is not None
+
+    db.execute(_upsert([{
+        "user_id": user_id,
+        "lesson_id": lesson_id,
+        "content": compress_code(""),
+        "content_hash": DELETED_HASH,
+        "size": 0,
+        "updated_at": deleted_at
+    }]))
+    _remember_persisted(key, DELETED_HASH, deleted_at)
+    return pending is not None or (existing is not None and existing.content_hash != DELETED_HASH)
@@ -0,0 +1,34 @@
+from typing import List
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.courses.models import CourseStatus, UserCourse
+
+
+def enroll_users(db: Session, course_id: int, user_ids: List[int]) -> List[int]:
+    """
+    Записывает пользователей на курс одним многострочным INSERT ... ON CONFLICT DO NOTHING.
+    Возвращает идентификаторы пользователей, которые действительно были записаны;
+    уже записанные пропускаются уникальным ограничением uq_user_course.
+    Транзакцию фиксирует вызывающий код.
+    """
+    if not user_ids:
+        return []
+
+    statement = (
+        insert(UserCourse)
+        .values([
+            {
+                "user_id": user_id,
+                "course_id": course_id,
+                "status": CourseStatus.IN_PROGRESS,
+                "progress": 0,
+                "earned_xp": 0
+            }
+            for user_id in user_ids
+        ])
+        .on_conflict_do_nothing(index_elements=[UserCourse.user_id, UserCourse.course_id])
+        .returning(UserCourse.user_id)
+    )
+    return list(db.execute(statement).scalars())
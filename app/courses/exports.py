@@ -0,0 +1,106 @@
+import csv
+import io
+from typing import Any, Iterator, Tuple
+
+from sqlalchemy import and_, select
+
+from app.auth.models import User
+from app.config import settings
+from app.courses.models import Lesson, Module, UserCourse, UserLessonProgress
+from app.database import SessionLocal
+from app.utils.serialization import dump_json
+
+# Колонки выгрузки: одна строка на пару (ученик, урок)
+PROGRESS_COLUMNS = (
+    "user_id", "nickname", "email", "course_status", "course_progress", "course_earned_xp",
+    "module_id", "module_order", "lesson_id", "lesson_order", "lesson_title",
+    "intro_completed", "video_completed", "practice_completed", "test_completed",
+    "test_score", "earned_xp", "completed", "updated_at"
+)
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _progress_rows(course_id: int) -> Iterator[Tuple[Any, ...]]:
+    """
+    Строки прогресса всех учеников курса через серверный курсор:
+    в памяти одновременно держится не больше EXPORT_CHUNK_ROWS строк.
+    Выгрузка читается уже после возврата из обработчика, поэтому курсор
+    открывается в своей сессии, а не в сессии запроса.
+    """
+    statement = (
+        select(
+            User.id, User.nickname, User.email,
+            UserCourse.status, UserCourse.progress, UserCourse.earned_xp,
+            Module.id, Module.order, Lesson.id, Lesson.order, Lesson.title,
+            UserLessonProgress.intro_completed,
+            UserLessonProgress.video_completed,
+            UserLessonProgress.practice_completed,
+            UserLessonProgress.test_completed,
+            UserLessonProgress.test_score,
+            UserLessonProgress.earned_xp,
+            UserLessonProgress.completed,
+            UserLessonProgress.updated_at
+        )
+        .select_from(UserCourse)
+        .join(User, User.id == UserCourse.user_id)
+        .join(Module, Module.course_id == UserCourse.course_id)
+        .join(Lesson, Lesson.module_id == Module.id)
+        .outerjoin(UserLessonProgress, and_(
+            UserLessonProgress.user_id == UserCourse.user_id,
+            UserLessonProgress.lesson_id == Lesson.id
+        ))
+        .where(UserCourse.course_id == course_id)
+        .order_by(User.id, Module.order, Module.id, Lesson.order, Lesson.id)
+        .execution_options(yield_per=settings.EXPORT_CHUNK_ROWS)
+    )
+    db = SessionLocal()
+    try:
+        for partition in db.execute(statement).partitions():
+            for (user_id, nickname, email, status, course_progress, course_earned_xp,
+                 module_id, module_order, lesson_id, lesson_order, lesson_title,
+                 intro_completed, video_completed, practice_completed, test_completed,
+                 test_score, earned_xp, completed, updated_at) in partition:
+                yield (
+                    user_id, nickname, email, status.value if status else None, course_progress, course_earned_xp,
+                    module_id, module_order, lesson_id, lesson_order, lesson_title,
+                    # Урок без записи о прогрессе - не начат
+                    bool(intro_completed), bool(video_completed), bool(practice_completed), bool(test_completed),
+                    test_score, earned_xp or 0, bool(completed),
+                    updated_at.isoformat() if updated_at else None
+                )
+    finally:
+        db.close()
+
+
+def iter_progress_csv(course_id: int) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(PROGRESS_COLUMNS)
+    for position, row in enumerate(_progress_rows(course_id), 1):
+        writer.writerow(row)
+        if position % settings.EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def iter_progress_ndjson(course_id: int) -> Iterator[bytes]:
+    chunk = []
+    for row in _progress_rows(course_id):
+        chunk.append(dump_json(dict(zip(PROGRESS_COLUMNS, row))))
+        if len(chunk) == settings.EXPORT_CHUNK_ROWS:
+            yield b"\n".join(chunk) + b"\n"
+            chunk = []
+    if chunk:
+        yield b"\n".join(chunk) + b"\n"
+
+
+EXPORTERS = {
+    "csv": iter_progress_csv,
+    "ndjson": iter_progress_ndjson,
+}
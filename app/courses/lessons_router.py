@@ -1,51 +1,284 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import and_, func
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
-from typing import List, Any
+from typing import List, Any, Dict, Optional, Tuple
+from collections import defaultdict
 from datetime import datetime
+import asyncio
+import hashlib
+import logging
 
-from app.database import get_db
-from app.auth.jwt import get_current_user
+from app.config import settings
+from app.database import SessionLocal, get_db
+from app.auth.jwt import get_current_user, get_current_user_id
 from app.auth.models import User
+from app.analytics.funnels import funnel_state, track_funnel
+from app.certificates.service import issue_for_completed_courses
 from app.courses.models import (
     Course, Module, Lesson, UserLessonProgress,
     TestQuestion, TestOption, UserTestAnswer, 
-    LessonComment, CommentLike, LessonReaction
+    LessonComment, CommentLike, LessonReaction, LessonReactionRemoval
 )
 from app.courses.schemas import (
     LessonResponse, LessonProgressUpdate, TestSubmission,
-    CommentCreate, CommentResponse, TestResult
+    CommentCreate, CommentResponse, TestResult, VideoHeartbeat, VideoState,
+    PracticeDraftSave, PracticeDraftSaved, PracticeDraftResponse
 )
+from app.courses.drafts import delete_draft, load_draft, save_draft
+from app.courses.progress import complete_lesson
+from app.courses.video import get_video_state, record_heartbeat
+from app.realtime.broker import broker
+from app.realtime.presence import presence
+from app.sandbox.service import SandboxBusy, sandbox
+from app.users.activity import record_activity
+from app.utils.cache import LRUCache
+from app.utils.compression import precompressed
+from app.utils.etag import make_etag, etag_matches, not_modified, with_etag
+from app.utils.serialization import FastJSONResponse, dump_json, typed_response
+from app.utils.versions import LEADERBOARD_VERSION, bump_version
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/lessons",
     tags=["Уроки"],
 )
 
-@router.get("/{lesson_id}", response_model=dict)
+# Поля прогресса, которые входят в ответ get_lesson
+PROGRESS_FIELDS = (
+    "intro_completed", "video_completed", "practice_completed",
+    "test_completed", "test_score", "earned_xp", "completed"
+)
+
+# Секции урока, которые можно запросить через параметр fields
+LESSON_SECTIONS = ("intro", "video", "practice", "test", "progress")
+
+# Колонки таблицы lessons, которые нужны для каждой секции
+LESSON_SECTION_COLUMNS = {
+    "intro": (Lesson.intro_title, Lesson.intro_content),
+    "video": (Lesson.video_url, Lesson.video_description),
+    "practice": (Lesson.practice_instructions, Lesson.practice_code_template, Lesson.practice_language),
+}
+
+# Хэши содержимого уроков по (lesson_id, версия урока, набор секций)
+_lesson_content_hashes = LRUCache(4096)
+
+def _lesson_content_hash(lesson_data: dict) -> str:
+    """
+    Хэш содержимого урока без персонального прогресса пользователя
+    """
+    content = {key: value for key, value in lesson_data.items() if key != "progress"}
+    return hashlib.blake2b(dump_json(content), digest_size=16).hexdigest()
+
+def _parse_sections(fields: Optional[str]) -> Tuple[str, ...]:
+    """
+    Разбирает параметр fields в кортеж секций урока в каноническом порядке
+    """
+    if not fields:
+        return LESSON_SECTIONS
+    requested = {item.strip() for item in fields.split(",") if item.strip()}
+    unknown = requested - set(LESSON_SECTIONS)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Неизвестные секции урока: {', '.join(sorted(unknown))}. "
+                   f"Допустимые значения: {', '.join(LESSON_SECTIONS)}"
+        )
+    return tuple(section for section in LESSON_SECTIONS if section in requested)
+
+def _assemble_lessons(
+    db: Session,
+    lesson_ids: List[int],
+    user_id: int,
+    sections: Tuple[str, ...] = LESSON_SECTIONS
+) -> Dict[int, dict]:
+    """
+    Собирает данные уроков вместе с тестами и прогрессом пользователя.
+    Количество запросов не зависит от числа уроков и вопросов: по одному
+    запросу на уроки, вопросы, варианты ответов и прогресс.
+    Секции, которых нет в sections, не читаются из базы и не попадают в ответ.
+    Прогресс не создается - для непросмотренных уроков он равен None.
+    """
+    section_columns = [
+        column
+        for section in sections
+        for column in LESSON_SECTION_COLUMNS.get(section, ())
+    ]
+    rows = (
+        db.query(
+            Lesson.id, Lesson.title, Lesson.module_id, Lesson.xp_reward,
+            *section_columns,
+            Module.course_id, Course.title.label("course_title")
+        )
+        .outerjoin(Module, Module.id == Lesson.module_id)
+        .outerjoin(Course, Course.id == Module.course_id)
+        .filter(Lesson.id.in_(lesson_ids))
+        .all()
+    )
+    if not rows:
+        return {}
+    found_ids = [row.id for row in rows]
+    
+    questions_by_lesson = defaultdict(list)
+    if "test" in sections:
+        # Варианты ответов на все вопросы уроков одним запросом
+        options_by_question = defaultdict(list)
+        options = (
+            db.query(TestOption.question_id, TestOption.id, TestOption.text)
+            .join(TestQuestion, TestQuestion.id == TestOption.question_id)
+            .filter(TestQuestion.lesson_id.in_(found_ids))
+            .order_by(TestOption.question_id, TestOption.order)
+            .all()
+        )
+        for question_id, option_id, text in options:
+            options_by_question[question_id].append({"id": option_id, "text": text})
+        
+        questions = (
+            db.query(TestQuestion.lesson_id, TestQuestion.id, TestQuestion.question)
+            .filter(TestQuestion.lesson_id.in_(found_ids))
+            .order_by(TestQuestion.lesson_id, TestQuestion.order)
+            .all()
+        )
+        for question_lesson_id, question_id, question in questions:
+            questions_by_lesson[question_lesson_id].append({
+                "id": question_id,
+                "question": question,
+                "options": options_by_question[question_id]
+            })
+    
+    progress_by_lesson = {}
+    if "progress" in sections:
+        progress_rows = db.query(
+            UserLessonProgress.lesson_id,
+            *[getattr(UserLessonProgress, field) for field in PROGRESS_FIELDS]
+        ).filter(
+            UserLessonProgress.user_id == user_id,
+            UserLessonProgress.lesson_id.in_(found_ids)
+        )
+        for progress_lesson_id, *values in progress_rows:
+            progress_by_lesson[progress_lesson_id] = dict(zip(PROGRESS_FIELDS, values))
+    
+    lessons = {}
+    for row in rows:
+        lesson_data = {
+            "id": row.id,
+            "title": row.title,
+            "module_id": row.module_id,
+            "course_id": row.course_id,
+            "course_title": row.course_title,
+            "xp_reward": row.xp_reward
+        }
+        if "intro" in sections:
+            lesson_data["intro"] = {
+                "title": row.intro_title,
+                "content": row.intro_content
+            }
+        if "video" in sections:
+            lesson_data["video"] = {
+                "url": row.video_url,
+                "description": row.video_description
+            }
+        if "practice" in sections:
+            lesson_data["practice"] = {
+                "instructions": row.practice_instructions,
+                "codeTemplate": row.practice_code_template,
+                "language": row.practice_language
+            }
+        if "test" in sections:
+            lesson_data["test"] = questions_by_lesson[row.id]
+        if "progress" in sections:
+            lesson_data["progress"] = progress_by_lesson.get(row.id)
+        lessons[row.id] = lesson_data
+    return lessons
+
+@router.get("", response_model=List[LessonResponse], response_class=FastJSONResponse)
+def get_lessons(
+    ids: str = Query(..., description="Идентификаторы уроков через запятую, например 1,2,3"),
+    fields: Optional[str] = Query(None, description="Секции урока через запятую: intro, video, practice, test, progress"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Получить несколько уроков одним запросом (например, для офлайн-чтения).
+    Уроки возвращаются в порядке ids, несуществующие пропускаются.
+    """
+    try:
+        lesson_ids = list(dict.fromkeys(int(item) for item in ids.split(",") if item.strip()))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Параметр ids должен содержать числа через запятую"
+        )
+    if not lesson_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Не указаны идентификаторы уроков"
+        )
+    if len(lesson_ids) > settings.LESSON_BATCH_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Можно запросить не более {settings.LESSON_BATCH_MAX} уроков за раз"
+        )
+    
+    sections = _parse_sections(fields)
+    lessons = _assemble_lessons(db, lesson_ids, current_user.id, sections)
+    return typed_response(
+        List[LessonResponse],
+        [lessons[lesson_id] for lesson_id in lesson_ids if lesson_id in lessons],
+        exclude_unset=True
+    )
+
+@router.get("/{lesson_id}", response_model=LessonResponse, response_class=FastJSONResponse)
 def get_lesson(
     lesson_id: int,
+    request: Request,
+    fields: Optional[str] = Query(None, description="Секции урока через запятую: intro, video, practice, test, progress"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ) -> Any:
     """
-    Получить полную информацию об уроке, включая содержимое и тесты
+    Получить полную информацию об уроке, включая содержимое и тесты.
+    Параметр fields ограничивает ответ нужными секциями, например fields=progress,test
     """
-    # Находим урок
-    lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
-    if not lesson:
+    sections = _parse_sections(fields)
+    
+    # Версия урока и прогресс читаются одним запросом, чтобы проверить ETag до сборки урока
+    versions = (
+        db.query(
+            Lesson.created_at, Lesson.updated_at, UserLessonProgress.id,
+            *[getattr(UserLessonProgress, field) for field in PROGRESS_FIELDS]
+        )
+        .outerjoin(UserLessonProgress, and_(
+            UserLessonProgress.lesson_id == Lesson.id,
+            UserLessonProgress.user_id == current_user.id
+        ))
+        .filter(Lesson.id == lesson_id)
+        .first()
+    )
+    if not versions:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Урок не найден"
         )
     
-    # Проверяем прогресс пользователя по этому уроку
-    progress = db.query(UserLessonProgress).filter(
-        UserLessonProgress.user_id == current_user.id,
-        UserLessonProgress.lesson_id == lesson_id
-    ).first()
+    lesson_created_at, lesson_updated_at, progress_id, *progress_state = versions
+    # lessons.updated_at меняется и при изменении вопросов, вариантов ответов,
+    # названия курса и модуля урока (триггеры миграции 20250517_lesson_content_triggers)
+    lesson_version = (lesson_id, lesson_updated_at or lesson_created_at, sections)
+    if "progress" not in sections:
+        # Прогресс не входит в ответ, поэтому не влияет и на ETag
+        progress_state = []
+    content_hash = _lesson_content_hashes.get(lesson_version)
+    if content_hash and progress_id:
+        etag = make_etag(content_hash, sections, *progress_state)
+        if etag_matches(request, etag):
+            return not_modified(request, etag)
     
     # Если прогресса нет, создаем его
-    if not progress:
+    if not progress_id:
         progress = UserLessonProgress(
             user_id=current_user.id,
             lesson_id=lesson_id,
@@ -57,67 +290,28 @@ def get_lesson(
             completed=False
         )
         db.add(progress)
+        track_funnel(db, lesson_id, None, progress)
         db.commit()
-        db.refresh(progress)
     
-    # Получаем тестовые вопросы для урока
-    test_questions = []
-    db_questions = db.query(TestQuestion).filter(
-        TestQuestion.lesson_id == lesson_id
-    ).order_by(TestQuestion.order).all()
+    lesson_data = _assemble_lessons(db, [lesson_id], current_user.id, sections).get(lesson_id)
+    if not lesson_data:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Урок не найден"
+        )
     
-    for question in db_questions:
-        options = db.query(TestOption).filter(
-            TestOption.question_id == question.id
-        ).order_by(TestOption.order).all()
-        
-        test_questions.append({
-            "id": question.id,
-            "question": question.question,
-            "options": [{"id": opt.id, "text": opt.text} for opt in options]
-        })
+    content_hash = _lesson_content_hash(lesson_data)
+    _lesson_content_hashes.set(lesson_version, content_hash)
+    if "progress" in sections:
+        progress_state = [lesson_data["progress"][field] for field in PROGRESS_FIELDS]
+    etag = make_etag(content_hash, sections, *progress_state)
     
-    # Получаем информацию о модуле
-    module = db.query(Module).filter(Module.id == lesson.module_id).first()
-    
-    # Получаем информацию о курсе
-    course = None
-    if module:
-        course = db.query(Course).filter(Course.id == module.course_id).first()
-    
-    # Формируем ответ с данными урока и прогрессом
-    lesson_data = {
-        "id": lesson.id,
-        "title": lesson.title,
-        "module_id": lesson.module_id,
-        "course_id": module.course_id if module else None,
-        "course_title": course.title if course else None,
-        "intro": {
-            "title": lesson.intro_title,
-            "content": lesson.intro_content
-        },
-        "video": {
-            "url": lesson.video_url,
-            "description": lesson.video_description
-        },
-        "practice": {
-            "instructions": lesson.practice_instructions,
-            "codeTemplate": lesson.practice_code_template
-        },
-        "test": test_questions,
-        "xp_reward": lesson.xp_reward,
-        "progress": {
-            "intro_completed": progress.intro_completed,
-            "video_completed": progress.video_completed,
-            "practice_completed": progress.practice_completed,
-            "test_completed": progress.test_completed,
-            "test_score": progress.test_score,
-            "earned_xp": progress.earned_xp,
-            "completed": progress.completed
-        }
-    }
-    
-    return lesson_data
+    # Без прогресса тело ответа одинаково для всех пользователей: сжатая версия
+    # кэшируется по хэшу содержимого и сжимается один раз. Ответ с прогрессом
+    # персональный и сжимается на лету без кэширования.
+    cache_key = None if "progress" in sections else (content_hash, sections)
+    response = typed_response(LessonResponse, lesson_data, exclude_unset=True)
+    return precompressed(request, with_etag(response, etag), cache_key)
 
 @router.post("/{lesson_id}/progress", status_code=status.HTTP_200_OK)
 def update_lesson_progress(
@@ -142,6 +336,7 @@ def update_lesson_progress(
         UserLessonProgress.user_id == current_user.id,
         UserLessonProgress.lesson_id == lesson_id
     ).first()
+    funnel_before = funnel_state(progress)
     
     if not progress:
         progress = UserLessonProgress(
@@ -155,6 +350,7 @@ def update_lesson_progress(
             completed=False
         )
         db.add(progress)
+    was_completed = bool(progress.completed)
     
     # Обновляем поля прогресса
     if progress_data.section == "intro" and progress_data.completed:
@@ -177,23 +373,20 @@ def update_lesson_progress(
         if not progress.test_completed:  # Если раньше не было завершено
             progress.earned_xp += progress_data.xp or 50
     
-    # Проверяем, завершен ли весь урок
-    if progress.intro_completed and progress.video_completed and progress.practice_completed and progress.test_completed:
-        progress.completed = True
-        
-        # Если урок только что завершен, начисляем дополнительный XP
-        if not progress.completed:
-            # Дополнительный бонус за завершение
-            bonus_xp = 15
-            progress.earned_xp += bonus_xp
-            
-            # Обновляем общий XP пользователя
-            current_user.xp += progress.earned_xp
-            db.add(current_user)
+    # Проверяем, завершен ли весь урок; при завершении начисляется дополнительный XP
+    if complete_lesson(db, progress, current_user):
+        db.flush()
+        bump_version(db, LEADERBOARD_VERSION)
     
+    track_funnel(db, lesson_id, funnel_before, progress)
+    record_activity(db, current_user.id)
     db.commit()
     db.refresh(progress)
     
+    # Завершение урока может завершить весь курс
+    if progress.completed and not was_completed:
+        issue_for_completed_courses(db, current_user.id, lesson.module.course_id)
+    
     return {
         "success": True,
         "progress": {
@@ -206,32 +399,105 @@ def update_lesson_progress(
         }
     }
 
-@router.post("/{lesson_id}/check-code", status_code=status.HTTP_200_OK)
-def check_practice_code(
+@router.post("/{lesson_id}/video/heartbeat", status_code=status.HTTP_202_ACCEPTED)
+def video_heartbeat(
+    lesson_id: int,
+    heartbeat: VideoHeartbeat,
+    user_id: int = Depends(get_current_user_id)
+) -> Any:
+    """
+    Сигнал плеера с текущей позицией. Позиции накапливаются в памяти
+    и записываются в базу пакетами, видео отмечается просмотренным автоматически.
+    """
+    record_heartbeat(
+        user_id, lesson_id,
+        min(heartbeat.position_seconds, heartbeat.duration_seconds),
+        heartbeat.duration_seconds
+    )
+    return {"accepted": True}
+
+@router.get("/{lesson_id}/video", response_model=VideoState)
+def get_video_progress(
     lesson_id: int,
-    code_data: dict,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    user_id: int = Depends(get_current_user_id)
 ) -> Any:
     """
-    Проверка кода практического задания
+    Позиция для продолжения просмотра и доля просмотренного видео
     """
-    # Находим урок
+    return get_video_state(db, user_id, lesson_id)
+
+@router.put("/{lesson_id}/draft", response_model=PracticeDraftSaved, status_code=status.HTTP_202_ACCEPTED)
+def save_practice_draft(
+    lesson_id: int,
+    draft: PracticeDraftSave,
+    user_id: int = Depends(get_current_user_id)
+) -> Any:
+    """
+    Автосохранение черновика кода практики. Сохранения накапливаются в памяти:
+    из частых сохранений в пределах DRAFT_FLUSH_SECONDS в базу попадет только последнее,
+    а сохранение без изменений не приводит к записи вовсе.
+    """
+    if len(draft.code.encode()) > settings.DRAFT_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="Слишком большой объем кода"
+        )
+
+    code_hash, changed = save_draft(user_id, lesson_id, draft.code)
+    return {"content_hash": code_hash, "changed": changed}
+
+@router.get("/{lesson_id}/draft", response_model=PracticeDraftResponse)
+def get_practice_draft(
+    lesson_id: int,
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id)
+) -> Any:
+    """
+    Сохраненный черновик кода практики. Если черновика нет, возвращается шаблон урока.
+    """
+    draft = load_draft(db, user_id, lesson_id)
+    if draft is not None:
+        return draft
+
+    lesson = db.query(Lesson.practice_code_template).filter(Lesson.id == lesson_id).first()
+    if not lesson:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Урок не найден"
+        )
+    code = lesson.practice_code_template or ""
+    return {"code": code, "size": len(code.encode()), "is_template": True}
+
+@router.delete("/{lesson_id}/draft", status_code=status.HTTP_200_OK)
+def reset_practice_draft(
+    lesson_id: int,
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id)
+) -> Any:
+    """
+    Удаление черновика: редактор вернется к шаблону урока
+    """
+    deleted = delete_draft(db, user_id, lesson_id)
+    db.commit()
+    return {"deleted": deleted}
+
+def _find_lesson(db: Session, lesson_id: int) -> Lesson:
     lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
     if not lesson:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Урок не найден"
         )
-    
-    # В реальном проекте здесь должна быть логика проверки кода
-    # Сейчас просто принимаем любой код как правильный
+    return lesson
 
+def _complete_practice(db: Session, lesson_id: int, current_user: User) -> None:
     # Находим запись о прогрессе
     progress = db.query(UserLessonProgress).filter(
         UserLessonProgress.user_id == current_user.id,
         UserLessonProgress.lesson_id == lesson_id
     ).first()
+    funnel_before = funnel_state(progress)
     
     if not progress:
         progress = UserLessonProgress(
@@ -250,8 +516,69 @@ def check_practice_code(
     if not progress.practice_completed:
         progress.practice_completed = True
         progress.earned_xp += 25
-        db.commit()
-        db.refresh(progress)
+    track_funnel(db, lesson_id, funnel_before, progress)
+    record_activity(db, current_user.id)
+    db.commit()
+
+@router.post("/{lesson_id}/check-code", status_code=status.HTTP_200_OK)
+async def check_practice_code(
+    lesson_id: int,
+    code_data: dict,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Проверка кода практического задания.
+    Обработчик асинхронный: ожидание песочницы не занимает поток пула,
+    запросы к базе выполняются в пуле потоков.
+    """
+    # Находим урок
+    lesson = await run_in_threadpool(_find_lesson, db, lesson_id)
+    
+    # Код проверяется в песочнице тестами урока.
+    # Уроки без тестов по-прежнему принимают любой код.
+    if lesson.practice_tests and lesson.practice_language:
+        code = code_data.get("code")
+        if not isinstance(code, str):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Не передан код для проверки"
+            )
+        if len(code.encode()) > settings.SANDBOX_MAX_CODE_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail="Слишком большой объем кода"
+            )
+        
+        try:
+            result = await sandbox.check(lesson_id, lesson.practice_language, lesson.practice_tests, code)
+        except SandboxBusy:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Слишком много проверок, попробуйте через несколько секунд",
+                headers={"Retry-After": str(settings.SANDBOX_WALL_SECONDS)}
+            )
+        except Exception:
+            logger.exception(f"Sandbox check failed for lesson {lesson_id}")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Проверка кода временно недоступна",
+                headers={"Retry-After": str(settings.SANDBOX_WALL_SECONDS)}
+            )
+        
+        if not result["passed"]:
+            return {
+                "success": False,
+                "message": (
+                    "Превышено время выполнения." if result["timed_out"]
+                    else "Программа превысила ограничения ресурсов." if result["killed"]
+                    else "Код не прошел проверку."
+                ),
+                "output": result["output"],
+                "error": result["error"]
+            }
+
+    await run_in_threadpool(_complete_practice, db, lesson_id, current_user)
     
     return {
         "success": True,
@@ -315,6 +642,7 @@ def submit_test(
         UserLessonProgress.user_id == current_user.id,
         UserLessonProgress.lesson_id == lesson_id
     ).first()
+    funnel_before = funnel_state(progress)
     
     if not progress:
         progress = UserLessonProgress(
@@ -328,6 +656,7 @@ def submit_test(
             completed=False
         )
         db.add(progress)
+    was_completed = bool(progress.completed)
     
     # Отмечаем тест как пройденный и начисляем XP
     progress.test_completed = passed
@@ -345,10 +674,17 @@ def submit_test(
         # Обновляем общий XP пользователя
         current_user.xp += progress.earned_xp
         db.add(current_user)
+        bump_version(db, LEADERBOARD_VERSION)
     
+    track_funnel(db, lesson_id, funnel_before, progress)
+    record_activity(db, current_user.id)
     db.commit()
     db.refresh(progress)
     
+    # Завершение урока может завершить весь курс
+    if progress.completed and not was_completed:
+        issue_for_completed_courses(db, current_user.id, lesson.module.course_id)
+    
     return {
         "score": correct_answers,
         "total": total_questions,
@@ -356,7 +692,7 @@ def submit_test(
         "message": "Тест успешно пройден!" if passed else "Для прохождения теста необходимо правильно ответить минимум на 70% вопросов."
     }
 
-@router.post("/{lesson_id}/comments", response_model=CommentResponse)
+@router.post("/{lesson_id}/comments", response_model=CommentResponse, response_class=FastJSONResponse)
 def add_comment(
     lesson_id: int,
     comment_data: CommentCreate,
@@ -386,21 +722,155 @@ def add_comment(
     db.commit()
     db.refresh(new_comment)
     
+    response = typed_response(CommentResponse, _comment_event_data(new_comment, current_user.nickname))
+    # Рассылаем комментарий подписчикам потока урока
+    broker.publish(("comments", lesson_id), new_comment.id, response.body)
+    return response
+
+def _comment_event_data(comment: LessonComment, nickname: str) -> dict:
     return {
-        "id": new_comment.id,
-        "text": new_comment.text,
+        "id": comment.id,
+        "text": comment.text,
         "user": {
-            "id": current_user.id,
-            "nickname": current_user.nickname
+            "id": comment.user_id,
+            "nickname": nickname
         },
-        "created_at": new_comment.created_at,
+        "created_at": comment.created_at,
         "likes_count": 0,
-        "parent_id": new_comment.parent_id
+        "parent_id": comment.parent_id
     }
 
-@router.get("/{lesson_id}/comments", response_model=List[CommentResponse])
+def _load_comment_events(lesson_id: int, last_event_id: Optional[int]) -> Optional[List[Tuple[int, bytes]]]:
+    """
+    Проверяет урок и читает из базы комментарии после last_event_id.
+    Возвращает None, если урока нет.
+    """
+    db = SessionLocal()
+    try:
+        if not db.query(Lesson.id).filter(Lesson.id == lesson_id).first():
+            return None
+        if last_event_id is None:
+            return []
+        rows = (
+            db.query(LessonComment, User.nickname)
+            .join(User, User.id == LessonComment.user_id)
+            .filter(LessonComment.lesson_id == lesson_id, LessonComment.id > last_event_id)
+            .order_by(LessonComment.id)
+            .limit(settings.SSE_REPLAY_LIMIT)
+            .all()
+        )
+        return [
+            (comment.id, typed_response(CommentResponse, _comment_event_data(comment, nickname)).body)
+            for comment, nickname in rows
+        ]
+    finally:
+        db.close()
+
+def _sse_event(event_id: int, data: bytes) -> bytes:
+    return b"id: %d\nevent: comment\ndata: %s\n\n" % (event_id, data)
+
+@router.post("/{lesson_id}/presence")
+async def presence_heartbeat(
+    lesson_id: int,
+    user_id: int = Depends(get_current_user_id)
+) -> Any:
+    """
+    Сигнал присутствия на уроке. Клиент отправляет его периодически
+    (чаще, чем раз в PRESENCE_WINDOW_SECONDS) и получает число пользователей на уроке.
+    """
+    return {"lesson_id": lesson_id, "count": presence.heartbeat(lesson_id, user_id)}
+
+@router.delete("/{lesson_id}/presence")
+async def presence_leave(
+    lesson_id: int,
+    user_id: int = Depends(get_current_user_id)
+) -> Any:
+    """
+    Уход с урока, чтобы не ждать истечения окна присутствия
+    """
+    presence.leave(lesson_id, user_id)
+    return {"lesson_id": lesson_id, "count": presence.count(lesson_id)}
+
+@router.get("/{lesson_id}/presence")
+async def presence_count(lesson_id: int) -> Any:
+    """
+    Сколько пользователей сейчас на уроке
+    """
+    return {"lesson_id": lesson_id, "count": presence.count(lesson_id)}
+
+@router.get("/{lesson_id}/comments/stream")
+async def stream_lesson_comments(
+    lesson_id: int,
+    last_event_id: Optional[int] = Header(None),
+    user_id: int = Depends(get_current_user_id)
+) -> Any:
+    """
+    Поток новых комментариев урока (Server-Sent Events).
+    При переподключении пропущенные комментарии дочитываются по заголовку Last-Event-ID:
+    из буфера в памяти, а если его не хватает - из базы.
+    """
+    topic = ("comments", lesson_id)
+    subscription = broker.subscribe(topic)
+    if subscription is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Слишком много подключений, попробуйте позже",
+            headers={"Retry-After": "30"}
+        )
+    
+    # Подписка оформляется до чтения пропущенного, чтобы не потерять события между чтением и подпиской
+    backlog = broker.replay(topic, last_event_id) if last_event_id is not None else []
+    try:
+        # Буфер в памяти не покрывает пропущенное - дочитываем из базы
+        from_db = await run_in_threadpool(
+            _load_comment_events, lesson_id, last_event_id if backlog is None else None
+        )
+    except BaseException:
+        broker.unsubscribe(subscription)
+        raise
+    if from_db is None:
+        broker.unsubscribe(subscription)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Урок не найден"
+        )
+    if backlog is None:
+        backlog = from_db
+    
+    async def events():
+        sent_id = last_event_id or 0
+        try:
+            yield b"retry: 3000\n\n"
+            for event_id, data in backlog:
+                sent_id = event_id
+                yield _sse_event(event_id, data)
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), settings.SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": ping\n\n"
+                    continue
+                if event is None:
+                    # Клиент не успевал читать события; переподключится с Last-Event-ID
+                    return
+                event_id, data = event
+                if event_id <= sent_id:
+                    continue
+                sent_id = event_id
+                yield _sse_event(event_id, data)
+        finally:
+            broker.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/{lesson_id}/comments", response_model=List[CommentResponse], response_class=FastJSONResponse)
 def get_lesson_comments(
     lesson_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ) -> Any:
@@ -415,6 +885,23 @@ def get_lesson_comments(
             detail="Урок не найден"
         )
     
+    # Водяной знак ветки: количество и максимальные id/updated_at комментариев и лайков
+    comments_watermark = db.query(
+        func.count(LessonComment.id),
+        func.max(LessonComment.id),
+        func.max(LessonComment.updated_at)
+    ).filter(LessonComment.lesson_id == lesson_id).first()
+    likes_watermark = db.query(
+        func.count(CommentLike.id),
+        func.max(CommentLike.id)
+    ).join(LessonComment, CommentLike.comment_id == LessonComment.id).filter(
+        LessonComment.lesson_id == lesson_id
+    ).first()
+    
+    etag = make_etag("comments", lesson_id, *comments_watermark, *likes_watermark)
+    if etag_matches(request, etag):
+        return not_modified(request, etag)
+    
     # Получаем комментарии к уроку
     comments = db.query(LessonComment).filter(
         LessonComment.lesson_id == lesson_id,
@@ -470,7 +957,7 @@ def get_lesson_comments(
             "replies": replies_data
         })
     
-    return result
+    return with_etag(typed_response(List[CommentResponse], result), etag)
 
 @router.post("/{lesson_id}/like", status_code=status.HTTP_200_OK)
 def like_lesson(
@@ -606,6 +1093,12 @@ def remove_lesson_reaction(
     
     if reaction:
         db.delete(reaction)
+        # Строки реакции больше нет, поэтому синхронизация узнает об удалении по отметке
+        statement = insert(LessonReactionRemoval).values(lesson_id=lesson_id, user_id=current_user.id)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[LessonReactionRemoval.lesson_id, LessonReactionRemoval.user_id],
+            set_={"updated_at": func.now()}
+        ))
         db.commit()
     
     # Подсчитываем общее количество лайков и дизлайков
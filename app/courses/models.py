@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, Boolean, DateTime, Enum
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Boolean, DateTime, Enum, Float, Index, LargeBinary, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship, backref
 import enum
@@ -29,7 +29,7 @@ class UserCourse(Base):
     __tablename__ = "user_courses"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
     course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"), nullable=False)
     status = Column(Enum(CourseStatus), default=CourseStatus.IN_PROGRESS, nullable=False)
     progress = Column(Integer, default=0)  # Прогресс в процентах
@@ -41,6 +41,11 @@ class UserCourse(Base):
     course = relationship("Course", back_populates="users")
     user = relationship("User", backref="courses")
 
+    __table_args__ = (
+        # Пользователь записывается на курс не более одного раза
+        UniqueConstraint("user_id", "course_id", name="uq_user_course"),
+    )
+
 class Module(Base):
     __tablename__ = "modules"
     
@@ -56,6 +61,11 @@ class Module(Base):
     course = relationship("Course", back_populates="modules")
     lessons = relationship("Lesson", back_populates="module", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Модули курса по порядку
+        Index("ix_modules_course_id_order", "course_id", "order"),
+    )
+
 class Lesson(Base):
     __tablename__ = "lessons"
     
@@ -68,10 +78,14 @@ class Lesson(Base):
     video_description = Column(Text, nullable=True)
     practice_instructions = Column(Text, nullable=True)
     practice_code_template = Column(Text, nullable=True)
+    practice_language = Column(String, nullable=True)  # javascript или python
+    practice_tests = Column(Text, nullable=True)  # Тесты, которые выполняются после кода ученика
     order = Column(Integer, index=True, nullable=False)  # Порядок урока в модуле
     xp_reward = Column(Integer, nullable=False, default=0)  # XP за прохождение урока
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Версия содержимого урока: в PostgreSQL обновляется триггерами и при изменении вопросов,
+    # вариантов ответов, названия курса и модуля (миграция 20250517_lesson_content_triggers)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Связи с другими таблицами
     module = relationship("Module", back_populates="lessons")
@@ -80,6 +94,13 @@ class Lesson(Base):
     comments = relationship("LessonComment", back_populates="lesson", cascade="all, delete-orphan")
     reactions = relationship("LessonReaction", back_populates="lesson", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Уроки модуля по порядку
+        Index("ix_lessons_module_id_order", "module_id", "order"),
+        # Измененные уроки для синхронизации
+        Index("ix_lessons_module_id_updated_at", "module_id", "updated_at"),
+    )
+
 class UserLessonProgress(Base):
     __tablename__ = "user_lesson_progress"
     
@@ -100,9 +121,43 @@ class UserLessonProgress(Base):
     user = relationship("User", backref="lesson_progress")
     
     __table_args__ = (
+        # Измененный прогресс для синхронизации
+        Index("ix_user_lesson_progress_user_id_updated_at", "user_id", "updated_at"),
+        # Уникальное ограничение заодно служит индексом для поиска прогресса по (user_id, lesson_id)
+        UniqueConstraint("user_id", "lesson_id", name="uq_user_lesson"),
         {"sqlite_autoincrement": True},
     )
 
+class VideoWatchProgress(Base):
+    __tablename__ = "video_watch_progress"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    lesson_id = Column(Integer, ForeignKey("lessons.id", ondelete="CASCADE"), index=True, nullable=False)
+    position_seconds = Column(Float, nullable=False, default=0)  # Где остановился просмотр
+    duration_seconds = Column(Float, nullable=False, default=0)
+    watched_seconds = Column(Float, nullable=False, default=0)  # Сколько видео реально просмотрено
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint("user_id", "lesson_id", name="uq_video_watch_user_lesson"),
+    )
+
+class PracticeDraft(Base):
+    __tablename__ = "practice_drafts"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    lesson_id = Column(Integer, ForeignKey("lessons.id", ondelete="CASCADE"), index=True, nullable=False)
+    content = Column(LargeBinary, nullable=False)  # Код черновика, сжатый zlib
+    content_hash = Column(String(64), nullable=False)  # sha256 исходного текста
+    size = Column(Integer, nullable=False)  # Размер исходного текста в байтах
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint("user_id", "lesson_id", name="uq_practice_draft_user_lesson"),
+    )
+
 class TestQuestion(Base):
     __tablename__ = "test_questions"
     
@@ -129,6 +184,11 @@ class TestOption(Base):
     # Связи с другими таблицами
     question = relationship("TestQuestion", back_populates="options")
     user_answers = relationship("UserTestAnswer", back_populates="selected_option")
+    
+    __table_args__ = (
+        # Поиск правильного варианта ответа при проверке теста
+        Index("ix_test_options_question_id_is_correct", "question_id", "is_correct"),
+    )
 
 class UserTestAnswer(Base):
     __tablename__ = "user_test_answers"
@@ -158,7 +218,7 @@ class LessonComment(Base):
     text = Column(Text, nullable=False)
     parent_id = Column(Integer, ForeignKey("lesson_comments.id", ondelete="CASCADE"), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Связи с другими таблицами
     lesson = relationship("Lesson", back_populates="comments")
@@ -166,6 +226,11 @@ class LessonComment(Base):
     # Исправленное определение отношения для вложенных комментариев
     replies = relationship("LessonComment", backref=backref("parent", remote_side=[id]))
     likes = relationship("CommentLike", back_populates="comment", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        # Новые и измененные комментарии для синхронизации
+        Index("ix_lesson_comments_lesson_id_updated_at", "lesson_id", "updated_at"),
+    )
 
 class CommentLike(Base):
     __tablename__ = "comment_likes"
@@ -191,16 +256,35 @@ class LessonReaction(Base):
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
     is_like = Column(Boolean, nullable=False)  # True для лайка, False для дизлайка
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Связи с другими таблицами
     lesson = relationship("Lesson", back_populates="reactions")
     user = relationship("User", backref="lesson_reactions")
     
     __table_args__ = (
+        # Подсчет лайков и дизлайков урока
+        Index("ix_lesson_reactions_lesson_id_is_like", "lesson_id", "is_like"),
+        # Измененные реакции для синхронизации
+        Index("ix_lesson_reactions_lesson_id_updated_at", "lesson_id", "updated_at"),
         {"sqlite_autoincrement": True},
     )
 
+class LessonReactionRemoval(Base):
+    __tablename__ = "lesson_reaction_removals"
+    
+    # Отметка об удаленной реакции: по ней синхронизация заново отдает счетчики урока
+    id = Column(Integer, primary_key=True, index=True)
+    lesson_id = Column(Integer, ForeignKey("lessons.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    
+    __table_args__ = (
+        UniqueConstraint("lesson_id", "user_id", name="uq_lesson_reaction_removal"),
+        # Удаленные реакции для синхронизации
+        Index("ix_lesson_reaction_removals_lesson_id_updated_at", "lesson_id", "updated_at"),
+    )
+
 class Certificate(Base):
     __tablename__ = "certificates"
     
@@ -217,5 +301,6 @@ class Certificate(Base):
     course = relationship("Course", backref="certificates")
     
     __table_args__ = (
+        UniqueConstraint("user_id", "course_id", name="uq_user_course_certificate"),
         {"sqlite_autoincrement": True},
     )
\ No newline at end of file
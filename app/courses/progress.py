@@ -0,0 +1,30 @@
+from sqlalchemy.orm import Session
+
+from app.auth.models import User
+from app.courses.models import UserLessonProgress
+
+# Дополнительный бонус за завершение урока
+COMPLETION_BONUS_XP = 15
+
+
+def complete_lesson(db: Session, progress: UserLessonProgress, user: User) -> bool:
+    """
+    Отмечает урок завершенным, если пройдены все разделы: начисляет бонус
+    и переносит XP урока в общий XP пользователя.
+    Возвращает True, если урок завершен именно этим вызовом: тогда вызывающий код
+    увеличивает версию таблицы лидеров, предварительно записав строки прогресса
+    и пользователя (db.flush), чтобы порядок блокировок везде был одинаковым.
+    Транзакцию фиксирует вызывающий код.
+    """
+    if progress.completed or not (
+        progress.intro_completed and progress.video_completed
+        and progress.practice_completed and progress.test_completed
+    ):
+        return False
+    progress.completed = True
+    progress.earned_xp += COMPLETION_BONUS_XP
+
+    # Обновляем общий XP пользователя
+    user.xp += progress.earned_xp
+    db.add(user)
+    return True
@@ -0,0 +1,319 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session, joinedload
+from typing import List, Any, Optional
+
+from app.database import get_db
+from app.auth.jwt import get_current_user, get_current_admin
+from app.auth.models import User
+from app.config import settings
+from app.courses.authoring import import_course, iter_course_export
+from app.courses.catalog import catalog, decode_cursor
+from app.courses.enrollment import enroll_users
+from app.courses.exports import EXPORTERS, EXPORT_MEDIA_TYPES
+from app.courses.models import Course, UserCourse, Module, Lesson, UserLessonProgress
+from app.courses.schemas import (
+    BulkEnrollmentRequest, BulkEnrollmentResult, CourseCatalogPage, CourseDetail,
+    CourseDocument, CourseImportResult, CourseOutline, UserCourseResponse
+)
+from app.utils.serialization import FastJSONResponse, typed_response
+
+router = APIRouter(
+    prefix="/courses",
+    tags=["Курсы"],
+)
+
+@router.get("", response_model=CourseCatalogPage, response_class=FastJSONResponse)
+def list_courses(
+    sort: str = Query("id", pattern="^(id|title)$", description="Сортировка: id или title"),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы из next_cursor"),
+    limit: int = Query(20, ge=1, le=100),
+    min_duration: Optional[int] = Query(None, ge=0),
+    max_duration: Optional[int] = Query(None, ge=0),
+    min_xp: Optional[int] = Query(None, ge=0),
+    max_xp: Optional[int] = Query(None, ge=0),
+) -> Any:
+    """
+    Каталог курсов с keyset-пагинацией. Отдается из снимка в памяти, без запросов к базе.
+    """
+    key = None
+    if cursor:
+        try:
+            key = decode_cursor(cursor)
+        except (ValueError, TypeError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Некорректный курсор"
+            )
+
+    try:
+        items, next_cursor = catalog.get().page(
+            sort, key, limit,
+            min_duration=min_duration,
+            max_duration=max_duration,
+            min_xp=min_xp,
+            max_xp=max_xp
+        )
+    except TypeError:
+        # Курсор от другой сортировки
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Некорректный курсор"
+        )
+
+    return FastJSONResponse({"items": items, "next_cursor": next_cursor})
+
+@router.post("/import", response_model=CourseImportResult, status_code=status.HTTP_201_CREATED)
+def import_course_document(
+    document: CourseDocument,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin)
+) -> Any:
+    """
+    Создание курса целиком (модули, уроки, вопросы, варианты ответов) из одного документа.
+    Все записи вставляются многострочными INSERT в одной транзакции.
+    """
+    if db.query(Course.id).filter(Course.title == document.title).first():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Курс с таким названием уже существует"
+        )
+
+    result = import_course(db, document)
+    db.commit()
+
+    # Новый курс сразу появляется в каталоге этого воркера, остальные подхватят его при проверке версии
+    catalog.rebuild(db)
+    return result
+
+@router.get("/enrolled", response_model=List[UserCourseResponse], response_class=FastJSONResponse)
+def list_enrolled_courses(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Курсы, на которые записан текущий пользователь
+    """
+    enrollments = (
+        db.query(UserCourse)
+        .options(joinedload(UserCourse.course))
+        .filter(UserCourse.user_id == current_user.id)
+        .order_by(UserCourse.started_at.desc())
+        .all()
+    )
+
+    return typed_response(List[UserCourseResponse], enrollments)
+
+@router.get("/{course_id}", response_model=CourseDetail)
+def get_course(course_id: int) -> Any:
+    """
+    Карточка курса с модулями. Отдается уже сериализованной из снимка каталога.
+    """
+    detail = catalog.get().details.get(course_id)
+    if detail is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Курс не найден"
+        )
+
+    return Response(content=detail, media_type="application/json")
+
+@router.get("/{course_id}/outline", response_model=CourseOutline, response_class=FastJSONResponse)
+def get_course_outline(
+    course_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Структура курса: модули и уроки с отметками о прохождении.
+    Собирается одним запросом вместо отдельного запроса на каждый урок.
+    """
+    course = catalog.get().courses.get(course_id)
+    if course is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Курс не найден"
+        )
+
+    rows = (
+        db.query(
+            Module.id, Module.title, Module.order,
+            Lesson.id, Lesson.title, Lesson.order, Lesson.xp_reward,
+            UserLessonProgress.intro_completed,
+            UserLessonProgress.video_completed,
+            UserLessonProgress.practice_completed,
+            UserLessonProgress.test_completed,
+            UserLessonProgress.completed
+        )
+        .outerjoin(Lesson, Lesson.module_id == Module.id)
+        .outerjoin(UserLessonProgress, and_(
+            UserLessonProgress.lesson_id == Lesson.id,
+            UserLessonProgress.user_id == current_user.id
+        ))
+        .filter(Module.course_id == course_id)
+        .order_by(Module.order, Module.id, Lesson.order, Lesson.id)
+        .all()
+    )
+
+    modules = []
+    for (module_id, module_title, module_order, lesson_id, lesson_title, lesson_order, xp_reward,
+         intro_completed, video_completed, practice_completed, test_completed, completed) in rows:
+        if not modules or modules[-1]["id"] != module_id:
+            modules.append({
+                "id": module_id,
+                "title": module_title,
+                "order": module_order,
+                "lessons": []
+            })
+        if lesson_id is None:
+            continue
+        modules[-1]["lessons"].append({
+            "id": lesson_id,
+            "title": lesson_title,
+            "order": lesson_order,
+            "xp_reward": xp_reward,
+            "intro_completed": bool(intro_completed),
+            "video_completed": bool(video_completed),
+            "practice_completed": bool(practice_completed),
+            "test_completed": bool(test_completed),
+            "completed": bool(completed)
+        })
+
+    return typed_response(CourseOutline, {
+        "course_id": course_id,
+        "title": course["title"],
+        "modules": modules
+    })
+
+def _ensure_course_exists(course_id: int) -> None:
+    if course_id not in catalog.get().courses:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Курс не найден"
+        )
+
+@router.post("/{course_id}/enroll", response_model=UserCourseResponse, response_class=FastJSONResponse)
+def enroll(
+    course_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Запись текущего пользователя на курс. Повторная запись не создает дубликат:
+    возвращается существующая запись со статусом 200 вместо 201.
+    """
+    _ensure_course_exists(course_id)
+
+    inserted = enroll_users(db, course_id, [current_user.id])
+    db.commit()
+
+    enrollment = (
+        db.query(UserCourse)
+        .options(joinedload(UserCourse.course))
+        .filter(UserCourse.user_id == current_user.id, UserCourse.course_id == course_id)
+        .one()
+    )
+    return typed_response(
+        UserCourseResponse,
+        enrollment,
+        status_code=status.HTTP_201_CREATED if inserted else status.HTTP_200_OK
+    )
+
+@router.post("/{course_id}/enrollments", response_model=BulkEnrollmentResult, response_class=FastJSONResponse)
+def bulk_enroll(
+    course_id: int,
+    payload: BulkEnrollmentRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin)
+) -> Any:
+    """
+    Массовая запись пользователей на курс по идентификаторам и/или email.
+    Пользователи находятся одним запросом, запись выполняется одним многострочным INSERT.
+    """
+    _ensure_course_exists(course_id)
+
+    user_ids = set(payload.user_ids)
+    emails = {email.strip() for email in payload.emails if email.strip()}
+    if not user_ids and not emails:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Не указаны пользователи"
+        )
+    # Один пользователь может быть указан и идентификатором, и email,
+    # поэтому до поиска ограничивается число идентификаторов, а лимит - по найденным
+    if len(user_ids) + len(emails) > 2 * settings.ENROLLMENT_BATCH_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Можно записать не более {settings.ENROLLMENT_BATCH_MAX} пользователей за раз"
+        )
+
+    conditions = []
+    if user_ids:
+        conditions.append(User.id.in_(user_ids))
+    if emails:
+        conditions.append(User.email.in_(emails))
+    found = db.query(User.id, User.email).filter(or_(*conditions)).all()
+
+    found_ids = {user_id for user_id, _ in found}
+    found_emails = {email for _, email in found}
+    not_found = [str(user_id) for user_id in sorted(user_ids - found_ids)]
+    not_found += sorted(emails - found_emails)
+
+    # Разные пользователи плюс ненайденные идентификаторы: inserted + skipped + len(not_found)
+    requested = len(found_ids) + len(not_found)
+    if requested > settings.ENROLLMENT_BATCH_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Можно записать не более {settings.ENROLLMENT_BATCH_MAX} пользователей за раз"
+        )
+
+    inserted = enroll_users(db, course_id, sorted(found_ids))
+    db.commit()
+
+    return FastJSONResponse({
+        "requested": requested,
+        "inserted": len(inserted),
+        "skipped": len(found_ids) - len(inserted),
+        "not_found": not_found
+    })
+
+@router.get("/{course_id}/export", response_model=CourseDocument)
+def export_course_document(
+    course_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin)
+) -> Any:
+    """
+    Выгрузка курса в формате импорта. Ответ отдается потоком по модулям.
+    """
+    if not db.query(Course.id).filter(Course.id == course_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Курс не найден"
+        )
+
+    return StreamingResponse(
+        iter_course_export(course_id),
+        media_type="application/json",
+        headers={"Content-Disposition": f'attachment; filename="course-{course_id}.json"'}
+    )
+
+@router.get("/{course_id}/progress/export")
+def export_course_progress(
+    course_id: int,
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="Формат выгрузки: csv или ndjson"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin)
+) -> Any:
+    """
+    Выгрузка прогресса всех учеников курса по урокам. Строки читаются из базы
+    серверным курсором и отправляются потоком, поэтому память не зависит от размера курса.
+    """
+    _ensure_course_exists(course_id)
+
+    return StreamingResponse(
+        EXPORTERS[format](course_id),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="course-{course_id}-progress.{format}"'}
+    )
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, validator
 from typing import List, Dict, Optional, Any
 from datetime import datetime
 from enum import Enum
@@ -52,6 +52,16 @@ class UserCourseResponse(BaseModel):
     class Config:
         orm_mode = True
 
+class BulkEnrollmentRequest(BaseModel):
+    user_ids: List[int] = Field(default_factory=list, description="Идентификаторы пользователей")
+    emails: List[str] = Field(default_factory=list, description="Email пользователей")
+
+class BulkEnrollmentResult(BaseModel):
+    requested: int  # Разных найденных пользователей плюс ненайденные идентификаторы и email
+    inserted: int
+    skipped: int  # Уже были записаны на курс
+    not_found: List[str]  # Идентификаторы и email, для которых не нашлось пользователя
+
 # Схемы для модулей
 class ModuleBase(BaseModel):
     title: str
@@ -75,6 +85,37 @@ class ModuleResponse(ModuleBase):
     class Config:
         orm_mode = True
 
+# Схемы для каталога курсов
+class CourseDetail(CourseResponse):
+    modules: List[ModuleResponse]
+
+class CourseCatalogPage(BaseModel):
+    items: List[CourseResponse]
+    next_cursor: Optional[str] = None
+
+# Схемы для структуры курса
+class LessonOutline(BaseModel):
+    id: int
+    title: str
+    order: int
+    xp_reward: int
+    intro_completed: bool = False
+    video_completed: bool = False
+    practice_completed: bool = False
+    test_completed: bool = False
+    completed: bool = False
+
+class ModuleOutline(BaseModel):
+    id: int
+    title: str
+    order: int
+    lessons: List[LessonOutline]
+
+class CourseOutline(BaseModel):
+    course_id: int
+    title: str
+    modules: List[ModuleOutline]
+
 # Схемы для уроков
 class LessonBase(BaseModel):
     title: str
@@ -112,6 +153,7 @@ class LessonVideo(BaseModel):
 class LessonPractice(BaseModel):
     instructions: Optional[str] = None
     codeTemplate: Optional[str] = None
+    language: Optional[str] = None
 
 class TestQuestionOption(BaseModel):
     id: int
@@ -135,10 +177,13 @@ class LessonResponse(BaseModel):
     id: int
     title: str
     module_id: int
-    intro: LessonIntro
-    video: LessonVideo
-    practice: LessonPractice
-    test: List[TestQuestion]
+    course_id: Optional[int] = None
+    course_title: Optional[str] = None
+    # Секции могут отсутствовать в ответе, если они не запрошены через fields
+    intro: Optional[LessonIntro] = None
+    video: Optional[LessonVideo] = None
+    practice: Optional[LessonPractice] = None
+    test: Optional[List[TestQuestion]] = None
     xp_reward: int
     progress: Optional[LessonProgress] = None
 
@@ -146,6 +191,31 @@ class LessonResponse(BaseModel):
         orm_mode = True
 
 # Схемы для обновления прогресса
+class VideoHeartbeat(BaseModel):
+    position_seconds: float = Field(..., ge=0, description="Текущая позиция плеера")
+    duration_seconds: float = Field(..., gt=0, description="Длительность видео")
+
+class VideoState(BaseModel):
+    position_seconds: float
+    duration_seconds: float
+    watched_seconds: float
+    watched_percent: float
+    video_completed: bool
+
+class PracticeDraftSave(BaseModel):
+    code: str = Field(..., description="Текущий код в редакторе")
+
+class PracticeDraftSaved(BaseModel):
+    content_hash: str
+    changed: bool
+
+class PracticeDraftResponse(BaseModel):
+    code: str
+    content_hash: Optional[str] = None
+    size: int
+    saved_at: Optional[datetime] = None
+    is_template: bool = False
+
 class LessonProgressUpdate(BaseModel):
     section: str = Field(..., description="Секция урока (intro, video, practice, test)")
     completed: bool = Field(..., description="Статус завершения секции")
@@ -216,4 +286,56 @@ class CertificateResponse(BaseModel):
     certificate_url: Optional[str] = None
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class CertificateVerification(BaseModel):
+    verification_code: str
+    is_valid: bool
+    issue_date: datetime
+    nickname: str
+    course_title: str
+    certificate_url: Optional[str] = None
+
+# Схемы для импорта и экспорта курса целиком.
+# Порядок модулей, уроков, вопросов и вариантов задается позицией в списке.
+class OptionDocument(BaseModel):
+    text: str = Field(..., min_length=1)
+    is_correct: bool = False
+
+class QuestionDocument(BaseModel):
+    question: str = Field(..., min_length=1)
+    options: List[OptionDocument] = Field(..., min_length=2)
+
+    @validator('options')
+    def has_correct_option(cls, v):
+        if not any(option.is_correct for option in v):
+            raise ValueError('У вопроса должен быть хотя бы один правильный вариант ответа')
+        return v
+
+class LessonDocument(BaseModel):
+    title: str = Field(..., min_length=1)
+    intro_title: Optional[str] = None
+    intro_content: Optional[str] = None
+    video_url: Optional[str] = None
+    video_description: Optional[str] = None
+    practice_instructions: Optional[str] = None
+    practice_code_template: Optional[str] = None
+    practice_language: Optional[str] = Field(None, pattern="^(javascript|python)$")
+    practice_tests: Optional[str] = None
+    xp_reward: int = Field(0, ge=0)
+    questions: List[QuestionDocument] = []
+
+class ModuleDocument(BaseModel):
+    title: str = Field(..., min_length=1)
+    description: Optional[str] = None
+    lessons: List[LessonDocument] = []
+
+class CourseDocument(CourseBase):
+    modules: List[ModuleDocument] = []
+
+class CourseImportResult(BaseModel):
+    course_id: int
+    modules: int
+    lessons: int
+    questions: int
+    options: int
@@ -0,0 +1,244 @@
+import logging
+import time
+from collections import defaultdict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from sqlalchemy import case, func, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.analytics.funnels import apply_funnel_deltas
+from app.auth.models import User
+from app.certificates.service import issue_for_completed_courses
+from app.config import settings
+from app.courses.models import Lesson, Module, UserLessonProgress, VideoWatchProgress
+from app.courses.progress import complete_lesson
+from app.database import SessionLocal
+from app.users.activity import record_activity
+from app.utils.buffer import WriteBehindBuffer
+from app.utils.cache import LRUCache
+from app.utils.versions import LEADERBOARD_VERSION, bump_version
+
+logger = logging.getLogger(__name__)
+
+# Просмотр засчитывается, если позиция сдвинулась не быстрее этой скорости воспроизведения
+MAX_PLAYBACK_RATE = 2.0
+# Допуск на неравномерность сигналов плеера, в секундах
+HEARTBEAT_SLACK = 2.0
+
+# Ожидающая записи позиция: (позиция, длительность, просмотрено с прошлого сброса)
+PendingPosition = Tuple[float, float, float]
+
+
+def _merge(previous: PendingPosition, current: PendingPosition) -> PendingPosition:
+    # Позиция и длительность - из последнего сигнала, просмотренное время накапливается
+    return current[0], current[1], previous[2] + current[2]
+
+
+def flush_video_positions(batch: Dict[Hashable, PendingPosition]) -> None:
+    """
+    Записывает накопленные позиции одним многострочным upsert и отмечает
+    видео просмотренным, если просмотрено не меньше VIDEO_COMPLETION_THRESHOLD
+    """
+    finished = []
+    db = SessionLocal()
+    try:
+        # Сигналы по несуществующим урокам или пользователям отбрасываем, чтобы не ломать весь пакет
+        lesson_ids = {lesson_id for _, lesson_id in batch}
+        user_ids = {user_id for user_id, _ in batch}
+        existing_lessons = {row[0] for row in db.query(Lesson.id).filter(Lesson.id.in_(lesson_ids))}
+        existing_users = {row[0] for row in db.query(User.id).filter(User.id.in_(user_ids))}
+        rows = [
+            {
+                "user_id": user_id,
+                "lesson_id": lesson_id,
+                "position_seconds": position,
+                "duration_seconds": duration,
+                "watched_seconds": min(watched, duration)
+            }
+            for (user_id, lesson_id), (position, duration, watched) in batch.items()
+            if lesson_id in existing_lessons and user_id in existing_users
+        ]
+        if not rows:
+            return
+
+        statement = insert(VideoWatchProgress).values(rows)
+        watched = VideoWatchProgress.watched_seconds + statement.excluded.watched_seconds
+        statement = statement.on_conflict_do_update(
+            index_elements=[VideoWatchProgress.user_id, VideoWatchProgress.lesson_id],
+            set_={
+                "position_seconds": statement.excluded.position_seconds,
+                "duration_seconds": statement.excluded.duration_seconds,
+                # Просмотренное время не может превышать длительность видео
+                "watched_seconds": case(
+                    (watched > statement.excluded.duration_seconds, statement.excluded.duration_seconds),
+                    else_=watched
+                ),
+                "updated_at": func.now()
+            }
+        ).returning(
+            VideoWatchProgress.user_id, VideoWatchProgress.lesson_id,
+            VideoWatchProgress.watched_seconds, VideoWatchProgress.duration_seconds
+        )
+        completed = [
+            {"user_id": user_id, "lesson_id": lesson_id, "video_completed": True}
+            for user_id, lesson_id, watched_seconds, duration_seconds in db.execute(statement)
+            if duration_seconds and watched_seconds >= duration_seconds * settings.VIDEO_COMPLETION_THRESHOLD
+        ]
+
+        if completed:
+            # Состояние до изменения нужно для счетчиков воронки; строки блокируются до конца транзакции
+            existing = dict(
+                ((user_id, lesson_id), video_completed)
+                for user_id, lesson_id, video_completed in db.query(
+                    UserLessonProgress.user_id, UserLessonProgress.lesson_id, UserLessonProgress.video_completed
+                )
+                .filter(tuple_(UserLessonProgress.user_id, UserLessonProgress.lesson_id).in_(
+                    [(row["user_id"], row["lesson_id"]) for row in completed]
+                ))
+                # Одинаковый порядок блокировки строк в параллельных сбросах
+                .order_by(UserLessonProgress.user_id, UserLessonProgress.lesson_id)
+                .with_for_update()
+            )
+            funnel_deltas = defaultdict(lambda: defaultdict(int))
+            for row in completed:
+                key = (row["user_id"], row["lesson_id"])
+                if key not in existing:
+                    funnel_deltas[row["lesson_id"]]["started"] += 1
+                if not existing.get(key):
+                    funnel_deltas[row["lesson_id"]]["video_completed"] += 1
+
+            progress = insert(UserLessonProgress).values(completed)
+            db.execute(progress.on_conflict_do_update(
+                index_elements=[UserLessonProgress.user_id, UserLessonProgress.lesson_id],
+                set_={"video_completed": True, "updated_at": func.now()},
+                where=UserLessonProgress.video_completed.is_(False)
+            ))
+            flipped = [
+                (row["user_id"], row["lesson_id"]) for row in completed
+                if not existing.get((row["user_id"], row["lesson_id"]))
+            ]
+            finished = _complete_lessons(db, flipped, funnel_deltas)
+            apply_funnel_deltas(db, funnel_deltas)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    # Позиции уже записаны: ошибка выдачи сертификатов не должна возвращать пакет в буфер
+    if finished:
+        _issue_certificates(finished)
+
+
+def _complete_lessons(db: Session, keys: List[Tuple[int, int]],
+                      funnel_deltas: Dict[int, Dict[str, int]]) -> List[Tuple[int, int]]:
+    """
+    Урок, у которого видео стало просмотренным, может завершиться целиком - как при
+    отметке раздела через /progress. Отмечает активность пользователей и возвращает
+    завершенные (user_id, lesson_id). Строки прогресса уже заблокированы вызывающим кодом.
+    """
+    if not keys:
+        return []
+    progress_rows = (
+        db.query(UserLessonProgress)
+        .filter(tuple_(UserLessonProgress.user_id, UserLessonProgress.lesson_id).in_(keys))
+        .order_by(UserLessonProgress.user_id, UserLessonProgress.lesson_id)
+        .all()
+    )
+    users = {
+        user.id: user
+        for user in db.query(User)
+        .filter(User.id.in_({user_id for user_id, _ in keys}))
+        .order_by(User.id)
+        .with_for_update()
+    }
+    finished = []
+    for progress in progress_rows:
+        if complete_lesson(db, progress, users[progress.user_id]):
+            funnel_deltas[progress.lesson_id]["completed"] += 1
+            finished.append((progress.user_id, progress.lesson_id))
+    if finished:
+        # Порядок блокировок как в обработчиках: прогресс и пользователи, затем счетчик версии и воронка
+        db.flush()
+        bump_version(db, LEADERBOARD_VERSION)
+    for user_id in sorted(users):
+        record_activity(db, user_id)
+    return finished
+
+
+def _issue_certificates(finished: List[Tuple[int, int]]) -> None:
+    db = SessionLocal()
+    try:
+        course_ids = dict(
+            db.query(Lesson.id, Module.course_id)
+            .join(Module, Lesson.module_id == Module.id)
+            .filter(Lesson.id.in_({lesson_id for _, lesson_id in finished}))
+        )
+        courses = {(user_id, course_ids[lesson_id]) for user_id, lesson_id in finished if lesson_id in course_ids}
+        for user_id, course_id in sorted(courses):
+            issue_for_completed_courses(db, user_id, course_id)
+    except Exception:
+        db.rollback()
+        logger.exception("Failed to issue certificates after video completion")
+    finally:
+        db.close()
+
+
+video_positions = WriteBehindBuffer(flush_video_positions, settings.VIDEO_BUFFER_MAX_PENDING, merge=_merge)
+
+# Последняя позиция и время сигнала по (user_id, lesson_id) для подсчета просмотренного времени
+_last_heartbeats = LRUCache(settings.VIDEO_SESSION_CACHE_SIZE)
+
+
+def record_heartbeat(user_id: int, lesson_id: int, position: float, duration: float) -> None:
+    """
+    Запоминает позицию плеера. В базу она попадет при ближайшем сбросе буфера.
+    Просмотренным считается только непрерывное воспроизведение между сигналами:
+    перемотка вперед и повторы не увеличивают watched_seconds.
+    """
+    key = (user_id, lesson_id)
+    now = time.monotonic()
+    watched = 0.0
+    last = _last_heartbeats.get(key)
+    if last is not None:
+        last_position, last_time = last
+        advanced = position - last_position
+        if 0 < advanced <= (now - last_time) * MAX_PLAYBACK_RATE + HEARTBEAT_SLACK:
+            watched = advanced
+    _last_heartbeats.set(key, (position, now))
+    video_positions.put(key, (position, duration, watched))
+
+
+def get_video_state(db: Session, user_id: int, lesson_id: int) -> Dict[str, Any]:
+    """
+    Состояние просмотра с учетом еще не записанных в базу сигналов
+    """
+    row = (
+        db.query(
+            VideoWatchProgress.position_seconds,
+            VideoWatchProgress.duration_seconds,
+            VideoWatchProgress.watched_seconds
+        )
+        .filter(VideoWatchProgress.user_id == user_id, VideoWatchProgress.lesson_id == lesson_id)
+        .first()
+    )
+    video_completed = db.query(UserLessonProgress.video_completed).filter(
+        UserLessonProgress.user_id == user_id,
+        UserLessonProgress.lesson_id == lesson_id
+    ).scalar()
+
+    position, duration, watched = row if row else (0.0, 0.0, 0.0)
+    pending: Optional[PendingPosition] = video_positions.get((user_id, lesson_id))
+    if pending is not None:
+        position, duration = pending[0], pending[1]
+        watched = min(watched + pending[2], duration)
+
+    return {
+        "position_seconds": position,
+        "duration_seconds": duration,
+        "watched_seconds": watched,
+        "watched_percent": round(watched / duration * 100, 1) if duration else 0.0,
+        "video_completed": bool(video_completed)
+    }
@@ -1,11 +1,29 @@
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 
+from app.config import settings
 from app.database import Base, engine
+from app.analytics.funnels import take_daily_snapshot
+from app.analytics.router import router as analytics_router
 from app.auth.router import router as auth_router
-from app.courses.lessons_router import router as courses_router
+from app.certificates.router import router as certificates_router
+from app.certificates.service import shutdown_renderer
+from app.certificates.verification import certificate_index
+from app.realtime.broker import broker
+from app.sandbox.service import sandbox
+from app.courses.catalog import catalog
+from app.courses.router import router as courses_router
+from app.courses.drafts import draft_buffer
+from app.courses.video import video_positions
 from app.courses.lessons_router import router as lessons_router
 from app.users.router import router as users_router
+from app.sync.router import router as sync_router
+from app.utils.compression import CompressionMiddleware
+from app.utils.ratelimit import RateLimitMiddleware
+from app.utils.tasks import start_periodic, stop_periodic_tasks
 
 # Создаем таблицы в базе данных
 Base.metadata.create_all(bind=engine)
@@ -17,6 +35,16 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Ограничиваем частоту запросов к дорогим маршрутам. Добавляется раньше CORS,
+# чтобы ответы 429 тоже получали CORS-заголовки и были видны фронтенду
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(
+        RateLimitMiddleware,
+        limits=settings.RATE_LIMITS,
+        max_buckets=settings.RATE_LIMIT_MAX_BUCKETS,
+        trust_forwarded=settings.RATE_LIMIT_TRUST_FORWARDED
+    )
+
 # Добавляем CORS middleware для разрешения запросов с фронтенда
 app.add_middleware(
     CORSMiddleware,
@@ -26,11 +54,46 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Сжимаем крупные ответы (gzip, brotli при наличии библиотеки)
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_SIZE)
+
 # Подключаем роутеры
 app.include_router(auth_router)
 app.include_router(courses_router)
 app.include_router(lessons_router)
 app.include_router(users_router)
+app.include_router(sync_router)
+app.include_router(certificates_router)
+app.include_router(analytics_router)
+
+@app.on_event("startup")
+async def start_background_tasks():
+    # Брокер событий публикует из пула потоков в основной цикл событий
+    broker.bind_loop(asyncio.get_running_loop())
+    # Строим снимок каталога курсов и периодически проверяем, не изменился ли каталог
+    await run_in_threadpool(catalog.refresh_if_changed)
+    start_periodic(settings.CATALOG_REFRESH_SECONDS, catalog.refresh_if_changed)
+    # Фильтр Блума по кодам сертификатов: строим при старте и дочитываем новые коды
+    await run_in_threadpool(certificate_index.refresh)
+    start_periodic(settings.CERTIFICATE_INDEX_REFRESH_SECONDS, certificate_index.refresh)
+    # Накопленные позиции видео записываются в базу пакетами
+    start_periodic(settings.VIDEO_FLUSH_SECONDS, video_positions.flush)
+    # Черновики кода: из частых автосохранений в базу попадает только последнее
+    start_periodic(settings.DRAFT_FLUSH_SECONDS, draft_buffer.flush)
+    # Снимок воронки уроков за текущий день; после полуночи - окончательный снимок за прошедший
+    start_periodic(settings.ANALYTICS_SNAPSHOT_SECONDS, take_daily_snapshot, align=True)
+    # Заранее запускаем процессы песочницы для проверки кода
+    await run_in_threadpool(sandbox.start)
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    await stop_periodic_tasks()
+    # Записываем то, что осталось в буферах
+    await run_in_threadpool(video_positions.flush)
+    await run_in_threadpool(draft_buffer.flush)
+    # Дожидаемся рендеринга уже поставленных в очередь сертификатов
+    await run_in_threadpool(shutdown_renderer)
+    sandbox.shutdown()
 
 @app.get("/")
 def root():
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Deque, Dict, Hashable, List, Optional, Set, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Событие: (id, данные в JSON)
+Event = Tuple[int, bytes]
+
+
+class Subscription:
+    """
+    Подписка одного клиента. Очередь ограничена: если клиент не успевает
+    забирать события, подписка закрывается, а не копит их бесконечно.
+    """
+
+    def __init__(self, topic: Hashable, maxsize: int):
+        self.topic = topic
+        self.queue: "asyncio.Queue[Optional[Event]]" = asyncio.Queue(maxsize=maxsize)
+        self.dropped = False
+
+    def close(self) -> None:
+        self.dropped = True
+        # Освобождаем место под маркер конца потока
+        while True:
+            try:
+                self.queue.put_nowait(None)
+                return
+            except asyncio.QueueFull:
+                self.queue.get_nowait()
+
+
+class Broker:
+    """
+    Внутрипроцессный pub/sub для потоков событий (SSE).
+
+    Все операции с подписками выполняются в цикле событий приложения;
+    publish можно вызывать из любого потока (например, из синхронного эндпоинта).
+    Для каждой темы хранится кольцевой буфер последних событий, чтобы
+    переподключившийся клиент мог дочитать пропущенное по Last-Event-ID.
+    Буфер держится только пока у темы есть подписчики.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers: Dict[Hashable, Set[Subscription]] = {}
+        self._history: Dict[Hashable, Deque[Event]] = {}
+        self._count = 0
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+
+    @property
+    def subscriber_count(self) -> int:
+        return self._count
+
+    def subscribe(self, topic: Hashable) -> Optional[Subscription]:
+        """
+        Возвращает None, если достигнут общий лимит подписчиков
+        """
+        if self._count >= settings.SSE_MAX_SUBSCRIBERS:
+            return None
+        subscription = Subscription(topic, settings.SSE_SUBSCRIBER_BUFFER)
+        self._subscribers.setdefault(topic, set()).add(subscription)
+        self._history.setdefault(topic, deque(maxlen=settings.SSE_REPLAY_BUFFER))
+        self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(subscription.topic)
+        if not subscribers or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        self._count -= 1
+        if not subscribers:
+            del self._subscribers[subscription.topic]
+            self._history.pop(subscription.topic, None)
+
+    def replay(self, topic: Hashable, last_event_id: int) -> Optional[List[Event]]:
+        """
+        События темы после last_event_id из кольцевого буфера.
+        None означает, что буфер не покрывает запрошенный диапазон и пропущенное нужно читать из базы.
+        """
+        history = self._history.get(topic)
+        if not history or last_event_id < history[0][0]:
+            return None
+        return [event for event in history if event[0] > last_event_id]
+
+    def publish(self, topic: Hashable, event_id: int, data: bytes) -> None:
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._publish(topic, (event_id, data))
+        else:
+            loop.call_soon_threadsafe(self._publish, topic, (event_id, data))
+
+    def _publish(self, topic: Hashable, event: Event) -> None:
+        subscribers = self._subscribers.get(topic)
+        if not subscribers:
+            return
+        self._history[topic].append(event)
+        for subscription in list(subscribers):
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                logger.info(f"Dropping slow subscriber of {topic}")
+                subscription.close()
+                self.unsubscribe(subscription)
+
+
+broker = Broker()
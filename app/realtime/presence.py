@@ -0,0 +1,68 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+
+
+class PresenceTracker:
+    """
+    Присутствие пользователей на уроках в памяти, без записи в базу.
+
+    Для каждого пользователя хранится только последний урок и время последнего
+    сигнала, поэтому память ограничена числом активных пользователей (и общим лимитом).
+    Записи упорядочены по времени сигнала: устаревшие снимаются с начала очереди
+    за амортизированное O(1), а количество на уроке хранится готовым счетчиком.
+    Используется из цикла событий приложения, поэтому блокировки не нужны.
+    """
+
+    def __init__(self, window_seconds: float, max_entries: int):
+        self.window_seconds = window_seconds
+        self.max_entries = max_entries
+        # user_id -> (lesson_id, время последнего сигнала)
+        self._seen: "OrderedDict[int, Tuple[int, float]]" = OrderedDict()
+        self._counts: Dict[int, int] = {}
+
+    def _decrement(self, lesson_id: int) -> None:
+        count = self._counts[lesson_id] - 1
+        if count:
+            self._counts[lesson_id] = count
+        else:
+            del self._counts[lesson_id]
+
+    def _expire(self, now: float) -> None:
+        deadline = now - self.window_seconds
+        seen = self._seen
+        while seen:
+            user_id, (lesson_id, last_seen) = next(iter(seen.items()))
+            if last_seen >= deadline and len(seen) <= self.max_entries:
+                break
+            seen.popitem(last=False)
+            self._decrement(lesson_id)
+
+    def heartbeat(self, lesson_id: int, user_id: int, now: Optional[float] = None) -> int:
+        """
+        Отмечает пользователя на уроке и возвращает число пользователей на нем
+        """
+        now = time.monotonic() if now is None else now
+        previous = self._seen.pop(user_id, None)
+        if previous is None or previous[0] != lesson_id:
+            if previous is not None:
+                self._decrement(previous[0])
+            self._counts[lesson_id] = self._counts.get(lesson_id, 0) + 1
+        self._seen[user_id] = (lesson_id, now)
+        self._expire(now)
+        return self._counts.get(lesson_id, 0)
+
+    def leave(self, lesson_id: int, user_id: int) -> None:
+        previous = self._seen.get(user_id)
+        if previous is not None and previous[0] == lesson_id:
+            del self._seen[user_id]
+            self._decrement(lesson_id)
+
+    def count(self, lesson_id: int, now: Optional[float] = None) -> int:
+        self._expire(time.monotonic() if now is None else now)
+        return self._counts.get(lesson_id, 0)
+
+
+presence = PresenceTracker(settings.PRESENCE_WINDOW_SECONDS, settings.PRESENCE_MAX_ENTRIES)
@@ -0,0 +1,224 @@
+"use strict";
+/*
+ * Тестовый харнесс. Выполняет тесты урока в процессе, отдельном от кода ученика,
+ * и записывает результат в файл, открытый runner'ом только для этого процесса.
+ *
+ * Код ученика работает в другом процессе (javascript_student.js), тесты обращаются
+ * к его функциям и значениям через каналы вызовов и получают только данные JSON.
+ * Поэтому программа ученика не может ни подменить проверки тестов, ни сообщить
+ * об успехе сама: завершение с кодом 0 или вывод в stdout на результат не влияют.
+ */
+const fs = require("fs");
+const util = require("util");
+const vm = require("vm");
+
+const [testsPath, callsFd, repliesFd, resultFd, maxOutput, maxMessage] = process.argv.slice(2);
+const TESTS_FILE = "tests.js";
+const MAX_ERROR_LENGTH = 1000;
+const IDENTIFIER = /^[A-Za-z_$][\w$]*$/;
+// Имена, которые тесты получают от харнесса, а не от программы ученика
+const HARNESS_NAMES = new Set(["require", "module", "exports", "__student__"]);
+
+class StudentError extends Error {
+    constructor(message) {
+        super(message);
+        this.name = "StudentError";
+    }
+}
+
+class ExitRequest extends Error {
+    constructor(code) {
+        super(`exit ${code}`);
+        this.code = code;
+    }
+}
+
+function lineReader(fd, limit) {
+    let buffer = Buffer.alloc(0);
+    const chunk = Buffer.alloc(65536);
+    return function readLine() {
+        for (;;) {
+            const end = buffer.indexOf(10);
+            if (end >= 0) {
+                const line = buffer.subarray(0, end).toString("utf8");
+                buffer = buffer.subarray(end + 1);
+                return line;
+            }
+            if (buffer.length > limit) {
+                throw new StudentError("Слишком большой ответ программы");
+            }
+            const size = fs.readSync(fd, chunk, 0, chunk.length, null);
+            if (size === 0) {
+                return null;
+            }
+            buffer = Buffer.concat([buffer, chunk.subarray(0, size)]);
+        }
+    };
+}
+
+const readLine = lineReader(Number(repliesFd), Number(maxMessage));
+
+// Ответы процесса ученика считаются недоверенными
+function receive() {
+    const line = readLine();
+    if (line === null) {
+        throw new StudentError("Программа завершилась во время проверки");
+    }
+    let reply;
+    try {
+        reply = JSON.parse(line);
+    } catch (error) {
+        reply = null;
+    }
+    if (reply === null || typeof reply !== "object") {
+        throw new StudentError("Некорректный ответ программы");
+    }
+    return reply;
+}
+
+function request(message) {
+    try {
+        fs.writeSync(Number(callsFd), JSON.stringify(message) + "\n");
+    } catch (error) {
+        throw new StudentError("Программа завершилась во время проверки");
+    }
+    return receive();
+}
+
+function studentException(reply) {
+    const name = String(reply.type);
+    const message = String(reply.message).slice(0, MAX_ERROR_LENGTH);
+    // Встроенные ошибки воссоздаются, чтобы тесты могли проверять, например, TypeError
+    const ErrorClass = globalThis[name];
+    if (typeof ErrorClass === "function" && (ErrorClass === Error || ErrorClass.prototype instanceof Error)) {
+        return new ErrorClass(message);
+    }
+    return new StudentError(`${name}: ${message}`);
+}
+
+function value(reply) {
+    if (reply.kind === "error") {
+        throw studentException(reply);
+    }
+    if (reply.kind === "undefined") {
+        return undefined;
+    }
+    if (reply.kind !== "value" || typeof reply.value !== "string") {
+        throw new StudentError("Некорректный ответ программы");
+    }
+    try {
+        return JSON.parse(reply.value);
+    } catch (error) {
+        throw new StudentError("Программа вернула значение, которое нельзя передать в тесты");
+    }
+}
+
+function remoteFunction(name) {
+    const call = (...args) => value(request({ op: "call", name, args: JSON.stringify(args) }));
+    Object.defineProperty(call, "name", { value: name });
+    return call;
+}
+
+// Имя -> { found, value }; имена программы запрашиваются один раз
+const resolved = new Map();
+
+function resolve(name) {
+    if (!resolved.has(name)) {
+        const reply = request({ op: "get", name });
+        if (reply.kind === "missing") {
+            resolved.set(name, { found: false });
+        } else if (reply.kind === "function") {
+            resolved.set(name, { found: true, value: remoteFunction(name) });
+        } else {
+            resolved.set(name, { found: true, value: value(reply) });
+        }
+    }
+    return resolved.get(name);
+}
+
+// Область видимости тестов: имена, которых нет в тестах и в глобальном объекте,
+// запрашиваются у программы ученика
+const studentScope = new Proxy(Object.create(null), {
+    has(target, name) {
+        return typeof name === "string" && IDENTIFIER.test(name) && !HARNESS_NAMES.has(name)
+            && !(name in globalThis) && resolve(name).found;
+    },
+    get(target, name) {
+        return typeof name === "string" ? resolve(name).value : undefined;
+    },
+    set() {
+        return false;
+    }
+});
+
+function describe(title, error) {
+    const match = error && typeof error.stack === "string" && error.stack.match(/tests\.js:(\d+)/);
+    if (match) {
+        // Первая строка обертки тестов
+        title = `${title} (строка ${Number(match[1]) - 1})`;
+    }
+    const message = String(error && error.message !== undefined ? error.message : error).slice(0, MAX_ERROR_LENGTH);
+    return message ? `${title}: ${message}` : title;
+}
+
+function run(output) {
+    let ready;
+    try {
+        ready = receive();
+    } catch (error) {
+        return [false, describe("Ошибка при запуске программы", error)];
+    }
+    if (ready.kind !== "ready") {
+        const error = ready.kind === "error"
+            ? studentException(ready)
+            : new StudentError("Некорректный ответ программы");
+        return [false, describe("Ошибка при запуске программы", error)];
+    }
+
+    const tests = fs.readFileSync(testsPath, "utf8");
+    const script = new vm.Script(
+        `(function (__student__, require) { with (__student__) {\n${tests}\n} })`,
+        { filename: TESTS_FILE }
+    );
+    const capture = (...args) => output.push(util.format(...args));
+    const originalLog = console.log;
+    const originalError = console.error;
+    const originalExit = process.exit;
+    console.log = capture;
+    console.error = capture;
+    // Тесты могут завершаться явно, как в отдельном скрипте
+    process.exit = (code) => {
+        throw new ExitRequest(code === undefined ? 0 : code);
+    };
+    try {
+        script.runInThisContext()(studentScope, require);
+    } catch (error) {
+        if (error instanceof ExitRequest) {
+            return error.code === 0 ? [true, null] : [false, `Тесты завершились с кодом ${error.code}`];
+        }
+        if (error instanceof StudentError) {
+            return [false, describe("Ошибка программы", error)];
+        }
+        if (error && error.name === "AssertionError") {
+            return [false, describe("Тест не пройден", error)];
+        }
+        return [false, describe(error && error.name ? error.name : "Error", error)];
+    } finally {
+        console.log = originalLog;
+        console.error = originalError;
+        process.exit = originalExit;
+    }
+    return [true, null];
+}
+
+const output = [];
+let passed;
+let error;
+try {
+    [passed, error] = run(output);
+} catch (failure) {
+    [passed, error] = [false, describe("Ошибка проверки", failure)];
+}
+const result = { passed, error, output: output.join("\n").slice(0, Number(maxOutput)) };
+fs.writeSync(Number(resultFd), JSON.stringify(result));
+process.exit(0);
@@ -0,0 +1,95 @@
+"use strict";
+/*
+ * Процесс кода ученика. Выполняет программу ученика и отвечает на запросы
+ * тестового харнесса (javascript_harness.js): значение имени и вызов функции.
+ *
+ * Аргументы и результаты передаются в JSON, поэтому в процесс тестов
+ * попадают только данные, а не объекты программы.
+ */
+const fs = require("fs");
+const vm = require("vm");
+
+const [codePath, callsFd, repliesFd, maxMessage] = process.argv.slice(2);
+const IDENTIFIER = /^[A-Za-z_$][\w$]*$/;
+
+function lineReader(fd, limit) {
+    let buffer = Buffer.alloc(0);
+    const chunk = Buffer.alloc(65536);
+    return function readLine() {
+        for (;;) {
+            const end = buffer.indexOf(10);
+            if (end >= 0) {
+                const line = buffer.subarray(0, end).toString("utf8");
+                buffer = buffer.subarray(end + 1);
+                return line;
+            }
+            if (buffer.length > limit) {
+                throw new Error("Слишком длинное сообщение");
+            }
+            const size = fs.readSync(fd, chunk, 0, chunk.length, null);
+            if (size === 0) {
+                return null;
+            }
+            buffer = Buffer.concat([buffer, chunk.subarray(0, size)]);
+        }
+    };
+}
+
+function reply(message) {
+    fs.writeSync(Number(repliesFd), JSON.stringify(message) + "\n");
+}
+
+function errorReply(error) {
+    const isError = error !== null && typeof error === "object";
+    return {
+        kind: "error",
+        type: isError && typeof error.name === "string" ? error.name : "Error",
+        message: String(isError ? error.message : error).slice(0, 1000)
+    };
+}
+
+function valueReply(value) {
+    if (value === undefined) {
+        return { kind: "undefined" };
+    }
+    return { kind: "value", value: JSON.stringify(value) };
+}
+
+const context = vm.createContext({ console, require, process });
+try {
+    vm.runInContext(fs.readFileSync(codePath, "utf8"), context, { filename: codePath });
+} catch (error) {
+    reply(errorReply(error));
+    process.exit(0);
+}
+reply({ kind: "ready" });
+
+const readLine = lineReader(Number(callsFd), Number(maxMessage));
+for (;;) {
+    const line = readLine();
+    if (line === null) {
+        break;
+    }
+    const request = JSON.parse(line);
+    let value;
+    try {
+        if (!IDENTIFIER.test(request.name)) {
+            throw new ReferenceError(request.name);
+        }
+        // Имена let, const и class верхнего уровня видны следующим скриптам того же контекста
+        value = vm.runInContext(request.name, context);
+    } catch (error) {
+        reply({ kind: "missing" });
+        continue;
+    }
+    if (request.op === "get") {
+        reply(typeof value === "function" ? { kind: "function" } : valueReply(value));
+        continue;
+    }
+    try {
+        reply(valueReply(value(...JSON.parse(request.args))));
+    } catch (error) {
+        reply(errorReply(error));
+    }
+}
+process.exit(0);
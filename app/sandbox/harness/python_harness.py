@@ -0,0 +1,179 @@
+"""
+Тестовый харнесс. Выполняет тесты урока в процессе, отдельном от кода ученика,
+и записывает результат в файл, открытый runner'ом только для этого процесса.
+
+Код ученика работает в другом процессе (python_student.py), тесты обращаются
+к его функциям и значениям через каналы вызовов и получают только литералы.
+Поэтому программа ученика не может ни подменить проверки тестов, ни сообщить
+об успехе сама: завершение с кодом 0 или вывод в stdout на результат не влияют.
+"""
+import ast
+import builtins
+import contextlib
+import io
+import json
+import os
+import sys
+import traceback
+
+TESTS_FILE = "tests.py"
+MAX_ERROR_LENGTH = 1000
+
+
+class StudentError(Exception):
+    """Ошибка программы ученика, которую нельзя передать встроенным исключением"""
+
+
+def _student_exception(reply):
+    """
+    Исключение программы ученика для тестов. Встроенные исключения воссоздаются,
+    чтобы тесты могли проверять, например, ValueError.
+    """
+    name = str(reply.get("type"))
+    message = str(reply.get("message"))[:MAX_ERROR_LENGTH]
+    exception_class = getattr(builtins, name, None)
+    if isinstance(exception_class, type) and issubclass(exception_class, Exception):
+        try:
+            return exception_class(message)
+        except Exception:
+            pass
+    return StudentError(f"{name}: {message}")
+
+
+class Student:
+    """
+    Канал к процессу кода ученика. Ответы процесса считаются недоверенными.
+    """
+
+    def __init__(self, calls, replies, max_message):
+        self.calls = calls
+        self.replies = replies
+        self.max_message = max_message
+
+    def receive(self):
+        line = self.replies.readline(self.max_message + 1)
+        if not line:
+            raise StudentError("Программа завершилась во время проверки")
+        if len(line) > self.max_message:
+            raise StudentError("Слишком большой ответ программы")
+        try:
+            reply = json.loads(line)
+        except ValueError:
+            reply = None
+        if not isinstance(reply, dict):
+            raise StudentError("Некорректный ответ программы")
+        return reply
+
+    def request(self, message):
+        try:
+            self.calls.write(json.dumps(message).encode() + b"\n")
+            self.calls.flush()
+        except BrokenPipeError:
+            raise StudentError("Программа завершилась во время проверки")
+        return self.receive()
+
+    def value(self, reply):
+        kind = reply.get("kind")
+        if kind == "error":
+            raise _student_exception(reply)
+        if kind != "value" or not isinstance(reply.get("value"), str):
+            raise StudentError("Некорректный ответ программы")
+        try:
+            return ast.literal_eval(reply["value"])
+        except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+            raise StudentError("Программа вернула значение, которое нельзя передать в тесты")
+
+    def function(self, name):
+        def call(*args, **kwargs):
+            return self.value(self.request({
+                "op": "call", "name": name, "args": repr(args), "kwargs": repr(kwargs)
+            }))
+        call.__name__ = call.__qualname__ = name
+        return call
+
+    def resolve(self, name):
+        reply = self.request({"op": "get", "name": name})
+        kind = reply.get("kind")
+        if kind == "missing":
+            raise KeyError(name)
+        if kind == "function":
+            return self.function(name)
+        return self.value(reply)
+
+
+class TestNamespace(dict):
+    """
+    Глобальные имена тестов: имена, которых нет в тестах и во встроенных,
+    запрашиваются у программы ученика
+    """
+
+    def __init__(self, student):
+        super().__init__(__name__="__main__", __builtins__=builtins)
+        self.student = student
+
+    def __missing__(self, name):
+        if hasattr(builtins, name):
+            raise KeyError(name)
+        value = self.student.resolve(name)
+        self[name] = value
+        return value
+
+
+def _describe(title, error):
+    frames = traceback.extract_tb(error.__traceback__)
+    line = next((frame.lineno for frame in reversed(frames) if frame.filename == TESTS_FILE), None)
+    if line is not None:
+        title = f"{title} (строка {line})"
+    message = str(error)[:MAX_ERROR_LENGTH]
+    return f"{title}: {message}" if message else title
+
+
+def run(student, tests_path, output):
+    try:
+        ready = student.receive()
+    except StudentError as error:
+        return False, _describe("Ошибка при запуске программы", error)
+    if ready.get("kind") != "ready":
+        if ready.get("kind") == "error":
+            error = _student_exception(ready)
+        else:
+            error = StudentError("Некорректный ответ программы")
+        return False, _describe("Ошибка при запуске программы", error)
+
+    with open(tests_path, encoding="utf-8") as f:
+        code = compile(f.read(), TESTS_FILE, "exec")
+    try:
+        with contextlib.redirect_stdout(output):
+            exec(code, TestNamespace(student))
+    except SystemExit as exit:
+        # Тесты могут завершаться явно, как в отдельном скрипте
+        if exit.code in (None, 0):
+            return True, None
+        return False, f"Тесты завершились с кодом {exit.code}"
+    except AssertionError as error:
+        return False, _describe("Тест не пройден", error)
+    except StudentError as error:
+        return False, _describe("Ошибка программы", error)
+    except Exception as error:
+        return False, _describe(type(error).__name__, error)
+    return True, None
+
+
+def main():
+    tests_path, calls_fd, replies_fd, result_fd, max_output, max_message = sys.argv[1:]
+    student = Student(
+        os.fdopen(int(calls_fd), "wb"), os.fdopen(int(replies_fd), "rb"), int(max_message)
+    )
+    output = io.StringIO()
+    try:
+        passed, error = run(student, tests_path, output)
+    except Exception as failure:
+        passed, error = False, _describe("Ошибка проверки", failure)
+
+    result = {"passed": passed, "error": error, "output": output.getvalue()[:int(max_output)]}
+    with os.fdopen(int(result_fd), "wb") as f:
+        f.write(json.dumps(result, ensure_ascii=False).encode())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Процесс кода ученика. Выполняет программу ученика и отвечает на запросы
+тестового харнесса (python_harness.py): значение имени и вызов функции.
+
+Аргументы и результаты передаются как литералы Python (repr и ast.literal_eval),
+поэтому в процесс тестов попадают только данные, а не объекты программы.
+Запускается отдельно от стандартной библиотеки приложения: python -I -S -B.
+"""
+import ast
+import json
+import os
+import sys
+
+
+def _error(error):
+    return {"kind": "error", "type": type(error).__name__, "message": str(error)[:1000]}
+
+
+def main():
+    code_path, calls_fd, replies_fd, max_message = sys.argv[1:]
+    calls = os.fdopen(int(calls_fd), "rb")
+    replies = os.fdopen(int(replies_fd), "wb")
+    max_message = int(max_message)
+
+    def reply(message):
+        replies.write(json.dumps(message).encode() + b"\n")
+        replies.flush()
+
+    with open(code_path, encoding="utf-8") as f:
+        source = f.read()
+    namespace = {"__name__": "__main__", "__builtins__": __builtins__}
+    try:
+        exec(compile(source, code_path, "exec"), namespace)
+    except BaseException as error:
+        reply(_error(error))
+        return
+    reply({"kind": "ready"})
+
+    while True:
+        line = calls.readline(max_message + 1)
+        if not line:
+            return
+        request = json.loads(line)
+        name = request["name"]
+        if name not in namespace:
+            reply({"kind": "missing"})
+            continue
+        value = namespace[name]
+        if request["op"] == "get":
+            reply({"kind": "function"} if callable(value) else {"kind": "value", "value": repr(value)})
+            continue
+        try:
+            result = value(*ast.literal_eval(request["args"]), **ast.literal_eval(request["kwargs"]))
+            reply({"kind": "value", "value": repr(result)})
+        except BaseException as error:
+            reply(_error(error))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+Изоляция процессов песочницы. Функции модуля выполняются в дочернем процессе
+между fork и exec.
+
+- собственные пространства имен сети (без интерфейсов), монтирования, IPC и UTS;
+- корень - tmpfs только для чтения, в которую смонтированы системные каталоги
+  интерпретатора, устройства /dev/null и /dev/urandom, рабочий каталог запуска
+  и пустой /tmp; код, конфигурация и сокеты приложения внутри не видны;
+- непривилегированный uid без capabilities;
+- seccomp-фильтр запрещает системные вызовы, не нужные программам учеников.
+"""
+import ctypes
+import os
+import platform
+import struct
+from typing import Dict, Iterable, List, Optional
+
+CLONE_NEWNS = 0x00020000
+CLONE_NEWCGROUP = 0x02000000
+CLONE_NEWUTS = 0x04000000
+CLONE_NEWIPC = 0x08000000
+CLONE_NEWUSER = 0x10000000
+CLONE_NEWPID = 0x20000000
+CLONE_NEWNET = 0x40000000
+NAMESPACE_FLAGS = (
+    CLONE_NEWNS | CLONE_NEWCGROUP | CLONE_NEWUTS | CLONE_NEWIPC
+    | CLONE_NEWUSER | CLONE_NEWPID | CLONE_NEWNET
+)
+
+MS_RDONLY = 0x1
+MS_NOSUID = 0x2
+MS_NODEV = 0x4
+MS_NOEXEC = 0x8
+MS_REMOUNT = 0x20
+MS_NOATIME = 0x400
+MS_NODIRATIME = 0x800
+MS_BIND = 0x1000
+MS_REC = 0x4000
+MS_PRIVATE = 0x40000
+MS_RELATIME = 0x200000
+
+# Флаги исходного монтирования, которые ядро запрещает снимать при перемонтировании
+# внутри пространства имен пользователей
+_LOCKED_FLAGS = (
+    (os.ST_NOSUID, MS_NOSUID),
+    (os.ST_NODEV, MS_NODEV),
+    (os.ST_NOEXEC, MS_NOEXEC),
+    (os.ST_NOATIME, MS_NOATIME),
+    (os.ST_NODIRATIME, MS_NODIRATIME),
+    (os.ST_RELATIME, MS_RELATIME),
+)
+
+# Системные каталоги, которые видны программе (только для чтения)
+SYSTEM_DIRS = ("/usr", "/bin", "/lib", "/lib64", "/lib32", "/libx32")
+DEVICES = ("/dev/null", "/dev/zero", "/dev/random", "/dev/urandom")
+# Рабочий каталог запуска внутри песочницы
+WORKDIR = "/sandbox"
+TMP_SIZE = "16m"
+
+PR_SET_NO_NEW_PRIVS = 38
+PR_SET_SECCOMP = 22
+SECCOMP_MODE_FILTER = 2
+SECCOMP_RET_KILL_PROCESS = 0x80000000
+SECCOMP_RET_ERRNO = 0x00050000
+SECCOMP_RET_ALLOW = 0x7FFF0000
+EPERM = 1
+ENOSYS = 38
+
+# Инструкции BPF
+BPF_LD_W_ABS = 0x20
+BPF_JEQ_K = 0x15
+BPF_JGE_K = 0x35
+BPF_JSET_K = 0x45
+BPF_RET_K = 0x06
+
+# Смещения в struct seccomp_data
+SECCOMP_NR = 0
+SECCOMP_ARCH = 4
+SECCOMP_ARG0 = 16
+
+# Запрещенные системные вызовы: отладка и чтение памяти других процессов, монтирование
+# и пространства имен, выход из группы процессов (runner убивает программу по группе),
+# сокеты, ключи ядра, eBPF, модули ядра и прочие редкие поверхности атаки
+DENIED_SYSCALLS = (
+    "ptrace", "process_vm_readv", "process_vm_writev",
+    "mount", "umount2", "pivot_root", "chroot", "unshare", "setns",
+    "setsid", "setpgid", "socket",
+    "keyctl", "add_key", "request_key", "bpf", "perf_event_open", "userfaultfd",
+    "kexec_load", "kexec_file_load", "init_module", "finit_module", "delete_module",
+    "io_uring_setup", "io_uring_enter", "io_uring_register",
+    "open_by_handle_at", "name_to_handle_at",
+)
+
+# (AUDIT_ARCH, номера системных вызовов) по архитектурам
+SYSCALL_TABLES = {
+    "x86_64": (0xC000003E, {
+        "ptrace": 101, "process_vm_readv": 310, "process_vm_writev": 311,
+        "mount": 165, "umount2": 166, "pivot_root": 155, "chroot": 161, "unshare": 272, "setns": 308,
+        "setsid": 112, "setpgid": 109, "socket": 41,
+        "keyctl": 250, "add_key": 248, "request_key": 249, "bpf": 321, "perf_event_open": 298,
+        "userfaultfd": 323, "kexec_load": 246, "kexec_file_load": 320,
+        "init_module": 175, "finit_module": 313, "delete_module": 176,
+        "io_uring_setup": 425, "io_uring_enter": 426, "io_uring_register": 427,
+        "open_by_handle_at": 304, "name_to_handle_at": 303,
+        "clone": 56, "clone3": 435,
+    }),
+    "aarch64": (0xC00000B7, {
+        "ptrace": 117, "process_vm_readv": 270, "process_vm_writev": 271,
+        "mount": 40, "umount2": 39, "pivot_root": 41, "chroot": 51, "unshare": 97, "setns": 268,
+        "setsid": 157, "setpgid": 154, "socket": 198,
+        "keyctl": 219, "add_key": 217, "request_key": 218, "bpf": 280, "perf_event_open": 241,
+        "userfaultfd": 282, "kexec_load": 104, "kexec_file_load": 294,
+        "init_module": 105, "finit_module": 273, "delete_module": 106,
+        "io_uring_setup": 425, "io_uring_enter": 426, "io_uring_register": 427,
+        "open_by_handle_at": 265, "name_to_handle_at": 264,
+        "clone": 220, "clone3": 435,
+    }),
+}
+# На x86_64 системные вызовы x32 ABI имеют этот бит в номере
+X32_SYSCALL_BIT = 0x40000000
+
+_libc = ctypes.CDLL(None, use_errno=True)
+_libc.mount.argtypes = (ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_ulong, ctypes.c_char_p)
+
+
+class _SockFprog(ctypes.Structure):
+    _fields_ = [("len", ctypes.c_ushort), ("filter", ctypes.c_void_p)]
+
+
+def _check(result: int, call: str) -> None:
+    if result != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, f"{call}: {os.strerror(errno)}")
+
+
+def _mount(source: Optional[str], target: str, fstype: Optional[str], flags: int, data: Optional[str] = None) -> None:
+    _check(
+        _libc.mount(
+            source.encode() if source else None, target.encode(),
+            fstype.encode() if fstype else None, flags, data.encode() if data else None
+        ),
+        f"mount {target}"
+    )
+
+
+def _write(path: str, data: str) -> None:
+    with open(path, "w") as f:
+        f.write(data)
+
+
+def _bind_readonly(source: str, target: str) -> None:
+    _mount(source, target, None, MS_BIND | MS_REC)
+    flags = MS_BIND | MS_REMOUNT | MS_RDONLY | MS_NOSUID | MS_NODEV
+    source_flags = os.statvfs(source).f_flag
+    for statvfs_flag, mount_flag in _LOCKED_FLAGS:
+        if source_flags & statvfs_flag:
+            flags |= mount_flag
+    _mount(None, target, None, flags)
+
+
+def _top_level(paths: Iterable[str]) -> List[str]:
+    # Каталоги, вложенные в другие каталоги списка, уже видны через родителя
+    result: List[str] = []
+    for path in sorted({os.path.normpath(path) for path in paths}):
+        if not any(path == parent or path.startswith(parent + "/") for parent in result):
+            result.append(path)
+    return result
+
+
+def _enter_namespaces(uid: int) -> bool:
+    """
+    Создает пространства имен. Возвращает True, если процесс запущен от root
+    и сменит uid сам, иначе uid задается отображением в новом пространстве имен пользователей.
+    """
+    flags = CLONE_NEWNS | CLONE_NEWNET | CLONE_NEWIPC | CLONE_NEWUTS
+    if os.geteuid() == 0:
+        _check(_libc.unshare(flags), "unshare")
+        return True
+
+    outer_uid, outer_gid = os.geteuid(), os.getegid()
+    _check(_libc.unshare(CLONE_NEWUSER | flags), "unshare")
+    # Внутри пространства имен процесс получает uid, отличный от 0, поэтому
+    # capabilities пространства имен сбрасываются при exec
+    _write("/proc/self/setgroups", "deny")
+    _write("/proc/self/uid_map", f"{uid} {outer_uid} 1")
+    _write("/proc/self/gid_map", f"{uid} {outer_gid} 1")
+    return False
+
+
+def _build_root(root: str, workdir: str, system_dirs: Iterable[str]) -> None:
+    # Монтирования нового пространства имен не должны распространяться в основное
+    _mount(None, "/", None, MS_REC | MS_PRIVATE)
+    _mount("tmpfs", root, "tmpfs", MS_NOSUID | MS_NODEV, "size=1m,mode=755")
+
+    for path in _top_level([*SYSTEM_DIRS, *system_dirs]):
+        target = root + path
+        if os.path.islink(path):
+            # /lib и /bin на многих системах - ссылки на каталоги в /usr
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.symlink(os.readlink(path), target)
+        elif os.path.isdir(path):
+            os.makedirs(target, exist_ok=True)
+            _bind_readonly(path, target)
+
+    os.mkdir(root + "/dev")
+    for device in DEVICES:
+        open(root + device, "w").close()
+        _mount(device, root + device, None, MS_BIND)
+
+    os.mkdir(root + "/tmp")
+    _mount("tmpfs", root + "/tmp", "tmpfs", MS_NOSUID | MS_NODEV, f"size={TMP_SIZE},mode=1777")
+
+    os.mkdir(root + WORKDIR)
+    _bind_readonly(workdir, root + WORKDIR)
+
+    _mount(None, root, None, MS_REMOUNT | MS_RDONLY | MS_NOSUID | MS_NODEV)
+    os.chroot(root)
+    os.chdir(WORKDIR)
+
+
+def enter(root: str, workdir: str, uid: int, system_dirs: Iterable[str]) -> None:
+    """
+    Переводит процесс в песочницу: пространства имен, корень из root
+    с рабочим каталогом workdir и uid без привилегий.
+    root - пустой каталог, на который монтируется корень песочницы.
+    """
+    privileged = _enter_namespaces(uid)
+    _build_root(root, workdir, system_dirs)
+    if privileged:
+        os.setgroups([])
+        os.setresgid(uid, uid, uid)
+        os.setresuid(uid, uid, uid)
+
+
+def _seccomp_program(arch: int, numbers: Dict[str, int]) -> bytes:
+    def statement(code: int, k: int, jt: int = 0, jf: int = 0) -> bytes:
+        return struct.pack("HBBI", code, jt, jf, k)
+
+    deny = statement(BPF_RET_K, SECCOMP_RET_ERRNO | EPERM)
+    program = [
+        statement(BPF_LD_W_ABS, SECCOMP_ARCH),
+        statement(BPF_JEQ_K, arch, 1, 0),
+        statement(BPF_RET_K, SECCOMP_RET_KILL_PROCESS),
+        statement(BPF_LD_W_ABS, SECCOMP_NR),
+    ]
+    if arch == SYSCALL_TABLES["x86_64"][0]:
+        program += [statement(BPF_JGE_K, X32_SYSCALL_BIT, 0, 1), deny]
+    for name in DENIED_SYSCALLS:
+        program += [statement(BPF_JEQ_K, numbers[name], 0, 1), deny]
+    program += [
+        # clone3 передает флаги в структуре, которую фильтр не может прочитать:
+        # ENOSYS заставляет libc вернуться к clone
+        statement(BPF_JEQ_K, numbers["clone3"], 0, 1),
+        statement(BPF_RET_K, SECCOMP_RET_ERRNO | ENOSYS),
+        # clone разрешен только без создания новых пространств имен
+        statement(BPF_JEQ_K, numbers["clone"], 0, 3),
+        statement(BPF_LD_W_ABS, SECCOMP_ARG0),
+        statement(BPF_JSET_K, NAMESPACE_FLAGS, 0, 1),
+        deny,
+        statement(BPF_RET_K, SECCOMP_RET_ALLOW),
+    ]
+    return b"".join(program)
+
+
+def seccomp_supported() -> bool:
+    return platform.machine() in SYSCALL_TABLES
+
+
+def restrict_syscalls() -> None:
+    """
+    Включает seccomp-фильтр. Вызывается последним: после него монтирование
+    и смена пространств имен запрещены.
+    """
+    arch, numbers = SYSCALL_TABLES[platform.machine()]
+    _check(_libc.prctl(PR_SET_NO_NEW_PRIVS, 1, 0, 0, 0), "prctl(PR_SET_NO_NEW_PRIVS)")
+    code = _seccomp_program(arch, numbers)
+    program = ctypes.create_string_buffer(code, len(code))
+    fprog = _SockFprog(len(code) // 8, ctypes.cast(program, ctypes.c_void_p))
+    _check(_libc.prctl(PR_SET_SECCOMP, SECCOMP_MODE_FILTER, ctypes.byref(fprog), 0, 0), "prctl(PR_SET_SECCOMP)")
@@ -0,0 +1,252 @@
+"""
+Запуск пользовательского кода в изолированных процессах с ограничениями ресурсов.
+
+Программа ученика и тесты урока выполняются в двух разных процессах песочницы
+(см. app/sandbox/harness): тесты вызывают функции программы через каналы и
+получают только данные. Результат проверки пишет только процесс тестов в файл,
+открытый runner'ом для него одного, поэтому код ученика не может подделать
+успешную проверку ни кодом завершения, ни выводом. Сырой вывод программы
+ученику не возвращается - только вывод тестов и описание ошибки.
+
+Функции модуля выполняются в процессах пула песочницы. Эти процессы
+однопоточные, поэтому preexec_fn при запуске дочернего процесса безопасен.
+"""
+import json
+import os
+import resource
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from app.sandbox import jail
+
+HARNESS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "harness")
+
+# V8 резервирует большой объем виртуальной памяти при старте, поэтому для node
+# лимит адресного пространства больше, а размер кучи ограничивается отдельно
+NODE_ADDRESS_SPACE_RESERVE_MB = 1024
+
+# Лимит процессов и потоков программы (node использует около десятка потоков)
+MAX_PROCESSES = 32
+
+# Максимальный размер одного сообщения между процессами программы и тестов
+MAX_MESSAGE_SIZE = 1 << 20
+
+# Процессы пула получают разные пары uid, чтобы одновременные проверки не могли
+# посылать сигналы друг другу и делили лимит процессов только сами с собой
+MAX_WORKER_SLOTS = 1024
+
+PYTHON = os.path.realpath(sys.executable)
+_node = shutil.which("node")
+NODE = os.path.realpath(_node) if _node else "node"
+
+
+def _prefix(executable: str) -> List[str]:
+    # Каталог установки интерпретатора (например, /usr/local для /usr/local/bin/python3)
+    if not os.path.isabs(executable):
+        return []
+    return [os.path.dirname(os.path.dirname(executable))]
+
+
+# Язык -> (расширение файлов, команда запуска скрипта, каталоги интерпретатора)
+LANGUAGES = {
+    "python": (
+        ".py",
+        lambda script, limits: [PYTHON, "-I", "-S", "-B", script],
+        [*_prefix(PYTHON), os.path.realpath(sys.base_prefix)],
+    ),
+    "javascript": (
+        ".js",
+        lambda script, limits: [NODE, f"--max-old-space-size={limits['memory_mb']}", script],
+        _prefix(NODE),
+    ),
+}
+
+_worker_slot = 0
+
+
+def _limit_child(language: str, workdir: str, uid: int, limits: Dict[str, Any], file_size: int) -> None:
+    # Выполняется в дочернем процессе между fork и exec
+    isolated = True
+    try:
+        jail.enter(workdir + "-root", workdir, uid, LANGUAGES[language][2])
+    except OSError:
+        if limits["require_isolation"]:
+            raise
+        isolated = False
+
+    memory = limits["memory_mb"]
+    if language == "javascript":
+        memory += NODE_ADDRESS_SPACE_RESERVE_MB
+    resource.setrlimit(resource.RLIMIT_CPU, (limits["cpu_seconds"], limits["cpu_seconds"] + 1))
+    resource.setrlimit(resource.RLIMIT_AS, (memory << 20, memory << 20))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (file_size, file_size))
+    resource.setrlimit(resource.RLIMIT_NOFILE, (64, 64))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+    if not isolated:
+        return
+    # Счетчик процессов свой у каждого uid пула (или пространства имен пользователей),
+    # поэтому лимит не зависит от потоков приложения
+    resource.setrlimit(resource.RLIMIT_NPROC, (MAX_PROCESSES, MAX_PROCESSES))
+
+    if jail.seccomp_supported():
+        jail.restrict_syscalls()
+    elif limits["require_isolation"]:
+        raise OSError("seccomp filter is not available on this architecture")
+
+
+def init_worker(slots: Any) -> None:
+    """
+    Инициализация процесса пула: номер процесса для выбора uid и пониженный
+    приоритет, чтобы проверки кода не отнимали процессор у воркеров приложения
+    """
+    global _worker_slot
+    with slots.get_lock():
+        _worker_slot = slots.value % MAX_WORKER_SLOTS
+        slots.value += 1
+    os.nice(5)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def ping() -> int:
+    return os.getpid()
+
+
+def _prepare(directory: str, files: Dict[str, str]) -> None:
+    # Каталог запуска монтируется в песочницу только для чтения; uid песочницы должен его читать.
+    # Рядом - пустой каталог для корня песочницы
+    os.makedirs(directory)
+    os.makedirs(directory + "-root")
+    for name, content in files.items():
+        with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+            f.write(content)
+        os.chmod(os.path.join(directory, name), 0o644)
+    os.chmod(directory, 0o755)
+
+
+def _harness_script(language: str, role: str) -> str:
+    extension = LANGUAGES[language][0]
+    with open(os.path.join(HARNESS_DIR, f"{language}_{role}{extension}"), encoding="utf-8") as f:
+        return f.read()
+
+
+def _spawn(language: str, directory: str, uid: int, arguments: List[str],
+           pass_fds: List[int], limits: Dict[str, Any], file_size: int) -> subprocess.Popen:
+    extension, build_command, _ = LANGUAGES[language]
+    return subprocess.Popen(
+        build_command(arguments[0], limits) + arguments[1:],
+        cwd=directory,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        pass_fds=pass_fds,
+        env={"PATH": "/usr/local/bin:/usr/bin:/bin", "LANG": "C.UTF-8", "HOME": "/tmp"},
+        preexec_fn=lambda: _limit_child(language, directory, uid, limits, file_size),
+        start_new_session=True,
+    )
+
+
+def _kill(process: Optional[subprocess.Popen]) -> None:
+    if process is None:
+        return
+    # Убиваем всю группу процессов: выйти из нее программе запрещает seccomp
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    process.wait()
+
+
+def _read_result(path: str, limit: int) -> Optional[Dict[str, Any]]:
+    with open(path, "rb") as f:
+        data = f.read(limit)
+    try:
+        result = json.loads(data)
+    except ValueError:
+        return None
+    if not isinstance(result, dict) or not isinstance(result.get("passed"), bool):
+        return None
+    return result
+
+
+def run_submission(language: str, code: str, tests: str, limits: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Выполняет программу ученика и тесты урока и возвращает результат.
+    Проверка пройдена, только если процесс тестов записал успешный результат
+    за отведенное время.
+    """
+    extension = LANGUAGES[language][0]
+    student_uid = limits["uid"] + 2 * _worker_slot + 1
+    harness_uid = limits["uid"] + 2 * _worker_slot
+    output_limit = limits["output_limit"]
+    # Результат - JSON с выводом тестов, экранирование может увеличить его размер
+    result_limit = output_limit * 8
+
+    with tempfile.TemporaryDirectory(prefix="sandbox-") as workdir:
+        student_dir = os.path.join(workdir, "student")
+        harness_dir = os.path.join(workdir, "harness")
+        _prepare(student_dir, {
+            "main" + extension: code,
+            "student" + extension: _harness_script(language, "student"),
+        })
+        _prepare(harness_dir, {
+            "tests" + extension: tests,
+            "harness" + extension: _harness_script(language, "harness"),
+        })
+        result_path = os.path.join(workdir, "result.json")
+
+        calls_read, calls_write = os.pipe()
+        replies_read, replies_write = os.pipe()
+        student = harness = None
+        started = time.monotonic()
+        timed_out = False
+        try:
+            with open(result_path, "wb") as result_file:
+                student = _spawn(
+                    language, student_dir, student_uid,
+                    ["student" + extension, "main" + extension,
+                     str(calls_read), str(replies_write), str(MAX_MESSAGE_SIZE)],
+                    [calls_read, replies_write], limits, output_limit
+                )
+                harness = _spawn(
+                    language, harness_dir, harness_uid,
+                    ["harness" + extension, "tests" + extension,
+                     str(calls_write), str(replies_read), str(result_file.fileno()),
+                     str(output_limit), str(MAX_MESSAGE_SIZE)],
+                    [calls_write, replies_read, result_file.fileno()], limits, result_limit
+                )
+            # Концы каналов остаются только у процессов, чтобы завершение одного было видно другому
+            for fd in (calls_read, calls_write, replies_read, replies_write):
+                os.close(fd)
+            calls_read = calls_write = replies_read = replies_write = None
+
+            try:
+                harness.wait(timeout=limits["wall_seconds"])
+            except subprocess.TimeoutExpired:
+                timed_out = True
+            # Программа, завершенная сигналом до конца проверки, превысила лимиты ресурсов
+            student_code = student.poll()
+        finally:
+            for fd in (calls_read, calls_write, replies_read, replies_write):
+                if fd is not None:
+                    os.close(fd)
+            _kill(student)
+            _kill(harness)
+
+        result = None if timed_out else _read_result(result_path, result_limit)
+        killed = (
+            (student_code is not None and student_code < 0)
+            or (harness.returncode is not None and harness.returncode < 0 and not timed_out)
+        )
+        return {
+            "passed": bool(result and result["passed"]),
+            "timed_out": timed_out,
+            "killed": killed,
+            "duration_ms": int((time.monotonic() - started) * 1000),
+            "output": str(result.get("output") or "") if result else "",
+            "error": str(result.get("error") or "") if result else "",
+        }
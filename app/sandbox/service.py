@@ -0,0 +1,129 @@
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from threading import Lock
+from typing import Any, Dict, Hashable, Optional
+
+from app.config import settings
+from app.sandbox.runner import LANGUAGES, init_worker, ping, run_submission
+from app.utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class SandboxBusy(Exception):
+    """Очередь проверок заполнена"""
+
+
+def _limits() -> Dict[str, Any]:
+    return {
+        "cpu_seconds": settings.SANDBOX_CPU_SECONDS,
+        "wall_seconds": settings.SANDBOX_WALL_SECONDS,
+        "memory_mb": settings.SANDBOX_MEMORY_MB,
+        "output_limit": settings.SANDBOX_OUTPUT_LIMIT,
+        "require_isolation": settings.SANDBOX_REQUIRE_ISOLATION,
+        "uid": settings.SANDBOX_UID,
+    }
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class Sandbox:
+    """
+    Пул заранее запущенных процессов для проверки кода практических заданий.
+
+    - количество одновременных проверок (в работе и в очереди) ограничено,
+      при переполнении сразу возвращается SandboxBusy;
+    - результаты кэшируются по (lesson_id, хэш кода, хэш тестов), кроме превышения
+      времени и ресурсов;
+    - одинаковые отправки, пришедшие одновременно, ждут одну и ту же проверку.
+    """
+
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = Lock()
+        self._inflight: Dict[Hashable, Future] = {}
+        self._results = LRUCache(settings.SANDBOX_RESULT_CACHE_SIZE)
+        # Счетчик для номеров процессов пула (по ним процессы выбирают uid песочницы)
+        self._slots = multiprocessing.Value("i", 0)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Вызывается под self._lock
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=settings.SANDBOX_WORKERS,
+                initializer=init_worker,
+                initargs=(self._slots,)
+            )
+        return self._executor
+
+    def start(self) -> None:
+        """
+        Запускает процессы пула заранее, чтобы первая проверка не ждала их старта
+        """
+        with self._lock:
+            executor = self._get_executor()
+        executor.submit(ping).result()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def check(self, lesson_id: int, language: str, tests: str, code: str) -> Dict[str, Any]:
+        """
+        Проверяет код и возвращает результат. Ожидание идет в цикле событий,
+        а не в потоке пула, поэтому очередь проверок не занимает потоки
+        синхронных обработчиков.
+        """
+        if language not in LANGUAGES:
+            raise ValueError(f"Unsupported language: {language}")
+
+        key = (lesson_id, language, _digest(code), _digest(tests))
+        result = self._results.get(key)
+        if result is not None:
+            return {**result, "cached": True}
+
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is None:
+                if len(self._inflight) >= settings.SANDBOX_QUEUE_SIZE:
+                    raise SandboxBusy()
+                future = self._get_executor().submit(
+                    run_submission, language, code, tests, _limits()
+                )
+                self._inflight[key] = future
+                future.add_done_callback(lambda done: self._finish(key, done))
+
+        # Запас к лимиту времени на ожидание свободного процесса в очереди
+        # shield: отмена ожидания по таймауту не должна отменять проверку, которую ждут и другие запросы
+        try:
+            result = await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(future)), settings.SANDBOX_WALL_SECONDS * 4
+            )
+        except asyncio.TimeoutError:
+            raise SandboxBusy()
+        return {**result, "cached": False}
+
+    def _finish(self, key: Hashable, future: Future) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            logger.error(f"Sandbox run failed: {error!r}")
+            return
+        result = future.result()
+        # Превышение времени или ресурсов может зависеть от загрузки сервера:
+        # такой результат не кэшируется, повторная отправка проверяется заново
+        if result["passed"] or not (result["timed_out"] or result["killed"]):
+            self._results.set(key, result)
+
+
+sandbox = Sandbox()
@@ -0,0 +1,223 @@
+import base64
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Query as SQLQuery, Session
+
+from app.auth.jwt import get_current_user
+from app.auth.models import User
+from app.config import settings
+from app.courses.models import (
+    Lesson, LessonComment, LessonReaction, LessonReactionRemoval, Module, UserCourse, UserLessonProgress
+)
+from app.database import get_db
+from app.sync.schemas import SyncResponse
+from app.utils.serialization import FastJSONResponse, typed_response
+
+router = APIRouter(
+    prefix="/sync",
+    tags=["Синхронизация"],
+)
+
+# Разделы синхронизации. Позиция каждого раздела хранится в watermark отдельно:
+# (время, None) - все изменения до этого времени отданы, при чтении окно расширяется на SYNC_OVERLAP_SECONDS;
+# (время, id) - раздел не поместился в ответ, следующая страница начинается строго после этой строки.
+# reaction_removals - отметки об удаленных реакциях, по ним счетчики урока отдаются в разделе reactions.
+SECTIONS = ("profile", "progress", "comments", "reactions", "reaction_removals", "lessons")
+
+Cursor = Tuple[datetime, Optional[int]]
+
+
+def encode_watermark(cursors: Dict[str, Cursor]) -> str:
+    payload = {section: [moment.isoformat(), last_id] for section, (moment, last_id) in cursors.items()}
+    return base64.urlsafe_b64encode(orjson.dumps(payload)).decode()
+
+
+def decode_watermark(watermark: str) -> Dict[str, Cursor]:
+    """
+    Разбирает watermark клиента. Любое отклонение от формата - ValueError.
+    """
+    payload = orjson.loads(base64.urlsafe_b64decode(watermark.encode()))
+    if not isinstance(payload, dict):
+        raise ValueError("watermark must be an object")
+
+    cursors: Dict[str, Cursor] = {}
+    for section, cursor in payload.items():
+        if section not in SECTIONS:
+            raise ValueError(f"unknown section: {section}")
+        if not isinstance(cursor, list) or len(cursor) != 2:
+            raise ValueError(f"invalid cursor for {section}")
+        moment, last_id = cursor
+        # bool - подкласс int, но идентификатором строки быть не может
+        if not isinstance(moment, str) or not (
+            last_id is None or (isinstance(last_id, int) and not isinstance(last_id, bool))
+        ):
+            raise ValueError(f"invalid cursor for {section}")
+        cursors[section] = (datetime.fromisoformat(moment), last_id)
+    return cursors
+
+
+def _as_utc(moment: datetime) -> datetime:
+    # Время из watermark может быть без часового пояса (как и время SQLite), считаем его UTC
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def _changed_since(query: SQLQuery, column: Any, id_column: Any, cursor: Optional[Cursor]) -> SQLQuery:
+    """
+    Ограничивает запрос строками, измененными после позиции раздела, в порядке (updated_at, id)
+    """
+    if cursor is not None:
+        moment, last_id = cursor
+        if last_id is None:
+            query = query.filter(column >= moment - timedelta(seconds=settings.SYNC_OVERLAP_SECONDS))
+        else:
+            # Условие по одной колонке дает диапазонное сканирование индекса, сравнение кортежей - точную границу
+            query = query.filter(column >= moment, tuple_(column, id_column) > tuple_(moment, last_id))
+    return query.order_by(column, id_column).limit(settings.SYNC_PAGE_SIZE + 1)
+
+
+def _page(rows: List[Any], section: str, started_at: datetime, cursors: Dict[str, Cursor]) -> List[Any]:
+    """
+    Обрезает выборку до размера страницы и записывает новую позицию раздела
+    """
+    if len(rows) > settings.SYNC_PAGE_SIZE:
+        rows = rows[:settings.SYNC_PAGE_SIZE]
+        cursors[section] = (rows[-1].updated_at, rows[-1].id)
+    else:
+        cursors[section] = (started_at, None)
+    return rows
+
+
+@router.get("", response_model=SyncResponse, response_class=FastJSONResponse)
+def sync(
+    since: Optional[str] = Query(None, description="watermark из предыдущего ответа; без него отдаются все данные"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Изменения с момента прошлой синхронизации: профиль, прогресс по урокам,
+    новые и измененные комментарии, реакции и содержимое уроков записанных курсов.
+    Каждый раздел читается диапазонным сканированием индекса по времени изменения.
+    """
+    cursors: Dict[str, Cursor] = {}
+    if since:
+        try:
+            cursors = decode_watermark(since)
+        except (ValueError, TypeError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Некорректный watermark"
+            )
+
+    # Время базы, а не приложения: updated_at проставляется базой
+    started_at = db.query(func.now()).scalar()
+    new_cursors: Dict[str, Cursor] = {}
+
+    profile = None
+    profile_cursor = cursors.get("profile")
+    user_changed = (
+        profile_cursor is None
+        or current_user.updated_at is None
+        or _as_utc(current_user.updated_at)
+        >= _as_utc(profile_cursor[0]) - timedelta(seconds=settings.SYNC_OVERLAP_SECONDS)
+    )
+    if user_changed:
+        profile = current_user
+    new_cursors["profile"] = (started_at, None)
+
+    progress = _page(
+        _changed_since(
+            db.query(UserLessonProgress).filter(UserLessonProgress.user_id == current_user.id),
+            UserLessonProgress.updated_at, UserLessonProgress.id, cursors.get("progress")
+        ).all(),
+        "progress", started_at, new_cursors
+    )
+
+    # Уроки курсов, на которые записан пользователь
+    enrolled_lessons = (
+        db.query(Lesson.id)
+        .join(Module, Module.id == Lesson.module_id)
+        .join(UserCourse, UserCourse.course_id == Module.course_id)
+        .filter(UserCourse.user_id == current_user.id)
+        .scalar_subquery()
+    )
+
+    comments = _page(
+        _changed_since(
+            db.query(
+                LessonComment.id, LessonComment.lesson_id, LessonComment.user_id, User.nickname,
+                LessonComment.text, LessonComment.parent_id, LessonComment.created_at, LessonComment.updated_at
+            )
+            .join(User, User.id == LessonComment.user_id)
+            .filter(LessonComment.lesson_id.in_(enrolled_lessons)),
+            LessonComment.updated_at, LessonComment.id, cursors.get("comments")
+        ).all(),
+        "comments", started_at, new_cursors
+    )
+
+    changed_reactions = _page(
+        _changed_since(
+            db.query(LessonReaction.id, LessonReaction.lesson_id, LessonReaction.updated_at)
+            .filter(LessonReaction.lesson_id.in_(enrolled_lessons)),
+            LessonReaction.updated_at, LessonReaction.id, cursors.get("reactions")
+        ).all(),
+        "reactions", started_at, new_cursors
+    )
+    removed_reactions = _page(
+        _changed_since(
+            db.query(LessonReactionRemoval.id, LessonReactionRemoval.lesson_id, LessonReactionRemoval.updated_at)
+            .filter(LessonReactionRemoval.lesson_id.in_(enrolled_lessons)),
+            LessonReactionRemoval.updated_at, LessonReactionRemoval.id, cursors.get("reaction_removals")
+        ).all(),
+        "reaction_removals", started_at, new_cursors
+    )
+    reactions = []
+    reaction_lesson_ids = sorted({row.lesson_id for row in changed_reactions + removed_reactions})
+    if reaction_lesson_ids:
+        counts = {lesson_id: [0, 0] for lesson_id in reaction_lesson_ids}
+        for lesson_id, is_like, count in (
+            db.query(LessonReaction.lesson_id, LessonReaction.is_like, func.count(LessonReaction.id))
+            .filter(LessonReaction.lesson_id.in_(reaction_lesson_ids))
+            .group_by(LessonReaction.lesson_id, LessonReaction.is_like)
+        ):
+            counts[lesson_id][0 if is_like else 1] = count
+        mine = dict(
+            db.query(LessonReaction.lesson_id, LessonReaction.is_like)
+            .filter(
+                LessonReaction.lesson_id.in_(reaction_lesson_ids),
+                LessonReaction.user_id == current_user.id
+            )
+            .all()
+        )
+        reactions = [
+            {
+                "lesson_id": lesson_id,
+                "likes_count": counts[lesson_id][0],
+                "dislikes_count": counts[lesson_id][1],
+                "my_reaction": mine.get(lesson_id)
+            }
+            for lesson_id in reaction_lesson_ids
+        ]
+
+    lessons = _page(
+        _changed_since(
+            db.query(Lesson.id, Lesson.module_id, Module.course_id, Lesson.title, Lesson.updated_at)
+            .join(Module, Module.id == Lesson.module_id)
+            .filter(Lesson.id.in_(enrolled_lessons)),
+            Lesson.updated_at, Lesson.id, cursors.get("lessons")
+        ).all(),
+        "lessons", started_at, new_cursors
+    )
+
+    return typed_response(SyncResponse, {
+        "watermark": encode_watermark(new_cursors),
+        "has_more": any(last_id is not None for _, last_id in new_cursors.values()),
+        "profile": profile,
+        "progress": progress,
+        "comments": [row._asdict() for row in comments],
+        "reactions": reactions,
+        "lessons": [row._asdict() for row in lessons]
+    })
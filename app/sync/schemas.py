@@ -0,0 +1,56 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+
+# Схемы для синхронизации офлайн-клиентов
+class SyncProfile(BaseModel):
+    id: int
+    email: str
+    nickname: str
+    xp: int
+    updated_at: Optional[datetime] = None
+
+class SyncProgress(BaseModel):
+    lesson_id: int
+    intro_completed: bool
+    video_completed: bool
+    practice_completed: bool
+    test_completed: bool
+    test_score: Optional[int] = None
+    earned_xp: int
+    completed: bool
+    updated_at: Optional[datetime] = None
+
+class SyncComment(BaseModel):
+    id: int
+    lesson_id: int
+    user_id: int
+    nickname: str
+    text: str
+    parent_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+class SyncReactions(BaseModel):
+    lesson_id: int
+    likes_count: int
+    dislikes_count: int
+    # True - лайк, False - дизлайк, None - реакции текущего пользователя нет
+    my_reaction: Optional[bool] = None
+
+class SyncLesson(BaseModel):
+    id: int
+    module_id: int
+    course_id: int
+    title: str
+    updated_at: Optional[datetime] = None
+
+class SyncResponse(BaseModel):
+    watermark: str
+    # True, если изменений больше, чем поместилось в ответ: клиент повторяет запрос с новым watermark
+    has_more: bool
+    profile: Optional[SyncProfile] = None
+    progress: List[SyncProgress]
+    comments: List[SyncComment]
+    reactions: List[SyncReactions]
+    lessons: List[SyncLesson]
@@ -0,0 +1,123 @@
+import base64
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.users.models import UserActivity
+from app.utils.cache import LRUCache
+
+# 366 дней помещаются в 46 байт
+BITMAP_SIZE = 46
+
+# (user_id, день), для которых бит уже установлен: повторные события за день не пишут в базу
+_recorded_days = LRUCache(settings.ACTIVITY_RECORDED_CACHE_SIZE)
+
+# Ключ session.info с днями, отмеченными в текущей транзакции сессии
+PENDING_DAYS_KEY = "activity_pending_days"
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_recorded_days(session: Session) -> None:
+    # День считается записанным только после фиксации транзакции
+    for key in session.info.pop(PENDING_DAYS_KEY, ()):
+        _recorded_days.set(key, True)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_pending_days(session: Session) -> None:
+    session.info.pop(PENDING_DAYS_KEY, None)
+
+
+def day_of_year(day: date) -> int:
+    return day.timetuple().tm_yday - 1
+
+
+def today() -> date:
+    # Дни считаются по UTC
+    return datetime.now(timezone.utc).date()
+
+
+def record_activity(db: Session, user_id: int, day: Optional[date] = None) -> None:
+    """
+    Отмечает день активности пользователя одним upsert с set_bit.
+    Выполняется в транзакции вызывающего кода, фиксация - вместе с ней.
+    """
+    day = day or today()
+    key = (user_id, day)
+    if _recorded_days.get(key):
+        return
+
+    index = day_of_year(day)
+    statement = insert(UserActivity).values(
+        user_id=user_id,
+        year=day.year,
+        days=func.set_bit(bytes(BITMAP_SIZE), index, 1)
+    )
+    db.execute(statement.on_conflict_do_update(
+        index_elements=[UserActivity.user_id, UserActivity.year],
+        set_={"days": func.set_bit(UserActivity.days, index, 1), "updated_at": func.now()}
+    ))
+    db.info.setdefault(PENDING_DAYS_KEY, set()).add(key)
+
+
+def _as_int(days: bytes) -> int:
+    # set_bit нумерует биты от младшего бита первого байта, поэтому порядок байтов little-endian
+    return int.from_bytes(days, "little")
+
+
+def _longest_run(bits: int) -> int:
+    # Каждый шаг укорачивает все серии единиц на одну, число шагов - длина самой длинной серии
+    length = 0
+    while bits:
+        bits &= bits >> 1
+        length += 1
+    return length
+
+
+def activity_summary(db: Session, user_id: int, year: int) -> Dict[str, Any]:
+    """
+    Тепловая карта за год и серии активных дней. Все годы пользователя читаются
+    одним запросом по первичному ключу и склеиваются в одно число, где бит N - N-й день
+    от 1 января первого года; серии считаются битовыми операциями над ним.
+    """
+    rows = (
+        db.query(UserActivity.year, UserActivity.days)
+        .filter(UserActivity.user_id == user_id)
+        .order_by(UserActivity.year)
+        .all()
+    )
+
+    current_day = today()
+    bitmaps = {row_year: _as_int(days) for row_year, days in rows}
+    year_bits = bitmaps.get(year, 0)
+
+    timeline = 0
+    today_position = None
+    if rows:
+        first_year = rows[0].year
+        first_day = date(first_year, 1, 1)
+        for row_year, bits in bitmaps.items():
+            timeline |= bits << (date(row_year, 1, 1) - first_day).days
+        today_position = (current_day - first_day).days
+
+    current_streak = 0
+    if today_position is not None and today_position >= 0:
+        # Серия не прерывается, пока сегодняшний день не закончился
+        end = today_position if timeline >> today_position & 1 else today_position - 1
+        if end >= 0 and timeline >> end & 1:
+            # Ближайший неактивный день не позже end - старший единичный бит инвертированной маски
+            gaps = ~timeline & ((1 << (end + 1)) - 1)
+            current_streak = end + 1 - gaps.bit_length() if gaps else end + 1
+
+    return {
+        "year": year,
+        "days": base64.b64encode(year_bits.to_bytes(BITMAP_SIZE, "little")).decode(),
+        "active_days": year_bits.bit_count(),
+        "longest_streak_in_year": _longest_run(year_bits),
+        "current_streak": current_streak,
+        "longest_streak": _longest_run(timeline)
+    }
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, LargeBinary
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+class UserActivity(Base):
+    __tablename__ = "user_activity"
+    
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    year = Column(Integer, primary_key=True)
+    # Битовая карта активности: бит N - день года N (0 - 1 января), порядок битов как у set_bit в PostgreSQL
+    days = Column(LargeBinary, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
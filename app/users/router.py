@@ -1,19 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy import and_, func
 from sqlalchemy.orm import Session
-from typing import Any
+from typing import Any, List, Optional
 
 from app.database import get_db
 from app.auth.jwt import get_current_user
 from app.auth.models import User
-from app.courses.models import UserCourse, Course
+from app.courses.models import UserCourse, Course, Module, Lesson, UserLessonProgress
 from app.courses.schemas import UserProfile, UserCourseBrief
+from app.users.activity import activity_summary, today
+from app.users.schemas import ActivitySummary, ContinueLearningEntry, LeaderboardEntry
+from app.utils.etag import make_etag, etag_matches, not_modified, with_etag
+from app.utils.serialization import FastJSONResponse, typed_response
+from app.utils.versions import LEADERBOARD_VERSION, get_version
 
 router = APIRouter(
     prefix="/users",
     tags=["Пользователи"],
 )
 
-@router.get("/profile", response_model=UserProfile)
+@router.get("/profile", response_model=UserProfile, response_class=FastJSONResponse)
 def get_user_profile(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -54,9 +60,94 @@ def get_user_profile(
         courses=courses_data
     )
     
-    return user_profile
+    return FastJSONResponse(user_profile)
 
-@router.get("/{user_id}/profile", response_model=UserProfile)
+@router.get("/me/continue", response_model=List[ContinueLearningEntry], response_class=FastJSONResponse)
+def get_continue_learning(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Следующий непройденный урок по каждому курсу пользователя.
+    Считается одним запросом: уроки без завершенного прогресса нумеруются
+    оконной функцией в порядке (module.order, lesson.order) внутри каждой записи на курс.
+    """
+    # Непройденные уроки курсов пользователя с номером по порядку внутри курса
+    pending = (
+        db.query(
+            UserCourse.id.label("user_course_id"),
+            Lesson.id.label("lesson_id"),
+            Lesson.title.label("lesson_title"),
+            Lesson.xp_reward.label("xp_reward"),
+            Module.id.label("module_id"),
+            Module.title.label("module_title"),
+            func.row_number().over(
+                partition_by=UserCourse.id,
+                order_by=(Module.order, Lesson.order, Lesson.id)
+            ).label("position")
+        )
+        .join(Module, Module.course_id == UserCourse.course_id)
+        .join(Lesson, Lesson.module_id == Module.id)
+        .outerjoin(UserLessonProgress, and_(
+            UserLessonProgress.lesson_id == Lesson.id,
+            UserLessonProgress.user_id == UserCourse.user_id,
+            UserLessonProgress.completed.is_(True)
+        ))
+        .filter(
+            UserCourse.user_id == current_user.id,
+            UserLessonProgress.id.is_(None)
+        )
+        .subquery()
+    )
+    
+    rows = (
+        db.query(
+            UserCourse.course_id, Course.title, UserCourse.status, UserCourse.progress,
+            pending.c.lesson_id, pending.c.lesson_title, pending.c.xp_reward,
+            pending.c.module_id, pending.c.module_title
+        )
+        .join(Course, Course.id == UserCourse.course_id)
+        .outerjoin(pending, and_(
+            pending.c.user_course_id == UserCourse.id,
+            pending.c.position == 1
+        ))
+        .filter(UserCourse.user_id == current_user.id)
+        .order_by(UserCourse.started_at.desc(), UserCourse.id.desc())
+        .all()
+    )
+    
+    result = []
+    for (course_id, course_title, course_status, progress,
+         lesson_id, lesson_title, xp_reward, module_id, module_title) in rows:
+        result.append({
+            "course_id": course_id,
+            "course_title": course_title,
+            "status": course_status,
+            "progress": progress or 0,
+            "next_lesson": {
+                "id": lesson_id,
+                "title": lesson_title,
+                "module_id": module_id,
+                "module_title": module_title,
+                "xp_reward": xp_reward
+            } if lesson_id else None
+        })
+    
+    return typed_response(List[ContinueLearningEntry], result)
+
+@router.get("/me/activity", response_model=ActivitySummary, response_class=FastJSONResponse)
+def get_activity(
+    year: Optional[int] = Query(None, ge=2000, le=2100, description="Год тепловой карты, по умолчанию текущий"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Тепловая карта активности за год и серии активных дней подряд.
+    Читается одной маленькой выборкой битовых карт пользователя.
+    """
+    return FastJSONResponse(activity_summary(db, current_user.id, year or today().year))
+
+@router.get("/{user_id}/profile", response_model=UserProfile, response_class=FastJSONResponse)
 def get_user_profile_by_id(
     user_id: int,
     db: Session = Depends(get_db),
@@ -107,16 +198,22 @@ def get_user_profile_by_id(
         courses=courses_data
     )
     
-    return user_profile
+    return FastJSONResponse(user_profile)
 
-@router.get("/leaderboard", response_model=list[dict])
+@router.get("/leaderboard", response_model=List[LeaderboardEntry], response_class=FastJSONResponse)
 def get_leaderboard(
+    request: Request,
     limit: int = 10,
     db: Session = Depends(get_db)
 ) -> Any:
     """
     Получение таблицы лидеров по XP
     """
+    # Версия таблицы лидеров увеличивается при каждом изменении XP пользователей
+    etag = make_etag("leaderboard", get_version(db, LEADERBOARD_VERSION), limit)
+    if etag_matches(request, etag):
+        return not_modified(request, etag)
+    
     leaderboard = (
         db.query(User.id, User.nickname, User.xp)
         .order_by(User.xp.desc())
@@ -133,4 +230,4 @@ def get_leaderboard(
             "xp": xp
         })
     
-    return result
\ No newline at end of file
+    return with_etag(typed_response(List[LeaderboardEntry], result), etag)
\ No newline at end of file
@@ -0,0 +1,39 @@
+from pydantic import BaseModel
+from typing import Optional
+
+from app.courses.schemas import CourseStatus
+
+# Схемы для таблицы лидеров
+class LeaderboardEntry(BaseModel):
+    rank: int
+    user_id: int
+    nickname: str
+    xp: int
+
+
+# Схемы для блока "Продолжить обучение"
+class NextLesson(BaseModel):
+    id: int
+    title: str
+    module_id: int
+    module_title: str
+    xp_reward: int
+
+class ContinueLearningEntry(BaseModel):
+    course_id: int
+    course_title: str
+    status: CourseStatus
+    progress: int
+    # None, если все уроки курса пройдены
+    next_lesson: Optional[NextLesson] = None
+
+
+# Схема для тепловой карты активности
+class ActivitySummary(BaseModel):
+    year: int
+    # Битовая карта дней года в base64: бит N (от младшего бита первого байта) - день года N
+    days: str
+    active_days: int
+    longest_streak_in_year: int
+    current_streak: int
+    longest_streak: int
@@ -0,0 +1,43 @@
+import hashlib
+import math
+from threading import Lock
+
+
+class BloomFilter:
+    """
+    Фильтр Блума: множество строк с проверкой принадлежности без ложноотрицательных ответов.
+    Если элемент не найден в фильтре, его гарантированно не добавляли;
+    положительный ответ ошибочен с вероятностью не выше error_rate
+    (пока количество элементов не превышает capacity).
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+        self._lock = Lock()
+
+    def _positions(self, item: str):
+        # Двойное хэширование: k позиций из двух 64-битных половин одного хэша
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (first + i * second) % self.size
+
+    def add(self, item: str) -> None:
+        with self._lock:
+            for position in self._positions(item):
+                self._bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    @property
+    def is_saturated(self) -> bool:
+        return self.count > self.capacity
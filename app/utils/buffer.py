@@ -0,0 +1,78 @@
+import logging
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """
+    Буфер отложенной записи: частые изменения одного ключа схлопываются
+    (побеждает последняя запись, либо значения объединяются функцией merge),
+    а в базу периодически уходит одна пакетная запись на все накопленные ключи.
+
+    flush_func получает словарь {ключ: значение} и должна записать его целиком.
+    Если запись не удалась, значения возвращаются в буфер и попадут в следующий сброс.
+    """
+
+    def __init__(
+        self,
+        flush_func: Callable[[Dict[Hashable, Any]], None],
+        max_pending: int,
+        merge: Optional[Callable[[Any, Any], Any]] = None,
+    ):
+        self.flush_func = flush_func
+        self.max_pending = max_pending
+        self.merge = merge
+        self._pending: Dict[Hashable, Any] = {}
+        self._lock = Lock()
+        # Сбросы выполняются по одному, чтобы пакеты не перемешивались
+        self._flush_lock = Lock()
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            previous = self._pending.get(key)
+            if previous is not None and self.merge is not None:
+                value = self.merge(previous, value)
+            self._pending[key] = value
+            overflow = len(self._pending) > self.max_pending
+        if overflow:
+            # Сбрасываем сразу, чтобы буфер не рос без ограничений
+            try:
+                self.flush()
+            except Exception:
+                logger.exception(f"Write-behind flush of {self.flush_func.__name__} failed")
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            return self._pending.get(key, default)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            return self._pending.pop(key, default)
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def flush(self) -> int:
+        """
+        Записывает накопленные значения. Возвращает количество записанных ключей.
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+            try:
+                self.flush_func(batch)
+            except Exception:
+                with self._lock:
+                    # Более свежие значения, пришедшие во время сброса, важнее
+                    for key, value in batch.items():
+                        current = self._pending.get(key)
+                        if current is None:
+                            self._pending[key] = value
+                        elif self.merge is not None:
+                            self._pending[key] = self.merge(value, current)
+                raise
+            return len(batch)
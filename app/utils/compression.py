@@ -0,0 +1,163 @@
+import zlib
+from typing import Hashable, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.utils.cache import LRUCache
+
+try:
+    import brotli
+except ImportError:  # brotli - необязательная зависимость
+    brotli = None
+
+COMPRESSIBLE_CONTENT_TYPES = ("application/json", "text/", "application/javascript")
+
+# Уровни сжатия: ответ из кэша сжимается один раз, поэтому можно сжимать сильнее
+CACHED_LEVELS = {"br": 9, "gzip": 9}
+ON_THE_FLY_LEVELS = {"br": 4, "gzip": 6}
+
+# Сжатые тела ответов по (версия содержимого, кодировка)
+_compressed_bodies = LRUCache(settings.COMPRESSION_CACHE_SIZE)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Выбирает кодировку по заголовку Accept-Encoding: br (если установлен brotli), затем gzip
+    """
+    accepted = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+
+    wildcard = accepted.get("*", 0.0)
+    for encoding in ("br", "gzip"):
+        if encoding == "br" and brotli is None:
+            continue
+        if accepted.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str, level: int) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=level)
+    # wbits=31 - формат gzip
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(body) + compressor.flush()
+
+
+def is_compressible(headers: Headers) -> bool:
+    if "content-encoding" in headers:
+        return False
+    content_type = headers.get("content-type", "")
+    return content_type.startswith(COMPRESSIBLE_CONTENT_TYPES)
+
+
+def _encoded_etag(etag: str, encoding: str) -> str:
+    # Сжатое представление должно иметь собственный ETag: суффикс кодировки
+    # снимается при сравнении If-None-Match (см. app.utils.etag)
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def precompressed(request: Request, response: Response, cache_key: Optional[Hashable] = None) -> Response:
+    """
+    Сжимает тело готового ответа.
+
+    cache_key - версия содержимого ответа. Если она передана, сжатое тело кэшируется
+    и последующие запросы той же версии получают сжатую копию из кэша. Ответы
+    с персональными данными пользователя передаются без cache_key и сжимаются
+    на лету без кэширования.
+    """
+    if len(response.body) < settings.COMPRESSION_MIN_SIZE or not is_compressible(response.headers):
+        return response
+
+    response.headers.add_vary_header("Accept-Encoding")
+    encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+    if encoding is None:
+        return response
+
+    if cache_key is None:
+        body = compress(response.body, encoding, ON_THE_FLY_LEVELS[encoding])
+    else:
+        key = (cache_key, encoding)
+        body = _compressed_bodies.get(key)
+        if body is None:
+            body = compress(response.body, encoding, CACHED_LEVELS[encoding])
+            _compressed_bodies.set(key, body)
+
+    response.body = body
+    response.headers["Content-Encoding"] = encoding
+    response.headers["Content-Length"] = str(len(body))
+    etag = response.headers.get("etag")
+    if etag:
+        response.headers["ETag"] = _encoded_etag(etag, encoding)
+    return response
+
+
+class CompressionMiddleware:
+    """
+    Сжимает крупные ответы, которые отдаются одним куском.
+    Потоковые ответы и уже сжатые ответы (см. precompressed) пропускаются без изменений.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        started = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start_message, started
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if started or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            started = True
+            body = message.get("body", b"")
+            start_message["headers"] = list(start_message.get("headers", []))
+            headers = MutableHeaders(raw=start_message["headers"])
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or not is_compressible(headers)
+            ):
+                await send(start_message)
+                await send(message)
+                return
+
+            body = compress(body, encoding, ON_THE_FLY_LEVELS[encoding])
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            etag = headers.get("etag")
+            if etag:
+                headers["ETag"] = _encoded_etag(etag, encoding)
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
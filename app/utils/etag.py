@@ -0,0 +1,60 @@
+import hashlib
+from typing import Any, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+# Суффиксы, которые precompressed добавляет к ETag сжатого представления
+ENCODING_SUFFIXES = ("-br", "-gzip")
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    Строит сильный ETag из значений, определяющих версию ответа
+    """
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def _normalize(tag: str) -> str:
+    tag = tag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    for suffix in ENCODING_SUFFIXES:
+        if tag.endswith(suffix + '"'):
+            return tag[:-len(suffix) - 1] + '"'
+    return tag
+
+
+def _matching_tag(request: Request, etag: str) -> Optional[str]:
+    if_none_match: Optional[str] = request.headers.get("if-none-match")
+    if not if_none_match:
+        return None
+    if if_none_match.strip() == "*":
+        return etag
+    for tag in if_none_match.split(","):
+        if _normalize(tag) == etag:
+            return tag.strip()
+    return None
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Проверяет заголовок If-None-Match (сравнение по правилам для GET)
+    """
+    return _matching_tag(request, etag) is not None
+
+
+def not_modified(request: Request, etag: str) -> Response:
+    """
+    Ответ 304. В ETag возвращается тег того представления (сжатого или нет),
+    которое уже есть у клиента.
+    """
+    tag = _matching_tag(request, etag) or etag
+    return Response(status_code=304, headers={"ETag": tag, "Cache-Control": "no-cache"})
+
+
+def with_etag(response: Response, etag: str) -> Response:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return response
@@ -0,0 +1,184 @@
+import logging
+import math
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import jwt
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.utils.serialization import dump_json
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600}
+
+
+class RateLimitRule:
+    """
+    Ограничение для одного маршрута: capacity запросов за period секунд.
+    Токены восстанавливаются равномерно, поэтому допускается всплеск до capacity запросов.
+    """
+
+    def __init__(self, name: str, capacity: int, period: int):
+        self.name = name
+        self.capacity = capacity
+        self.period = period
+        self.rate = capacity / period
+        self.policy = f"{capacity};w={period}"
+
+
+def parse_rules(limits: Dict[str, str]) -> Dict[str, List[Tuple[str, RateLimitRule]]]:
+    """
+    Разбирает RATE_LIMITS в шаблоны путей по методам:
+    {"POST /lessons/{lesson_id}/comments": "10/minute"} -> {"POST": [(regex, правило)]}
+    """
+    rules: Dict[str, List[Tuple[str, RateLimitRule]]] = {}
+    for route, limit in limits.items():
+        method, path = route.split(" ", 1)
+        count, period = limit.split("/", 1)
+        pattern = re.sub(r"\\\{\w+\\\}", "[^/]+", re.escape(path))
+        rules.setdefault(method.upper(), []).append(
+            (pattern, RateLimitRule(route, int(count), PERIODS[period]))
+        )
+    return rules
+
+
+class TokenBucketLimiter:
+    """
+    Корзины токенов по ключу (правило, клиент) в порядке последнего обращения.
+    Проверка - O(1): корзина пополняется лениво по прошедшему времени.
+    Самые давние корзины вытесняются при превышении max_buckets, а уже полностью
+    восстановившиеся удаляются по пути, так как их отсутствие ничего не меняет.
+    """
+
+    # Сколько простаивающих корзин проверяется за одно обращение
+    EVICT_PER_CALL = 4
+
+    def __init__(self, max_buckets: int):
+        self.max_buckets = max_buckets
+        # ключ -> [токены, время обновления, время полного восстановления]
+        self._buckets: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+
+    def acquire(self, key: Tuple[str, str], rule: RateLimitRule, now: float) -> Tuple[bool, float]:
+        """
+        Забирает токен. Возвращает (разрешен ли запрос, оставшиеся токены).
+        """
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            tokens = float(rule.capacity)
+        else:
+            tokens = min(rule.capacity, bucket[0] + (now - bucket[1]) * rule.rate)
+            self._buckets.move_to_end(key)
+
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = [tokens, now, now + (rule.capacity - tokens) / rule.rate]
+        self._evict(now)
+        return allowed, tokens
+
+    def _evict(self, now: float) -> None:
+        while len(self._buckets) > self.max_buckets:
+            self._buckets.popitem(last=False)
+        for _ in range(self.EVICT_PER_CALL):
+            if not self._buckets:
+                return
+            key, bucket = next(iter(self._buckets.items()))
+            if bucket[2] > now:
+                return
+            del self._buckets[key]
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class RateLimitMiddleware:
+    """
+    Ограничивает частоту запросов к дорогим маршрутам корзинами токенов.
+
+    Клиент определяется по id пользователя из JWT, без токена - по IP.
+    Ответы на ограниченные маршруты получают заголовки RateLimit-*, при превышении
+    отдается 429 с Retry-After. Состояние хранится в памяти воркера,
+    поэтому при нескольких воркерах лимит действует на каждый отдельно.
+    """
+
+    def __init__(self, app: ASGIApp, limits: Dict[str, str], max_buckets: int = 100000,
+                 trust_forwarded: bool = False) -> None:
+        self.app = app
+        self.trust_forwarded = trust_forwarded
+        self.limiter = TokenBucketLimiter(max_buckets)
+        # Все шаблоны метода объединяются в одно регулярное выражение: одна проверка на запрос
+        self.routes: Dict[str, Tuple[re.Pattern, List[RateLimitRule]]] = {}
+        for method, rules in parse_rules(limits).items():
+            pattern = "|".join(f"(?P<r{position}>{regex})" for position, (regex, _) in enumerate(rules))
+            self.routes[method] = (re.compile(f"^(?:{pattern})$"), [rule for _, rule in rules])
+
+    def _match(self, scope: Scope) -> Optional[RateLimitRule]:
+        route = self.routes.get(scope["method"])
+        if route is None:
+            return None
+        pattern, rules = route
+        match = pattern.match(scope["path"].rstrip("/") or "/")
+        if match is None:
+            return None
+        return rules[int(match.lastgroup[1:])]
+
+    def _client_key(self, scope: Scope) -> str:
+        headers = Headers(scope=scope)
+        authorization = headers.get("authorization", "")
+        if authorization.lower().startswith("bearer "):
+            try:
+                payload = jwt.decode(authorization[7:], settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+                if payload.get("sub") is not None:
+                    return f"user:{payload['sub']}"
+            except jwt.PyJWTError:
+                pass
+
+        if self.trust_forwarded:
+            forwarded = headers.get("x-forwarded-for")
+            if forwarded:
+                return f"ip:{forwarded.split(',')[0].strip()}"
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        rule = self._match(scope)
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        allowed, tokens = self.limiter.acquire((rule.name, self._client_key(scope)), rule, time.monotonic())
+        limit_headers = {
+            "RateLimit-Limit": str(rule.capacity),
+            "RateLimit-Remaining": str(int(tokens)),
+            "RateLimit-Reset": str(math.ceil((rule.capacity - tokens) / rule.rate)),
+            "RateLimit-Policy": rule.policy,
+        }
+
+        if not allowed:
+            response = Response(
+                content=dump_json({"detail": "Слишком много запросов, попробуйте позже"}),
+                status_code=429,
+                media_type="application/json",
+                headers={**limit_headers, "Retry-After": str(math.ceil((1 - tokens) / rule.rate))}
+            )
+            await response(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                for name, value in limit_headers.items():
+                    headers[name] = value
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
@@ -0,0 +1,54 @@
+from functools import lru_cache
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+
+@lru_cache(maxsize=None)
+def get_type_adapter(tp: Any) -> TypeAdapter:
+    """
+    Возвращает TypeAdapter для типа. Схема валидации компилируется
+    один раз на тип, а не на каждый запрос.
+    """
+    return TypeAdapter(tp)
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dump_json(content: Any) -> bytes:
+    """
+    Сериализует ответ в JSON через orjson без прохода jsonable_encoder
+    """
+    if isinstance(content, BaseModel):
+        content = content.model_dump()
+    return orjson.dumps(content, default=_default)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON-ответ для горячих эндпоинтов.
+
+    Если эндпоинт возвращает экземпляр этого класса, FastAPI не выполняет
+    повторную валидацию по response_model и jsonable_encoder, поэтому
+    response_model в декораторе остается только для документации.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dump_json(content)
+
+
+def typed_response(tp: Any, content: Any, exclude_unset: bool = False, **kwargs: Any) -> FastJSONResponse:
+    """
+    Проверяет собранный ответ (словари или ORM-объекты) по типизированной схеме
+    одним вызовом закешированного валидатора и возвращает FastJSONResponse.
+    С exclude_unset=True в ответ не попадают поля, которых не было в исходных данных.
+    """
+    adapter = get_type_adapter(tp)
+    value = adapter.validate_python(content, from_attributes=True)
+    return FastJSONResponse(adapter.dump_python(value, exclude_unset=exclude_unset), **kwargs)
@@ -0,0 +1,38 @@
+import asyncio
+import logging
+import time
+from typing import Callable, List
+
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+_tasks: List[asyncio.Task] = []
+
+
+def start_periodic(interval: float, func: Callable[[], None], align: bool = False) -> asyncio.Task:
+    """
+    Запускает синхронную функцию в пуле потоков каждые interval секунд.
+    С align=True запуски приходятся на границы интервала по времени UTC
+    (для часового интервала - начало каждого часа, в том числе полночь).
+    Должна вызываться из запущенного цикла событий (например, в обработчике startup).
+    """
+    async def run() -> None:
+        while True:
+            delay = interval - time.time() % interval if align else interval
+            await asyncio.sleep(delay)
+            try:
+                await run_in_threadpool(func)
+            except Exception:
+                logger.exception(f"Periodic task {func.__name__} failed")
+
+    task = asyncio.create_task(run())
+    _tasks.append(task)
+    return task
+
+
+async def stop_periodic_tasks() -> None:
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
@@ -0,0 +1,35 @@
+from sqlalchemy import Column, String, BigInteger
+from sqlalchemy.orm import Session
+
+from app.database import Base
+
+# Имена счетчиков версий
+LEADERBOARD_VERSION = "leaderboard"
+
+
+class VersionCounter(Base):
+    """
+    Монотонный счетчик версии набора данных. Увеличивается в той же транзакции,
+    что и изменение данных, поэтому одинаково виден всем воркерам.
+    """
+    __tablename__ = "version_counters"
+
+    name = Column(String, primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+
+
+def get_version(db: Session, name: str) -> int:
+    return db.query(VersionCounter.value).filter(VersionCounter.name == name).scalar() or 0
+
+
+def bump_version(db: Session, name: str) -> None:
+    """
+    Увеличивает счетчик версии. Изменение фиксируется вместе с текущей транзакцией.
+    """
+    updated = (
+        db.query(VersionCounter)
+        .filter(VersionCounter.name == name)
+        .update({VersionCounter.value: VersionCounter.value + 1}, synchronize_session=False)
+    )
+    if not updated:
+        db.add(VersionCounter(name=name, value=1))
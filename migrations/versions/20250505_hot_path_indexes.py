@@ -0,0 +1,44 @@
+"""Добавляет индексы для горячих запросов
+
+Revision ID: 20250505_hot_path_indexes
+Revises: 20250504_unique_course_title
+Create Date: 2025-05-05 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = '20250505_hot_path_indexes'
+down_revision = '20250504_unique_course_title'
+branch_labels = None
+depends_on = None
+
+# (имя индекса, таблица, колонки)
+HOT_PATH_INDEXES = [
+    ('ix_users_xp', 'users', ['xp']),
+    ('ix_test_options_question_id_is_correct', 'test_options', ['question_id', 'is_correct']),
+    ('ix_lesson_reactions_lesson_id_is_like', 'lesson_reactions', ['lesson_id', 'is_like']),
+    ('ix_user_courses_user_id', 'user_courses', ['user_id']),
+]
+
+def upgrade():
+    # Проверяем, какие индексы уже существуют (например, созданные через create_all)
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    existing = {
+        table: {index['name'] for index in inspector.get_indexes(table)}
+        for table in {table for _, table, _ in HOT_PATH_INDEXES}
+    }
+
+    # CREATE INDEX CONCURRENTLY не может выполняться внутри транзакции
+    with op.get_context().autocommit_block():
+        for name, table, columns in HOT_PATH_INDEXES:
+            if name in existing[table]:
+                continue
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(HOT_PATH_INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
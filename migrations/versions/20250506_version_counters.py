@@ -0,0 +1,28 @@
+"""Добавляет таблицу счетчиков версий
+
+Revision ID: 20250506_version_counters
+Revises: 20250505_hot_path_indexes
+Create Date: 2025-05-06 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = '20250506_version_counters'
+down_revision = '20250505_hot_path_indexes'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Счетчики версий для ETag (например, версия таблицы лидеров)
+    op.create_table(
+        'version_counters',
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('value', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('name')
+    )
+    op.execute("INSERT INTO version_counters (name, value) VALUES ('leaderboard', 0)")
+
+def downgrade():
+    op.drop_table('version_counters')
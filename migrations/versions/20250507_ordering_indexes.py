@@ -0,0 +1,41 @@
+"""Добавляет индексы по порядку модулей и уроков
+
+Revision ID: 20250507_ordering_indexes
+Revises: 20250506_version_counters
+Create Date: 2025-05-07 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = '20250507_ordering_indexes'
+down_revision = '20250506_version_counters'
+branch_labels = None
+depends_on = None
+
+# (имя индекса, таблица, колонки)
+ORDERING_INDEXES = [
+    ('ix_modules_course_id_order', 'modules', ['course_id', 'order']),
+    ('ix_lessons_module_id_order', 'lessons', ['module_id', 'order']),
+]
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    existing = {
+        table: {index['name'] for index in inspector.get_indexes(table)}
+        for table in {table for _, table, _ in ORDERING_INDEXES}
+    }
+
+    # CREATE INDEX CONCURRENTLY не может выполняться внутри транзакции
+    with op.get_context().autocommit_block():
+        for name, table, columns in ORDERING_INDEXES:
+            if name in existing[table]:
+                continue
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(ORDERING_INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
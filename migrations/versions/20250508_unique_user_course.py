@@ -0,0 +1,45 @@
+"""Уникальная запись пользователя на курс
+
+Revision ID: 20250508_unique_user_course
+Revises: 20250507_ordering_indexes
+Create Date: 2025-05-08 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = '20250508_unique_user_course'
+down_revision = '20250507_ordering_indexes'
+branch_labels = None
+depends_on = None
+
+def _constraint_exists(conn):
+    query = sa.text("""
+        SELECT constraint_name
+        FROM information_schema.table_constraints
+        WHERE constraint_name = 'uq_user_course'
+        AND table_name = 'user_courses'
+        AND constraint_type = 'UNIQUE'
+    """)
+    return conn.execute(query).fetchone() is not None
+
+def upgrade():
+    conn = op.get_bind()
+    if _constraint_exists(conn):
+        return
+
+    # Удаляем дубликаты записей, оставляя самую раннюю
+    op.execute("""
+        DELETE FROM user_courses duplicate
+        USING user_courses original
+        WHERE duplicate.user_id = original.user_id
+        AND duplicate.course_id = original.course_id
+        AND duplicate.id > original.id
+    """)
+    op.create_unique_constraint('uq_user_course', 'user_courses', ['user_id', 'course_id'])
+
+def downgrade():
+    conn = op.get_bind()
+    if _constraint_exists(conn):
+        op.drop_constraint('uq_user_course', 'user_courses', type_='unique')
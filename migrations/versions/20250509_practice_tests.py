@@ -0,0 +1,23 @@
+"""Добавляет язык и тесты практического задания урока
+
+Revision ID: 20250509_practice_tests
+Revises: 20250508_unique_user_course
+Create Date: 2025-05-09 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = '20250509_practice_tests'
+down_revision = '20250508_unique_user_course'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('lessons', sa.Column('practice_language', sa.String(), nullable=True))
+    op.add_column('lessons', sa.Column('practice_tests', sa.Text(), nullable=True))
+
+def downgrade():
+    op.drop_column('lessons', 'practice_tests')
+    op.drop_column('lessons', 'practice_language')
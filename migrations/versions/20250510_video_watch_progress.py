@@ -0,0 +1,36 @@
+"""Добавляет таблицу прогресса просмотра видео
+
+Revision ID: 20250510_video_watch_progress
+Revises: 20250509_practice_tests
+Create Date: 2025-05-10 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = '20250510_video_watch_progress'
+down_revision = '20250509_practice_tests'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'video_watch_progress',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('lesson_id', sa.Integer(), nullable=False),
+        sa.Column('position_seconds', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('duration_seconds', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('watched_seconds', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['lesson_id'], ['lessons.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'lesson_id', name='uq_video_watch_user_lesson')
+    )
+    op.create_index(op.f('ix_video_watch_progress_id'), 'video_watch_progress', ['id'], unique=False)
+    op.create_index(op.f('ix_video_watch_progress_lesson_id'), 'video_watch_progress', ['lesson_id'], unique=False)
+
+def downgrade():
+    op.drop_table('video_watch_progress')
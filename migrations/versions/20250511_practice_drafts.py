@@ -0,0 +1,36 @@
+"""Добавляет таблицу черновиков кода практики
+
+Revision ID: 20250511_practice_drafts
+Revises: 20250510_video_watch_progress
+Create Date: 2025-05-11 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = '20250511_practice_drafts'
+down_revision = '20250510_video_watch_progress'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'practice_drafts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('lesson_id', sa.Integer(), nullable=False),
+        sa.Column('content', sa.LargeBinary(), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['lesson_id'], ['lessons.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'lesson_id', name='uq_practice_draft_user_lesson')
+    )
+    op.create_index(op.f('ix_practice_drafts_id'), 'practice_drafts', ['id'], unique=False)
+    op.create_index(op.f('ix_practice_drafts_lesson_id'), 'practice_drafts', ['lesson_id'], unique=False)
+
+def downgrade():
+    op.drop_table('practice_drafts')
@@ -0,0 +1,66 @@
+"""Заполняет updated_at и добавляет индексы по времени изменения для синхронизации
+
+Revision ID: 20250512_sync_timestamps
+Revises: 20250511_practice_drafts
+Create Date: 2025-05-12 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = '20250512_sync_timestamps'
+down_revision = '20250511_practice_drafts'
+branch_labels = None
+depends_on = None
+
+# Таблицы, у которых updated_at заполнялся только при изменении строки
+BACKFILL_TABLES = ['users', 'lessons', 'lesson_comments', 'lesson_reactions']
+BACKFILL_BATCH_SIZE = 10000
+
+# (имя индекса, таблица, колонки)
+SYNC_INDEXES = [
+    ('ix_user_lesson_progress_user_id_updated_at', 'user_lesson_progress', ['user_id', 'updated_at']),
+    ('ix_lesson_comments_lesson_id_updated_at', 'lesson_comments', ['lesson_id', 'updated_at']),
+    ('ix_lesson_reactions_lesson_id_updated_at', 'lesson_reactions', ['lesson_id', 'updated_at']),
+    ('ix_lessons_module_id_updated_at', 'lessons', ['module_id', 'updated_at']),
+]
+
+def upgrade():
+    conn = op.get_bind()
+
+    # Новые строки сразу получают время изменения
+    for table in BACKFILL_TABLES:
+        op.alter_column(table, 'updated_at', server_default=sa.text('now()'))
+
+    # Заполняем пропуски порциями в отдельных транзакциях, чтобы не держать блокировки на больших таблицах
+    with op.get_context().autocommit_block():
+        for table in BACKFILL_TABLES:
+            while True:
+                result = conn.execute(sa.text(
+                    f"UPDATE {table} SET updated_at = created_at "
+                    f"WHERE id IN (SELECT id FROM {table} WHERE updated_at IS NULL LIMIT :batch)"
+                ), {"batch": BACKFILL_BATCH_SIZE})
+                if result.rowcount < BACKFILL_BATCH_SIZE:
+                    break
+
+    inspector = sa.inspect(conn)
+    existing = {
+        table: {index['name'] for index in inspector.get_indexes(table)}
+        for table in {table for _, table, _ in SYNC_INDEXES}
+    }
+
+    # CREATE INDEX CONCURRENTLY не может выполняться внутри транзакции
+    with op.get_context().autocommit_block():
+        for name, table, columns in SYNC_INDEXES:
+            if name in existing[table]:
+                continue
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(SYNC_INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+    for table in BACKFILL_TABLES:
+        op.alter_column(table, 'updated_at', server_default=None)
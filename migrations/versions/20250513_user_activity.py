@@ -0,0 +1,54 @@
+"""Добавляет битовые карты активности пользователей и заполняет их по истории
+
+Revision ID: 20250513_user_activity
+Revises: 20250512_sync_timestamps
+Create Date: 2025-05-13 10:00:00
+
+"""
+from collections import defaultdict
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = '20250513_user_activity'
+down_revision = '20250512_sync_timestamps'
+branch_labels = None
+depends_on = None
+
+BITMAP_SIZE = 46
+INSERT_BATCH_SIZE = 5000
+
+def upgrade():
+    user_activity = op.create_table(
+        'user_activity',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('year', sa.Integer(), nullable=False),
+        sa.Column('days', sa.LargeBinary(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'year')
+    )
+
+    # Дни активности из истории: ответы на тесты и последние изменения прогресса
+    conn = op.get_bind()
+    result = conn.execution_options(stream_results=True).execute(sa.text(
+        "SELECT user_id, (created_at AT TIME ZONE 'UTC')::date FROM user_test_answers WHERE created_at IS NOT NULL "
+        "UNION "
+        "SELECT user_id, (updated_at AT TIME ZONE 'UTC')::date FROM user_lesson_progress WHERE updated_at IS NOT NULL"
+    ))
+    bitmaps = defaultdict(lambda: bytearray(BITMAP_SIZE))
+    for user_id, day in result:
+        index = day.timetuple().tm_yday - 1
+        # Тот же порядок битов, что у set_bit в PostgreSQL
+        bitmaps[(user_id, day.year)][index // 8] |= 1 << (index % 8)
+
+    rows = [
+        {'user_id': user_id, 'year': year, 'days': bytes(days)}
+        for (user_id, year), days in bitmaps.items()
+    ]
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        op.bulk_insert(user_activity, rows[start:start + INSERT_BATCH_SIZE])
+
+def downgrade():
+    op.drop_table('user_activity')
@@ -0,0 +1,43 @@
+"""Добавляет счетчики воронки уроков и дневные снимки
+
+Revision ID: 20250514_lesson_funnels
+Revises: 20250513_user_activity
+Create Date: 2025-05-14 10:00:00
+
+Счетчики заполняются отдельно: python scripts/backfill_funnels.py
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = '20250514_lesson_funnels'
+down_revision = '20250513_user_activity'
+branch_labels = None
+depends_on = None
+
+FUNNEL_STAGES = ['started', 'intro_completed', 'video_completed', 'practice_completed', 'test_completed', 'completed']
+
+def _counter_columns():
+    return [sa.Column(stage, sa.Integer(), nullable=False, server_default='0') for stage in FUNNEL_STAGES]
+
+def upgrade():
+    op.create_table(
+        'lesson_funnels',
+        sa.Column('lesson_id', sa.Integer(), nullable=False),
+        *_counter_columns(),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['lesson_id'], ['lessons.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('lesson_id')
+    )
+    op.create_table(
+        'lesson_funnel_snapshots',
+        sa.Column('lesson_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        *_counter_columns(),
+        sa.ForeignKeyConstraint(['lesson_id'], ['lessons.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('lesson_id', 'day')
+    )
+
+def downgrade():
+    op.drop_table('lesson_funnel_snapshots')
+    op.drop_table('lesson_funnels')
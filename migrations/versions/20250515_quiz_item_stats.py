@@ -0,0 +1,47 @@
+"""Добавляет таблицы кэша анализа вопросов теста
+
+Revision ID: 20250515_quiz_item_stats
+Revises: 20250514_lesson_funnels
+Create Date: 2025-05-15 10:00:00
+
+Таблицы заполняются отдельно: python scripts/analyze_quiz_items.py
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = '20250515_quiz_item_stats'
+down_revision = '20250514_lesson_funnels'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'quiz_item_stats',
+        sa.Column('question_id', sa.Integer(), nullable=False),
+        sa.Column('lesson_id', sa.Integer(), nullable=False),
+        sa.Column('responses', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('difficulty', sa.Float(), nullable=True),
+        sa.Column('discrimination', sa.Float(), nullable=True),
+        sa.Column('computed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['lesson_id'], ['lessons.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['question_id'], ['test_questions.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('question_id')
+    )
+    op.create_index(op.f('ix_quiz_item_stats_lesson_id'), 'quiz_item_stats', ['lesson_id'], unique=False)
+    op.create_table(
+        'quiz_option_stats',
+        sa.Column('option_id', sa.Integer(), nullable=False),
+        sa.Column('question_id', sa.Integer(), nullable=False),
+        sa.Column('selected', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('selection_rate', sa.Float(), nullable=True),
+        sa.Column('discrimination', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['option_id'], ['test_options.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['question_id'], ['test_questions.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('option_id')
+    )
+    op.create_index(op.f('ix_quiz_option_stats_question_id'), 'quiz_option_stats', ['question_id'], unique=False)
+
+def downgrade():
+    op.drop_table('quiz_option_stats')
+    op.drop_table('quiz_item_stats')
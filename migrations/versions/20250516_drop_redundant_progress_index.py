@@ -0,0 +1,27 @@
+"""Удаляет индекс user_lesson_progress (user_id, lesson_id), дублирующий uq_user_lesson
+
+Revision ID: 20250516_drop_redundant_progress_index
+Revises: 20250515_quiz_item_stats
+Create Date: 2025-05-16 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = '20250516_drop_redundant_progress_index'
+down_revision = '20250515_quiz_item_stats'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Индекс мог быть создан прежней версией 20250505_hot_path_indexes
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_user_lesson_progress_user_id_lesson_id', table_name='user_lesson_progress',
+            postgresql_concurrently=True, if_exists=True
+        )
+
+def downgrade():
+    # Индекс не восстанавливается: его роль выполняет уникальное ограничение uq_user_lesson
+    pass
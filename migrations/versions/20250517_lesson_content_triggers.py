@@ -0,0 +1,138 @@
+"""Обновляет lessons.updated_at при изменении вопросов, вариантов ответов, курса и модуля урока
+
+Revision ID: 20250517_lesson_content_triggers
+Revises: 20250516_drop_redundant_progress_index
+Create Date: 2025-05-17 10:00:00
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic
+revision = '20250517_lesson_content_triggers'
+down_revision = '20250516_drop_redundant_progress_index'
+branch_labels = None
+depends_on = None
+
+# Версия содержимого урока (ETag, кэш хэшей, синхронизация) определяется по lessons.updated_at.
+# Триггеры поддерживают ее и для изменений, сделанных в обход ORM, и для дочерних таблиц.
+# Повторные изменения в одной транзакции не переписывают строку урока: now() в ней не меняется.
+
+LESSONS_TOUCH = """
+CREATE OR REPLACE FUNCTION lessons_touch_updated_at() RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at := now();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+# Для вопросов и вариантов - триггеры уровня оператора с таблицами переходов,
+# чтобы многострочная вставка (импорт курса) обновляла каждый урок один раз
+QUESTIONS_TOUCH = """
+CREATE OR REPLACE FUNCTION test_questions_touch_lessons() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE lessons SET updated_at = now()
+        WHERE id IN (SELECT lesson_id FROM new_rows) AND updated_at IS DISTINCT FROM now();
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE lessons SET updated_at = now()
+        WHERE id IN (SELECT lesson_id FROM old_rows) AND updated_at IS DISTINCT FROM now();
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+OPTIONS_TOUCH = """
+CREATE OR REPLACE FUNCTION test_options_touch_lessons() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE lessons SET updated_at = now()
+        WHERE id IN (
+            SELECT q.lesson_id FROM test_questions q JOIN new_rows o ON o.question_id = q.id
+        ) AND updated_at IS DISTINCT FROM now();
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE lessons SET updated_at = now()
+        WHERE id IN (
+            SELECT q.lesson_id FROM test_questions q JOIN old_rows o ON o.question_id = q.id
+        ) AND updated_at IS DISTINCT FROM now();
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+# Название курса входит в ответ урока, перенос модуля меняет курс его уроков
+COURSES_TOUCH = """
+CREATE OR REPLACE FUNCTION courses_touch_lessons() RETURNS trigger AS $$
+BEGIN
+    UPDATE lessons SET updated_at = now()
+    WHERE module_id IN (SELECT id FROM modules WHERE course_id = NEW.id)
+      AND updated_at IS DISTINCT FROM now();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+MODULES_TOUCH = """
+CREATE OR REPLACE FUNCTION modules_touch_lessons() RETURNS trigger AS $$
+BEGIN
+    UPDATE lessons SET updated_at = now()
+    WHERE module_id = NEW.id AND updated_at IS DISTINCT FROM now();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+# (имя триггера, таблица, определение)
+TRIGGERS = [
+    ('trg_lessons_touch_updated_at', 'lessons',
+     "BEFORE UPDATE ON lessons FOR EACH ROW EXECUTE FUNCTION lessons_touch_updated_at()"),
+    ('trg_test_questions_insert_touch', 'test_questions',
+     "AFTER INSERT ON test_questions REFERENCING NEW TABLE AS new_rows "
+     "FOR EACH STATEMENT EXECUTE FUNCTION test_questions_touch_lessons()"),
+    ('trg_test_questions_update_touch', 'test_questions',
+     "AFTER UPDATE ON test_questions REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows "
+     "FOR EACH STATEMENT EXECUTE FUNCTION test_questions_touch_lessons()"),
+    ('trg_test_questions_delete_touch', 'test_questions',
+     "AFTER DELETE ON test_questions REFERENCING OLD TABLE AS old_rows "
+     "FOR EACH STATEMENT EXECUTE FUNCTION test_questions_touch_lessons()"),
+    ('trg_test_options_insert_touch', 'test_options',
+     "AFTER INSERT ON test_options REFERENCING NEW TABLE AS new_rows "
+     "FOR EACH STATEMENT EXECUTE FUNCTION test_options_touch_lessons()"),
+    ('trg_test_options_update_touch', 'test_options',
+     "AFTER UPDATE ON test_options REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows "
+     "FOR EACH STATEMENT EXECUTE FUNCTION test_options_touch_lessons()"),
+    ('trg_test_options_delete_touch', 'test_options',
+     "AFTER DELETE ON test_options REFERENCING OLD TABLE AS old_rows "
+     "FOR EACH STATEMENT EXECUTE FUNCTION test_options_touch_lessons()"),
+    ('trg_courses_touch_lessons', 'courses',
+     "AFTER UPDATE OF title ON courses FOR EACH ROW "
+     "WHEN (OLD.title IS DISTINCT FROM NEW.title) EXECUTE FUNCTION courses_touch_lessons()"),
+    ('trg_modules_touch_lessons', 'modules',
+     "AFTER UPDATE OF course_id ON modules FOR EACH ROW "
+     "WHEN (OLD.course_id IS DISTINCT FROM NEW.course_id) EXECUTE FUNCTION modules_touch_lessons()"),
+]
+
+FUNCTIONS = [
+    ('lessons_touch_updated_at', LESSONS_TOUCH),
+    ('test_questions_touch_lessons', QUESTIONS_TOUCH),
+    ('test_options_touch_lessons', OPTIONS_TOUCH),
+    ('courses_touch_lessons', COURSES_TOUCH),
+    ('modules_touch_lessons', MODULES_TOUCH),
+]
+
+def upgrade():
+    for _, definition in FUNCTIONS:
+        op.execute(definition)
+    for name, table, definition in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name} ON {table}")
+        op.execute(f"CREATE TRIGGER {name} {definition}")
+
+def downgrade():
+    for name, table, _ in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name} ON {table}")
+    for name, _ in FUNCTIONS:
+        op.execute(f"DROP FUNCTION IF EXISTS {name}()")
@@ -0,0 +1,24 @@
+"""Добавляет время снимка воронки, чтобы снимок прошедшего дня фиксировался на границе суток
+
+Revision ID: 20250518_funnel_snapshot_taken_at
+Revises: 20250517_lesson_content_triggers
+Create Date: 2025-05-18 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = '20250518_funnel_snapshot_taken_at'
+down_revision = '20250517_lesson_content_triggers'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column(
+        'lesson_funnel_snapshots',
+        sa.Column('taken_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True)
+    )
+
+def downgrade():
+    op.drop_column('lesson_funnel_snapshots', 'taken_at')
@@ -0,0 +1,36 @@
+"""Добавляет отметки об удаленных реакциях для синхронизации
+
+Revision ID: 20250519_lesson_reaction_removals
+Revises: 20250518_funnel_snapshot_taken_at
+Create Date: 2025-05-19 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = '20250519_lesson_reaction_removals'
+down_revision = '20250518_funnel_snapshot_taken_at'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'lesson_reaction_removals',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('lesson_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['lesson_id'], ['lessons.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('lesson_id', 'user_id', name='uq_lesson_reaction_removal')
+    )
+    op.create_index(op.f('ix_lesson_reaction_removals_id'), 'lesson_reaction_removals', ['id'], unique=False)
+    op.create_index(
+        'ix_lesson_reaction_removals_lesson_id_updated_at', 'lesson_reaction_removals',
+        ['lesson_id', 'updated_at'], unique=False
+    )
+
+def downgrade():
+    op.drop_table('lesson_reaction_removals')
@@ -0,0 +1,53 @@
+"""
+Анализ вопросов тестов по ответам пользователей.
+
+Для каждого урока ответы читаются порциями через серверный курсор,
+статистика копится векторными операциями NumPy (память зависит только
+от числа вопросов и размера порции), результат заменяет кэш урока.
+Учитывается первая попытка пользователя по каждому вопросу.
+
+Запуск:
+    python scripts/analyze_quiz_items.py [--lesson-id 1] [--chunk-size 50000]
+"""
+import argparse
+import os
+import sys
+import time
+
+# Добавляем корневую директорию проекта в sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+from app.auth.models import User  # noqa: F401 - модели курсов ссылаются на User
+from app.analytics.items import analyze_lesson
+from app.courses.models import TestQuestion
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Анализ вопросов тестов")
+    parser.add_argument("--lesson-id", type=int, default=None, help="Проанализировать только этот урок")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="Строк ответов в одной порции")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        lessons = db.query(TestQuestion.lesson_id).distinct().order_by(TestQuestion.lesson_id)
+        if args.lesson_id is not None:
+            lessons = lessons.filter(TestQuestion.lesson_id == args.lesson_id)
+        lesson_ids = [lesson_id for lesson_id, in lessons]
+
+        started = time.perf_counter()
+        total = 0
+        for lesson_id in lesson_ids:
+            total += analyze_lesson(db, lesson_id, args.chunk_size)
+            # Фиксируем по урокам, чтобы не держать длинную транзакцию
+            db.commit()
+
+        elapsed = time.perf_counter() - started
+        print(f"Уроков: {len(lesson_ids)}, учтено ответов: {total} за {elapsed:.1f} с")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
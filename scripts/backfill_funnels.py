@@ -0,0 +1,43 @@
+"""
+Пересчет счетчиков воронки уроков по существующему прогрессу.
+
+Все счетчики считаются одним запросом с группировкой по user_lesson_progress.
+Запись прогресса на время пересчета блокируется, поэтому скрипт лучше
+запускать вне пиковой нагрузки. После пересчета сохраняется снимок за сегодня.
+
+Запуск:
+    python scripts/backfill_funnels.py [--no-snapshot]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+# Добавляем корневую директорию проекта в sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+from app.auth.models import User  # noqa: F401 - модели курсов ссылаются на User
+from app.analytics.funnels import rebuild_funnels, snapshot_funnels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пересчет счетчиков воронки уроков")
+    parser.add_argument("--no-snapshot", action="store_true", help="Не сохранять снимок за сегодня")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        lessons = rebuild_funnels(db)
+        if not args.no_snapshot:
+            snapshot_funnels(db, datetime.now(timezone.utc).date())
+        db.commit()
+        print(f"Пересчитаны счетчики {lessons} уроков за {time.perf_counter() - started:.1f} с")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Микробенчмарк сериализации ответа get_lesson.
+
+Сравнивает прежний путь синхронного эндпоинта (response_model=dict: валидация
+в пуле потоков и сериализация через FastAPI, затем json.dumps в JSONResponse)
+с typed_response: закешированный валидатор LessonResponse и orjson.
+База данных не нужна.
+
+Запуск:
+    python scripts/bench_serialization.py [--intro-kb 40] [--questions 10] [--number 2000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import timeit
+
+# Добавляем корневую директорию проекта в sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.courses.schemas import LessonResponse
+from app.utils.serialization import typed_response
+
+
+def build_lesson_dict(args):
+    return {
+        "id": 1,
+        "title": "Переменные и константы",
+        "module_id": 1,
+        "course_id": 1,
+        "course_title": "Основы JavaScript",
+        "intro": {
+            "title": "Работа с переменными",
+            "content": "<p>" + "Переменные в JavaScript объявляются с помощью let. " * (args.intro_kb * 20) + "</p>"
+        },
+        "video": {
+            "url": "https://www.youtube.com/embed/ix9cRaBkVe0",
+            "description": "Подробное объяснение работы с переменными в JavaScript."
+        },
+        "practice": {
+            "instructions": "<p>Объявите переменные и константы.</p>",
+            "codeTemplate": "let myVariable = 10;\n" * 50
+        },
+        "test": [
+            {
+                "id": question_id,
+                "question": f"Вопрос {question_id}",
+                "options": [{"id": question_id * 10 + i, "text": f"Вариант {i}"} for i in range(4)]
+            }
+            for question_id in range(1, args.questions + 1)
+        ],
+        "xp_reward": 30,
+        "progress": {
+            "intro_completed": True,
+            "video_completed": False,
+            "practice_completed": False,
+            "test_completed": False,
+            "test_score": None,
+            "earned_xp": 10,
+            "completed": False
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Микробенчмарк сериализации урока")
+    parser.add_argument("--intro-kb", type=int, default=40, help="Примерный размер intro_content в КБ")
+    parser.add_argument("--questions", type=int, default=10, help="Количество вопросов теста")
+    parser.add_argument("--number", type=int, default=2000, help="Количество повторов")
+    args = parser.parse_args()
+
+    data = build_lesson_dict(args)
+    field = create_response_field(name="Response_get_lesson", type_=dict)
+    loop = asyncio.new_event_loop()
+
+    def legacy():
+        content = loop.run_until_complete(serialize_response(field=field, response_content=data, is_coroutine=False))
+        return JSONResponse(content).body
+
+    def fast():
+        return typed_response(LessonResponse, data).body
+
+    print(f"Размер ответа: {len(fast()) / 1024:.1f} КБ")
+    results = {}
+    for name, func in (("response_model=dict + JSONResponse", legacy), ("typed_response(LessonResponse)", fast)):
+        best = min(timeit.repeat(func, number=args.number, repeat=5)) / args.number
+        results[name] = best
+        print(f"{name:40} {best * 1e6:10.1f} мкс/запрос")
+
+    legacy_time, fast_time = results.values()
+    print(f"Ускорение: x{legacy_time / fast_time:.1f}")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+Проверка планов выполнения горячих запросов роутеров.
+
+Для каждого запроса снимается EXPLAIN (FORMAT JSON) и проверяется, что по
+перечисленным таблицам не выполняется последовательное сканирование (Seq Scan).
+Проверка имеет смысл только на заполненной базе PostgreSQL, например после
+    python scripts/seed_bulk_data.py --users 100000
+
+Запуск:
+    python scripts/check_query_plans.py [--min-users 10000] [--verbose]
+
+Код возврата 1 означает, что хотя бы один план деградировал.
+"""
+import argparse
+import json
+import os
+import sys
+
+# Добавляем корневую директорию проекта в sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import and_, func, select, text
+from app.database import engine
+from app.auth.models import User
+from app.courses.models import (
+    Course, Module, UserCourse, Lesson, UserLessonProgress, TestQuestion, TestOption,
+    LessonComment, CommentLike, LessonReaction
+)
+
+# Флаги прогресса, которые get_lesson читает вместе с версией урока
+PROGRESS_FIELDS = ("intro_completed", "video_completed", "practice_completed", "test_completed", "completed")
+# Сколько уроков одного модуля запрашивается пакетом, как в GET /lessons?ids=
+BATCH_LESSONS = 10
+
+
+def sample_ids(conn):
+    """
+    Выбирает реальные идентификаторы для параметров запросов:
+    самый популярный урок, самого активного пользователя и т.д.
+    """
+    lesson_id = conn.execute(
+        select(UserLessonProgress.lesson_id)
+        .group_by(UserLessonProgress.lesson_id)
+        .order_by(func.count().desc())
+        .limit(1)
+    ).scalar()
+    user_id = conn.execute(
+        select(UserLessonProgress.user_id).where(UserLessonProgress.lesson_id == lesson_id).limit(1)
+    ).scalar()
+    question_id = conn.execute(
+        select(TestQuestion.id).where(TestQuestion.lesson_id == lesson_id).limit(1)
+    ).scalar()
+    comment_id = conn.execute(
+        select(LessonComment.id).where(LessonComment.lesson_id == lesson_id).limit(1)
+    ).scalar()
+    # Уроки модуля популярного урока - типичный пакет для офлайн-чтения
+    module_id = conn.execute(select(Lesson.module_id).where(Lesson.id == (lesson_id or 1))).scalar()
+    lesson_ids = conn.execute(
+        select(Lesson.id).where(Lesson.module_id == module_id).order_by(Lesson.order).limit(BATCH_LESSONS)
+    ).scalars().all()
+    return {
+        "lesson_id": lesson_id or 1,
+        "lesson_ids": lesson_ids or [lesson_id or 1],
+        "user_id": user_id or 1,
+        "question_id": question_id or 1,
+        "comment_id": comment_id or 1,
+    }
+
+
+def _continue_learning(user_id):
+    """
+    Запрос GET /users/me/continue: первый непройденный урок каждой записи на курс
+    через оконную функцию
+    """
+    pending = (
+        select(
+            UserCourse.id.label("user_course_id"),
+            Lesson.id.label("lesson_id"),
+            Lesson.title.label("lesson_title"),
+            Lesson.xp_reward.label("xp_reward"),
+            Module.id.label("module_id"),
+            Module.title.label("module_title"),
+            func.row_number().over(
+                partition_by=UserCourse.id,
+                order_by=(Module.order, Lesson.order, Lesson.id)
+            ).label("position")
+        )
+        .join(Module, Module.course_id == UserCourse.course_id)
+        .join(Lesson, Lesson.module_id == Module.id)
+        .outerjoin(UserLessonProgress, and_(
+            UserLessonProgress.lesson_id == Lesson.id,
+            UserLessonProgress.user_id == UserCourse.user_id,
+            UserLessonProgress.completed.is_(True)
+        ))
+        .where(UserCourse.user_id == user_id, UserLessonProgress.id.is_(None))
+        .subquery()
+    )
+    return (
+        select(
+            UserCourse.course_id, Course.title, UserCourse.status, UserCourse.progress,
+            pending.c.lesson_id, pending.c.lesson_title, pending.c.xp_reward,
+            pending.c.module_id, pending.c.module_title
+        )
+        .join(Course, Course.id == UserCourse.course_id)
+        .outerjoin(pending, and_(pending.c.user_course_id == UserCourse.id, pending.c.position == 1))
+        .where(UserCourse.user_id == user_id)
+        .order_by(UserCourse.started_at.desc(), UserCourse.id.desc())
+    )
+
+
+def hot_queries(ids):
+    """
+    Горячие запросы роутеров: (название, запрос, таблицы без Seq Scan)
+    """
+    return [
+        (
+            "users.leaderboard",
+            select(User.id, User.nickname, User.xp).order_by(User.xp.desc()).limit(10),
+            {"users"},
+        ),
+        (
+            "users.profile_courses",
+            select(UserCourse, Course.title)
+            .join(Course, UserCourse.course_id == Course.id)
+            .where(UserCourse.user_id == ids["user_id"]),
+            {"user_courses"},
+        ),
+        (
+            "users.continue_learning",
+            _continue_learning(ids["user_id"]),
+            {"user_courses", "lessons", "user_lesson_progress"},
+        ),
+        (
+            # Версия урока и прогресс для проверки ETag в get_lesson
+            "lessons.get_lesson_version",
+            select(
+                Lesson.created_at, Lesson.updated_at, UserLessonProgress.id,
+                *[getattr(UserLessonProgress, field) for field in PROGRESS_FIELDS]
+            )
+            .outerjoin(UserLessonProgress, and_(
+                UserLessonProgress.lesson_id == Lesson.id,
+                UserLessonProgress.user_id == ids["user_id"]
+            ))
+            .where(Lesson.id == ids["lesson_id"]),
+            {"lessons", "user_lesson_progress"},
+        ),
+        # Пакетные запросы _assemble_lessons (get_lesson и GET /lessons?ids=)
+        (
+            "lessons.assemble_lessons",
+            select(Lesson, Module.course_id, Course.title.label("course_title"))
+            .outerjoin(Module, Module.id == Lesson.module_id)
+            .outerjoin(Course, Course.id == Module.course_id)
+            .where(Lesson.id.in_(ids["lesson_ids"])),
+            {"lessons"},
+        ),
+        (
+            "lessons.assemble_options",
+            select(TestOption.question_id, TestOption.id, TestOption.text)
+            .join(TestQuestion, TestQuestion.id == TestOption.question_id)
+            .where(TestQuestion.lesson_id.in_(ids["lesson_ids"]))
+            .order_by(TestOption.question_id, TestOption.order),
+            {"test_questions", "test_options"},
+        ),
+        (
+            "lessons.assemble_questions",
+            select(TestQuestion.lesson_id, TestQuestion.id, TestQuestion.question)
+            .where(TestQuestion.lesson_id.in_(ids["lesson_ids"]))
+            .order_by(TestQuestion.lesson_id, TestQuestion.order),
+            {"test_questions"},
+        ),
+        (
+            "lessons.assemble_progress",
+            select(UserLessonProgress.lesson_id, *[getattr(UserLessonProgress, field) for field in PROGRESS_FIELDS])
+            .where(
+                UserLessonProgress.user_id == ids["user_id"],
+                UserLessonProgress.lesson_id.in_(ids["lesson_ids"])
+            ),
+            {"user_lesson_progress"},
+        ),
+        (
+            # Поиск прогресса в обработчиках прогресса, практики и теста
+            "lessons.user_progress",
+            select(UserLessonProgress).where(
+                UserLessonProgress.user_id == ids["user_id"],
+                UserLessonProgress.lesson_id == ids["lesson_id"]
+            ),
+            {"user_lesson_progress"},
+        ),
+        (
+            "lessons.submit_test_questions",
+            select(TestQuestion).where(TestQuestion.lesson_id == ids["lesson_id"]),
+            {"test_questions"},
+        ),
+        (
+            "lessons.correct_option",
+            select(TestOption).where(
+                TestOption.question_id == ids["question_id"],
+                TestOption.is_correct == True
+            ).limit(1),
+            {"test_options"},
+        ),
+        (
+            "lessons.comments",
+            select(LessonComment).where(
+                LessonComment.lesson_id == ids["lesson_id"],
+                LessonComment.parent_id.is_(None)
+            ).order_by(LessonComment.created_at.desc()),
+            {"lesson_comments"},
+        ),
+        (
+            "lessons.comment_likes_count",
+            select(func.count()).select_from(CommentLike).where(CommentLike.comment_id == ids["comment_id"]),
+            {"comment_likes"},
+        ),
+        (
+            "lessons.reactions_count",
+            select(func.count()).select_from(LessonReaction).where(
+                LessonReaction.lesson_id == ids["lesson_id"],
+                LessonReaction.is_like == True
+            ),
+            {"lesson_reactions"},
+        ),
+    ]
+
+
+def seq_scans(plan):
+    """
+    Возвращает имена таблиц, которые читаются последовательным сканированием
+    """
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan.get("Relation Name"))
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+
+def explain(conn, statement):
+    sql = str(statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    result = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    if isinstance(result, str):
+        result = json.loads(result)
+    return result[0]["Plan"]
+
+
+def check_query_plans(args):
+    with engine.connect() as conn:
+        if conn.dialect.name != "postgresql":
+            print("Проверка планов поддерживается только для PostgreSQL")
+            return 2
+
+        users_count = conn.execute(select(func.count()).select_from(User)).scalar()
+        if users_count < args.min_users:
+            print(f"В базе {users_count} пользователей, нужно хотя бы {args.min_users}: "
+                  f"заполните базу через scripts/seed_bulk_data.py")
+            return 2
+
+        ids = sample_ids(conn)
+        failures = 0
+        for name, statement, guarded in hot_queries(ids):
+            plan = explain(conn, statement)
+            degraded = sorted(set(seq_scans(plan)) & guarded)
+            if degraded:
+                failures += 1
+                print(f"FAIL {name}: Seq Scan по {', '.join(degraded)}")
+                print(json.dumps(plan, indent=2, ensure_ascii=False))
+            else:
+                print(f"OK   {name}")
+                if args.verbose:
+                    print(json.dumps(plan, indent=2, ensure_ascii=False))
+
+    return 1 if failures else 0
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Проверка планов выполнения горячих запросов")
+    parser.add_argument("--min-users", type=int, default=10000, help="Минимальный размер набора данных")
+    parser.add_argument("--verbose", action="store_true", help="Печатать планы всех запросов")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    sys.exit(check_query_plans(parse_args()))
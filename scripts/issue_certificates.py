@@ -0,0 +1,78 @@
+"""
+Пакетная выдача сертификатов.
+
+Находит всех пользователей, прошедших все уроки курса, но еще не получивших
+сертификат, создает сертификаты одной вставкой и рендерит PDF в пуле
+процессов по числу ядер. Также дорендеривает сертификаты без PDF
+(например, если воркер приложения был остановлен до завершения рендеринга).
+
+Запуск:
+    python scripts/issue_certificates.py [--course-id 1] [--workers 8] [--dry-run]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Добавляем корневую директорию проекта в sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+from app.certificates.rendering import render_certificate
+from app.certificates.service import (
+    completed_without_certificate, issue_certificates, render_jobs, store_certificate
+)
+from app.courses.models import Certificate
+
+# Сколько готовых PDF сохраняется между фиксациями транзакции
+COMMIT_EVERY = 500
+
+
+def _render(job):
+    certificate_id, args = job
+    return certificate_id, render_certificate(*args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пакетная выдача сертификатов")
+    parser.add_argument("--course-id", type=int, default=None, help="Выдать сертификаты только по этому курсу")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Количество процессов рендеринга")
+    parser.add_argument("--dry-run", action="store_true", help="Только показать, сколько сертификатов будет выдано")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        pairs = completed_without_certificate(db, course_id=args.course_id)
+        print(f"Завершенных курсов без сертификата: {len(pairs)}")
+        if args.dry_run:
+            return
+
+        issued = issue_certificates(db, pairs)
+        db.commit()
+        print(f"Выдано сертификатов: {len(issued)}")
+
+        pending = db.query(Certificate.id).filter(Certificate.certificate_url.is_(None))
+        if args.course_id is not None:
+            pending = pending.filter(Certificate.course_id == args.course_id)
+        jobs = render_jobs(db, [certificate_id for certificate_id, in pending])
+        if not jobs:
+            return
+
+        started = time.perf_counter()
+        chunksize = max(1, len(jobs) // (args.workers * 4))
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            for position, (certificate_id, pdf) in enumerate(executor.map(_render, jobs, chunksize=chunksize), 1):
+                store_certificate(db, certificate_id, pdf)
+                if position % COMMIT_EVERY == 0:
+                    db.commit()
+        db.commit()
+
+        elapsed = time.perf_counter() - started
+        print(f"Отрендерено PDF: {len(jobs)} за {elapsed:.1f} с ({len(jobs) / elapsed:.0f} в секунду, процессов: {args.workers})")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,432 @@
+"""
+Скрипт для генерации больших синтетических наборов данных для нагрузочного тестирования.
+
+В отличие от seed_database.py строки не добавляются по одной через ORM:
+данные генерируются потоком и записываются пачками через COPY (PostgreSQL)
+или executemany (остальные СУБД). Все случайные величины берутся из генераторов
+с фиксированным seed, поэтому один и тот же набор параметров всегда дает
+один и тот же набор данных.
+
+Пример:
+    python scripts/seed_bulk_data.py --users 1000000 --comments 500000 --seed 42
+"""
+import argparse
+import csv
+import enum
+import io
+import os
+import sys
+import time
+from bisect import bisect
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+from random import Random
+
+# Добавляем корневую директорию проекта в sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, select, text
+from app.database import engine, Base
+from app.auth.models import User
+from app.courses.models import (
+    Course, UserCourse, CourseStatus, Module, Lesson, UserLessonProgress,
+    TestQuestion, TestOption, UserTestAnswer, LessonComment, CommentLike,
+    LessonReaction
+)
+
+BATCH_SIZE = 10000
+
+# Базовая дата, от которой отсчитываются все временные метки набора данных
+BASE_DATE = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+class ZipfSampler:
+    """
+    Выбирает ранг 0..n-1 с вероятностью, пропорциональной 1 / (rank + 1) ** s
+    """
+
+    def __init__(self, n, s=1.1):
+        self.cum_weights = list(accumulate(1.0 / (rank + 1) ** s for rank in range(n)))
+        self.total = self.cum_weights[-1]
+
+    def sample(self, rng):
+        return bisect(self.cum_weights, rng.random() * self.total)
+
+    def weight(self, rank):
+        previous = self.cum_weights[rank - 1] if rank > 0 else 0.0
+        return (self.cum_weights[rank] - previous) / self.total
+
+
+class BulkWriter:
+    """
+    Накапливает строки для одной таблицы и записывает их пачками
+    """
+
+    def __init__(self, conn, table, columns, depends_on=(), batch_size=BATCH_SIZE):
+        self.conn = conn
+        self.table = table
+        self.columns = columns
+        # Таблицы, на которые ссылаются внешние ключи: их строки записываются первыми
+        self.depends_on = depends_on
+        self.batch_size = batch_size
+        self.rows = []
+        self.written = 0
+        self.use_copy = conn.dialect.name == "postgresql"
+
+    def add(self, *row):
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        for writer in self.depends_on:
+            writer.flush()
+        if self.use_copy:
+            self._copy()
+        else:
+            self.conn.execute(
+                self.table.insert(),
+                [dict(zip(self.columns, row)) for row in self.rows]
+            )
+        self.written += len(self.rows)
+        self.rows = []
+
+    def _copy(self):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in self.rows:
+            writer.writerow([_copy_value(value) for value in row])
+        buffer.seek(0)
+
+        columns = ", ".join(f'"{column}"' for column in self.columns)
+        cursor = self.conn.connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {self.table.name} ({columns}) FROM STDIN WITH (FORMAT csv)",
+                buffer
+            )
+        finally:
+            cursor.close()
+
+
+def _copy_value(value):
+    # Пустое значение без кавычек в формате csv означает NULL
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, enum.Enum):
+        # SQLAlchemy хранит Enum по имени элемента
+        return value.name
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def next_id(conn, model):
+    return (conn.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def timestamp(rng, max_days=365):
+    return BASE_DATE + timedelta(seconds=rng.randrange(max_days * 24 * 3600))
+
+
+def seed_content(conn, args):
+    """
+    Создает курсы, модули, уроки и тесты. Возвращает список курсов,
+    где каждый курс - это список уроков вида (lesson_id, xp_reward, [(question_id, [option_ids], correct_option_id)])
+    """
+    rng = Random(f"{args.seed}:content")
+    course_id = next_id(conn, Course)
+    module_id = next_id(conn, Module)
+    lesson_id = next_id(conn, Lesson)
+    question_id = next_id(conn, TestQuestion)
+    option_id = next_id(conn, TestOption)
+
+    courses = BulkWriter(conn, Course.__table__, ["id", "title", "description", "duration", "xp_reward", "created_at"])
+    modules = BulkWriter(conn, Module.__table__, ["id", "course_id", "title", "description", "order", "created_at"], [courses])
+    lessons = BulkWriter(conn, Lesson.__table__, [
+        "id", "module_id", "title", "intro_title", "intro_content", "video_url",
+        "video_description", "practice_instructions", "practice_code_template",
+        "order", "xp_reward", "created_at"
+    ], [modules])
+    questions = BulkWriter(conn, TestQuestion.__table__, ["id", "lesson_id", "question", "order", "created_at"], [lessons])
+    options = BulkWriter(conn, TestOption.__table__, ["id", "question_id", "text", "is_correct", "order"], [questions])
+
+    intro_content = "<p>" + "Синтетический текст урока для нагрузочного тестирования. " * args.intro_repeat + "</p>"
+    code_template = "// Шаблон кода\n" + "console.log('practice');\n" * 20
+
+    catalog = []
+    for _ in range(args.courses):
+        created_at = timestamp(rng)
+        courses.add(
+            course_id, f"Нагрузочный курс #{course_id}",
+            "Синтетический курс для нагрузочного тестирования",
+            rng.randrange(60, 600), rng.randrange(100, 1000), created_at
+        )
+        course_lessons = []
+        for module_order in range(1, args.modules_per_course + 1):
+            modules.add(module_id, course_id, f"Модуль {module_order}", None, module_order, created_at)
+            for lesson_order in range(1, args.lessons_per_module + 1):
+                xp_reward = rng.randrange(10, 60)
+                lessons.add(
+                    lesson_id, module_id, f"Урок {module_order}.{lesson_order}",
+                    f"Введение {module_order}.{lesson_order}", intro_content,
+                    "https://www.youtube.com/embed/W6NZfCO5SIk", "Видео урока",
+                    "<p>Выполните задание.</p>", code_template,
+                    lesson_order, xp_reward, created_at
+                )
+                lesson_questions = []
+                for question_order in range(1, args.questions_per_lesson + 1):
+                    questions.add(question_id, lesson_id, f"Вопрос {question_order}", question_order, created_at)
+                    option_ids = list(range(option_id, option_id + args.options_per_question))
+                    correct = rng.choice(option_ids)
+                    for option_order, current_option in enumerate(option_ids, 1):
+                        options.add(current_option, question_id, f"Вариант {option_order}", current_option == correct, option_order)
+                    lesson_questions.append((question_id, option_ids, correct))
+                    option_id += args.options_per_question
+                    question_id += 1
+                course_lessons.append((lesson_id, xp_reward, lesson_questions))
+                lesson_id += 1
+            module_id += 1
+        catalog.append(course_lessons)
+        course_id += 1
+
+    for writer in (courses, modules, lessons, questions, options):
+        writer.flush()
+
+    print(f"Создано курсов: {courses.written}, модулей: {modules.written}, уроков: {lessons.written}, "
+          f"вопросов: {questions.written}, вариантов ответа: {options.written}")
+    return catalog
+
+
+def seed_users_and_progress(conn, args, catalog):
+    """
+    Создает пользователей, записи на курсы, прогресс по урокам, ответы на тесты и реакции.
+    Возвращает диапазон идентификаторов созданных пользователей.
+    """
+    rng = Random(f"{args.seed}:users")
+    password_hash = User.get_password_hash("password123")
+
+    user_id = first_user_id = next_id(conn, User)
+    user_course_id = next_id(conn, UserCourse)
+    progress_id = next_id(conn, UserLessonProgress)
+    answer_id = next_id(conn, UserTestAnswer)
+    reaction_id = next_id(conn, LessonReaction)
+
+    users = BulkWriter(conn, User.__table__, [
+        "id", "email", "nickname", "password_hash", "xp", "is_active", "is_verified", "created_at"
+    ])
+    enrollments = BulkWriter(conn, UserCourse.__table__, [
+        "id", "user_id", "course_id", "status", "progress", "earned_xp", "started_at", "completed_at"
+    ], [users])
+    progress_rows = BulkWriter(conn, UserLessonProgress.__table__, [
+        "id", "user_id", "lesson_id", "intro_completed", "video_completed", "practice_completed",
+        "test_completed", "test_score", "earned_xp", "completed", "updated_at"
+    ], [users])
+    answers = BulkWriter(conn, UserTestAnswer.__table__, [
+        "id", "user_id", "question_id", "selected_option_id", "is_correct", "created_at"
+    ], [users])
+    reactions = BulkWriter(conn, LessonReaction.__table__, [
+        "id", "lesson_id", "user_id", "is_like", "created_at"
+    ], [users])
+
+    course_popularity = ZipfSampler(len(catalog), args.zipf)
+    # Популярность урока внутри курса убывает по закону Ципфа от его порядкового номера:
+    # глубина прохождения курса выбирается из распределения Ципфа
+    depth_samplers = {}
+    first_course_id = next_id(conn, Course) - len(catalog)
+
+    for _ in range(args.users):
+        created_at = timestamp(rng)
+        user_xp = 0
+        # Зависимые строки пользователя копятся отдельно: XP известен только после всех курсов,
+        # а строку пользователя нужно поставить в очередь раньше ссылающихся на нее строк
+        dependent_rows = []
+        enrolled = set()
+        for _ in range(min(1 + int(rng.expovariate(1.0 / args.courses_per_user)), len(catalog))):
+            enrolled.add(course_popularity.sample(rng))
+
+        for course_index in sorted(enrolled):
+            course_lessons = catalog[course_index]
+            sampler = depth_samplers.get(len(course_lessons))
+            if sampler is None:
+                sampler = depth_samplers[len(course_lessons)] = ZipfSampler(len(course_lessons), args.zipf)
+            depth = sampler.sample(rng) + 1
+            started_at = created_at + timedelta(hours=rng.randrange(1, 24 * 30))
+            course_xp = 0
+
+            for position, (lesson_id, xp_reward, lesson_questions) in enumerate(course_lessons[:depth]):
+                is_last = position == depth - 1
+                # Последний открытый урок остается незавершенным с вероятностью 1/2
+                sections = rng.randrange(1, 4) if is_last and rng.random() < 0.5 else 4
+                score = None
+                if sections == 4:
+                    score = 0
+                    for question_id, option_ids, correct in lesson_questions:
+                        selected = correct if rng.random() < 0.75 else rng.choice(option_ids)
+                        score += selected == correct
+                        dependent_rows.append((answers, (answer_id, user_id, question_id, selected, selected == correct, started_at)))
+                        answer_id += 1
+                completed = sections == 4 and score * 10 >= len(lesson_questions) * 7
+                earned_xp = xp_reward if completed else 10 * sections
+                course_xp += earned_xp
+                dependent_rows.append((progress_rows, (
+                    progress_id, user_id, lesson_id,
+                    sections >= 1, sections >= 2, sections >= 3, sections == 4,
+                    score, earned_xp, completed,
+                    started_at + timedelta(minutes=30 * position)
+                )))
+                progress_id += 1
+
+                if rng.random() < args.reaction_rate:
+                    dependent_rows.append((reactions, (reaction_id, lesson_id, user_id, rng.random() < 0.85, started_at)))
+                    reaction_id += 1
+
+            course_completed = depth == len(course_lessons)
+            dependent_rows.append((enrollments, (
+                user_course_id, user_id, first_course_id + course_index,
+                CourseStatus.COMPLETED if course_completed else CourseStatus.IN_PROGRESS,
+                depth * 100 // len(course_lessons), course_xp, started_at,
+                started_at + timedelta(days=30) if course_completed else None
+            )))
+            user_course_id += 1
+            user_xp += course_xp
+
+        users.add(
+            user_id, f"bulk{user_id}@example.com", f"bulk_user_{user_id}",
+            password_hash, user_xp, True, True, created_at
+        )
+        for writer, row in dependent_rows:
+            writer.add(*row)
+        user_id += 1
+
+    for writer in (users, enrollments, progress_rows, answers, reactions):
+        writer.flush()
+
+    print(f"Создано пользователей: {users.written}, записей на курсы: {enrollments.written}, "
+          f"строк прогресса: {progress_rows.written}, ответов на тесты: {answers.written}, "
+          f"реакций: {reactions.written}")
+    return first_user_id, user_id
+
+
+def seed_comments(conn, args, catalog, user_range):
+    """
+    Создает комментарии с ответами и лайки. Популярность уроков и комментариев
+    распределена по закону Ципфа.
+    """
+    rng = Random(f"{args.seed}:comments")
+    first_user_id, last_user_id = user_range
+    if last_user_id == first_user_id:
+        return
+
+    lesson_ids = [lesson_id for course_lessons in catalog for lesson_id, _, _ in course_lessons]
+    if not lesson_ids:
+        return
+    # Ранги популярности уроков перемешиваются детерминированно
+    rng.shuffle(lesson_ids)
+    lesson_popularity = ZipfSampler(len(lesson_ids), args.zipf)
+
+    comment_id = first_comment_id = next_id(conn, LessonComment)
+    like_id = next_id(conn, CommentLike)
+    comments = BulkWriter(conn, LessonComment.__table__, [
+        "id", "lesson_id", "user_id", "text", "parent_id", "created_at"
+    ])
+    likes = BulkWriter(conn, CommentLike.__table__, ["id", "comment_id", "user_id", "created_at"], [comments])
+
+    # Последние корневые комментарии урока, на которые можно ответить
+    recent_roots = {}
+    for _ in range(args.comments):
+        lesson_id = lesson_ids[lesson_popularity.sample(rng)]
+        roots = recent_roots.setdefault(lesson_id, [])
+        parent_id = rng.choice(roots) if roots and rng.random() < 0.2 else None
+        comments.add(
+            comment_id, lesson_id, rng.randrange(first_user_id, last_user_id),
+            f"Синтетический комментарий #{comment_id}", parent_id, timestamp(rng)
+        )
+        if parent_id is None:
+            roots.append(comment_id)
+            if len(roots) > 50:
+                roots.pop(0)
+        comment_id += 1
+    comments.flush()
+
+    # Лайки распределяются по комментариям по закону Ципфа от ранга комментария,
+    # ранги назначаются комментариям в случайном порядке
+    comment_ids = list(range(first_comment_id, comment_id))
+    rng.shuffle(comment_ids)
+    total_comments = len(comment_ids)
+    comment_popularity = ZipfSampler(total_comments, args.zipf)
+    user_count = last_user_id - first_user_id
+    remaining = args.likes
+    for rank in range(total_comments):
+        if remaining <= 0:
+            break
+        expected = args.likes * comment_popularity.weight(rank)
+        count = min(int(expected) + (rng.random() < expected % 1), user_count, remaining)
+        if not count:
+            continue
+        current_comment = comment_ids[rank]
+        for offset in rng.sample(range(user_count), count):
+            likes.add(like_id, current_comment, first_user_id + offset, timestamp(rng))
+            like_id += 1
+        remaining -= count
+    likes.flush()
+
+    print(f"Создано комментариев: {comments.written}, лайков: {likes.written}")
+
+
+def reset_sequences(conn):
+    """
+    После вставки с явными идентификаторами синхронизирует последовательности PostgreSQL
+    """
+    if conn.dialect.name != "postgresql":
+        return
+    for table in Base.metadata.sorted_tables:
+        if "id" not in table.c:
+            continue
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {table.name}), 1))"
+        ))
+    conn.execute(text("ANALYZE"))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Генерация синтетических данных для нагрузочного тестирования")
+    parser.add_argument("--seed", type=int, default=42, help="Seed генератора случайных чисел")
+    parser.add_argument("--users", type=int, default=10000, help="Количество пользователей")
+    parser.add_argument("--courses", type=int, default=20, help="Количество курсов")
+    parser.add_argument("--modules-per-course", type=int, default=5)
+    parser.add_argument("--lessons-per-module", type=int, default=8)
+    parser.add_argument("--questions-per-lesson", type=int, default=3)
+    parser.add_argument("--options-per-question", type=int, default=4)
+    parser.add_argument("--intro-repeat", type=int, default=200, help="Размер текста введения урока (в повторах фразы)")
+    parser.add_argument("--courses-per-user", type=float, default=1.5, help="Среднее количество курсов на пользователя")
+    parser.add_argument("--reaction-rate", type=float, default=0.1, help="Доля уроков, на которые пользователь ставит реакцию")
+    parser.add_argument("--comments", type=int, default=20000, help="Количество комментариев")
+    parser.add_argument("--likes", type=int, default=100000, help="Количество лайков комментариев")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Показатель распределения Ципфа")
+    return parser.parse_args()
+
+
+def seed_bulk_data(args):
+    started = time.monotonic()
+    print("Начало генерации синтетических данных...")
+
+    Base.metadata.create_all(bind=engine)
+
+    # Весь набор данных загружается в одной транзакции
+    with engine.begin() as conn:
+        catalog = seed_content(conn, args)
+        user_range = seed_users_and_progress(conn, args, catalog)
+        seed_comments(conn, args, catalog, user_range)
+        reset_sequences(conn)
+
+    print(f"Генерация завершена за {time.monotonic() - started:.1f} с")
+
+
+if __name__ == "__main__":
+    seed_bulk_data(parse_args())